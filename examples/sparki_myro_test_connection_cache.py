@@ -0,0 +1,32 @@
+# Sparki_Myro testing
+# times connecting to Sparki without the connection cache, and then with it
+from __future__ import print_function
+
+import time
+
+from sparki_learning import *
+
+com_port = None     # replace with your COM port or /dev/
+tries = 5           # the number of connections to time each way
+
+setDebug(DEBUG_WARN)
+
+while not com_port:
+    com_port = input("What is your com port or /dev/? ")
+
+clearConnectionCache()
+
+for use_cache in (False, True):
+    times = []
+
+    for _ in range(tries):
+        start = time.perf_counter()
+        init(com_port, print_versions=True, use_cache=use_cache)
+        times.append(time.perf_counter() - start)
+        disconnectSerial()
+
+    print("use_cache={}: fastest {:.3f}s, average {:.3f}s".format(use_cache, min(times), sum(times) / len(times)))
+
+start = time.perf_counter()
+port = initAuto(print_correct_port=False)
+print("initAuto found {} in {:.3f}s".format(port, time.perf_counter() - start))
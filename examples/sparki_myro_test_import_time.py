@@ -0,0 +1,47 @@
+# Sparki_Myro testing
+# checks that importing the library is fast and doesn't import the gui (or other modules only some programs need)
+# exits with an error if importing takes longer than the budget -- for example:
+#   python sparki_myro_test_import_time.py 50
+from __future__ import print_function
+
+import subprocess
+import sys
+
+budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 50.0  # the most milliseconds "import sparki_learning" may take
+tries = 5  # the import is timed this many times in new processes, and the fastest is used
+
+# none of these should be imported until a program uses them
+lazy_modules = ("PySimpleGUI", "PySimpleGUI27", "tkinter", "concurrent.futures", "serial.tools.list_ports",
+                "sparki_learning.sync_lib", "json", "numpy", "sparki_learning.trajectory",
+                "sparki_learning.occupancy", "sparki_learning.planning")
+
+check = "import sys, sparki_learning; print(','.join(m for m in {} if m in sys.modules))".format(lazy_modules)
+
+times = []
+
+for _ in range(tries):
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", check], capture_output=True, text=True)
+
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        sys.exit("Unable to import sparki_learning")
+
+    imported = result.stdout.strip()
+
+    # the -X importtime line for the package itself is "import time: self | cumulative | sparki_learning"
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+
+        if len(fields) == 3 and fields[2] == "sparki_learning":
+            times.append(int(fields[1]) / 1000)
+
+fastest = min(times)
+print("import sparki_learning took {:.1f} ms (budget {:.1f} ms)".format(fastest, budget_ms))
+
+if imported:
+    print("These should not be imported with the library: " + imported)
+
+if fastest > budget_ms or imported:
+    sys.exit(1)
+
+print("OK")
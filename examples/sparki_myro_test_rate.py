@@ -0,0 +1,37 @@
+# Sparki_Myro testing
+# checks that periodic() and Rate keep a loop at a steady rate without drifting -- doesn't need a Sparki
+# exits with an error if the loop ends more than the tolerance (in seconds) late -- for example:
+#   python sparki_myro_test_rate.py 0.01
+from __future__ import print_function
+
+import sys
+import time
+
+from sparki_learning.util import Rate, periodic
+
+tolerance = float(sys.argv[1]) if len(sys.argv) > 1 else .01  # the most seconds the loops may end late
+hz = 50
+seconds = 2
+
+for spin in (0.0, .001):
+    start = time.perf_counter()
+    rate = Rate(hz, spin)
+
+    for _ in range(hz * seconds):
+        time.sleep(.3 / hz)  # the work done each time around the loop
+        rate.sleep()
+
+    drift = time.perf_counter() - start - seconds
+    print("Rate({}, spin={}) drifted {:.4f} seconds; {}".format(hz, spin, drift, rate.stats()))
+
+    if drift > tolerance:
+        sys.exit("Rate drifted more than {} seconds".format(tolerance))
+
+count = 0
+start = time.perf_counter()
+
+for _ in periodic(hz, seconds):
+    count += 1
+
+print("periodic({}, {}) ran {} times in {:.4f} seconds".format(hz, seconds, count, time.perf_counter() - start))
+print("OK")
@@ -0,0 +1,116 @@
+# Sparki_Myro testing
+# benchmarks starting a program which uses Sparki: the time to import the library (broken down by module) and the
+# time from starting Python to a finished init() (broken down by phase) against the emulator in
+# sparki_learning.emulator, so no robot is needed (Linux and Mac only)
+#
+# exits with an error if either time is over its budget -- for example:
+#   python sparki_myro_test_startup.py --import-budget 50 --startup-budget 250
+from __future__ import print_function
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from sparki_learning.emulator import SparkiEmulator
+
+MODULES = ("sparki_learning", "sparki_learning.constants", "sparki_learning.util", "sparki_learning.sparki_myro",
+           "sparki_learning.gui", "sparki_learning.speak", "sparki_learning.sync_lib")
+PHASES = ("port_open", "init", "capabilities", "get_name", "cache_update", "total")
+
+# run in a new Python for each try; prints the time init() finished and how long each phase took
+STARTUP_PROGRAM = """
+import json, sys, time
+import sparki_learning.sparki_myro as sm
+sm.init(sys.argv[1], print_versions=True, use_cache=False)
+done = time.time()
+phases = sm.init_phase_times
+sm.disconnectSerial()
+print(json.dumps({"done": done, "phases": phases}))
+"""
+
+
+def importTimes():
+    """ Returns a dictionary of module -> (self, cumulative) milliseconds for one "import sparki_learning" """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import sparki_learning"],
+                            capture_output=True, text=True, check=True)
+    times = {}
+
+    for line in result.stderr.splitlines():
+        fields = [field.strip() for field in line.partition(":")[2].split("|")]
+
+        if len(fields) == 3 and fields[2] in MODULES:
+            times[fields[2]] = (int(fields[0]) / 1000, int(fields[1]) / 1000)
+
+    return times
+
+
+def startupTimes(port):
+    """ Returns (milliseconds from starting Python to the end of init(), dictionary of phase -> milliseconds) """
+    start = time.time()
+    result = subprocess.run([sys.executable, "-c", STARTUP_PROGRAM, port], capture_output=True, text=True,
+                            check=True)
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    return (report["done"] - start) * 1000, {phase: seconds * 1000 for phase, seconds in report["phases"].items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark importing sparki_learning and connecting to Sparki")
+    parser.add_argument("--tries", type=int, default=10, help="the number of times to time each (default 10)")
+    parser.add_argument("--import-budget", type=float, default=50.0,
+                        help="most milliseconds 'import sparki_learning' may take (default 50)")
+    parser.add_argument("--startup-budget", type=float, default=250.0,
+                        help="most milliseconds from starting Python to a finished init() (default 250)")
+    args = parser.parse_args()
+
+    # import times -- the fastest of the tries for each module, which is the least disturbed by the rest of the system
+    runs = [importTimes() for _ in range(args.tries)]
+
+    print("{:<30} {:>10} {:>10}".format("module", "self ms", "total ms"))
+
+    for module in MODULES:
+        times = [run[module] for run in runs if module in run]
+
+        if times:
+            print("{:<30} {:>10.2f} {:>10.2f}".format(module, min(t[0] for t in times), min(t[1] for t in times)))
+        else:
+            print("{:<30} {:>21}".format(module, "not imported"))
+
+    import_ms = min(run["sparki_learning"][1] for run in runs)
+
+    # startup times, against the emulator with motions taking no time
+    emulator = SparkiEmulator(name="Bench", time_scale=0)
+    emulator.start()
+
+    try:
+        runs = [startupTimes(emulator.port) for _ in range(args.tries)]
+    finally:
+        emulator.stop()
+
+    print()
+    print("{:<30} {:>10} {:>10}".format("init() phase", "median ms", "min ms"))
+
+    for phase in PHASES:
+        times = [run[1][phase] for run in runs if phase in run[1]]
+        print("{:<30} {:>10.2f} {:>10.2f}".format(phase, statistics.median(times), min(times)))
+
+    startup_ms = statistics.median(run[0] for run in runs)
+    print("{:<30} {:>10.2f} {:>10.2f}".format("python start to init() done", startup_ms, min(run[0] for run in runs)))
+
+    print()
+    failed = False
+
+    for name, measured, budget in (("import", import_ms, args.import_budget),
+                                   ("startup", startup_ms, args.startup_budget)):
+        status = "OK" if measured <= budget else "OVER BUDGET"
+        failed = failed or measured > budget
+        print("{} {:.1f} ms (budget {:.1f} ms) {}".format(name, measured, budget, status))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -33,6 +33,9 @@ setup(
     # installed or upgraded on the target machine
     install_requires = ['pyserial>=2.7', 'pysimplegui>=4.0.0'],
 
+    # recording runs (startRecording() and sparki_learning.trajectory) needs numpy, which the rest doesn't
+    extras_require = {'numpy': ['numpy>=1.15']},
+
     python_requires='>=3.0, <4',
 
     project_urls={
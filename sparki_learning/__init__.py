@@ -25,8 +25,33 @@ from sparki_learning.constants import *
 from sparki_learning.gui import *
 from sparki_learning.sparki_myro import *
 from sparki_learning.speak import speak
-from sparki_learning.sync_lib import get_client_start, start_sync_server, start_sync_client
+from sparki_learning.trace import addTraceHooks, removeTraceHooks, startTrace, stopTrace
 from sparki_learning.util import *
 
 import sparki_learning.constants
 import sparki_learning.sparki_myro
+
+
+def _lazy(module_name, function_name):
+    # returns a stand-in for a function which imports its module the first time it's called -- so that the module
+    # (and anything heavy it imports) is only loaded by programs which use it
+    def stand_in(*args, **kwargs):
+        import importlib
+        return getattr(importlib.import_module(module_name), function_name)(*args, **kwargs)
+
+    stand_in.__name__ = stand_in.__qualname__ = function_name
+    stand_in.__doc__ = "See {}.{}() (imported when first called)".format(module_name, function_name)
+    return stand_in
+
+
+get_client_start = _lazy("sparki_learning.sync_lib", "get_client_start")
+loadMap = _lazy("sparki_learning.occupancy", "loadMap")
+loadTrajectory = _lazy("sparki_learning.trajectory", "loadTrajectory")
+pathCurvature = _lazy("sparki_learning.trajectory", "pathCurvature")
+pathDeviation = _lazy("sparki_learning.trajectory", "pathDeviation")
+pathLength = _lazy("sparki_learning.trajectory", "pathLength")
+planRoute = _lazy("sparki_learning.planning", "planRoute")
+saveTrajectory = _lazy("sparki_learning.trajectory", "saveTrajectory")
+start_sync_client = _lazy("sparki_learning.sync_lib", "start_sync_client")
+start_sync_server = _lazy("sparki_learning.sync_lib", "start_sync_server")
+timeAtSpeed = _lazy("sparki_learning.trajectory", "timeAtSpeed")
@@ -0,0 +1,159 @@
+################## Sparki Learning Library Connection Cache ##################
+#
+# This file keeps a small cache, on disk, of the robots the library has connected to -- for each robot (known by
+# its bluetooth address, or its name, or by its port until either is known) it remembers the port it was last found
+# on, its library version and capabilities, its name and its motion calibration
+#
+# When init() connects on the port of a robot it has recently connected to, with the same library version, it takes
+# the robot's capabilities, name and calibration from the cache instead of asking for them (and doesn't write the
+# cache); initAuto() tries the ports of cached robots before searching every port -- this matters when a whole class
+# is connecting at once
+#
+# the cache is a JSON file (CACHE_FILE); delete it, or use clearConnectionCache(), if it gets confused
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+import os
+import threading
+import time
+
+from sparki_learning.util import *
+
+
+# ***** CONNECTION CACHE CONSTANTS ***** #
+CACHE_FILE = os.path.join(os.path.expanduser("~"), ".sparki_learning_cache.json")
+CACHE_MAX_AGE = 7 * 24 * 60 * 60  # seconds; an entry older than this is not trusted (but its port is still tried first)
+CACHE_FORMAT = 2  # bumped if the layout of the file changes; files of another format are ignored
+
+
+class ConnectionCache:
+    """ The robots the library has connected to, saved in filename
+
+        The file is read the first time the cache is used, and written whenever a robot is added or changed
+
+        arguments:
+        filename - string path of the cache file (defaults to CACHE_FILE)
+        max_age - float seconds for which an entry is fresh (defaults to CACHE_MAX_AGE)
+    """
+
+    def __init__(self, filename=CACHE_FILE, max_age=CACHE_MAX_AGE):
+        self.filename = filename
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.robots = None  # identity -> entry; None until the file is read
+
+    def clear(self):
+        """ Forgets every robot and deletes the cache file """
+        with self.lock:
+            self.robots = {}
+
+            try:
+                os.remove(self.filename)
+            except FileNotFoundError:
+                pass
+            except OSError as err:
+                printDebug("Unable to delete the connection cache " + str(self.filename) + ": " + str(err),
+                           DEBUG_WARN)
+
+    def isFresh(self, entry):
+        """ Returns True if entry (from lookup()) was saved within max_age seconds """
+        return entry is not None and 0 <= time.time() - entry.get("time", 0) <= self.max_age
+
+    def lookup(self, port):
+        """ Returns a copy of the most recent entry for the robot last found on port, or None
+
+            an entry is a dictionary with identity, port, version, capabilities, name, bluetooth, calibration and
+            time (seconds since the epoch)
+        """
+        with self.lock:
+            self._load()
+            found = [entry for entry in self.robots.values() if entry.get("port") == port]
+
+        if not found:
+            return None
+
+        return dict(max(found, key=lambda entry: entry.get("time", 0)))
+
+    def ports(self):
+        """ Returns the ports of the cached robots, most recently used first """
+        with self.lock:
+            self._load()
+            entries = sorted(self.robots.values(), key=lambda entry: entry.get("time", 0), reverse=True)
+
+        result = []
+
+        for entry in entries:
+            if entry.get("port") and entry["port"] not in result:
+                result.append(entry["port"])
+
+        return result
+
+    def update(self, port, **fields):
+        """ Records that a robot is on port, along with any other fields (version, capabilities, name, bluetooth,
+            calibration) and saves the cache
+
+            The robot is identified by its bluetooth address or, without one, by its name (without either, it's taken
+            to be the robot last on port); fields which aren't given are kept from the robot's previous entry -- never
+            from the entry of another robot
+        """
+        with self.lock:
+            self._load()
+
+            on_port = [entry for entry in self.robots.values() if entry.get("port") == port]
+            previous = max(on_port, key=lambda entry: entry.get("time", 0)) if on_port else {}
+
+            identity = fields.get("bluetooth") or fields.get("name") or previous.get("identity") or port
+            entry = dict(self.robots.get(identity, {}))
+            entry.update(fields)
+            entry["identity"] = identity
+            entry["port"] = port
+            entry["time"] = time.time()
+
+            # a port belongs to one robot at a time; the others keep their calibrations for when they're back (unless
+            # they were only known by the port)
+            for key, other in list(self.robots.items()):
+                if other.get("port") == port and key == port:
+                    del self.robots[key]
+                elif other.get("port") == port:
+                    other["port"] = None
+
+            self.robots[identity] = entry
+            self._save()
+
+    def _load(self):
+        # must be called with the lock held
+        if self.robots is not None:
+            return
+
+        import json  # imported here, rather than with the library, because the cache is only read by init()
+
+        self.robots = {}
+
+        try:
+            with open(self.filename) as f:
+                data = json.load(f)
+
+            if data.get("format") == CACHE_FORMAT:
+                self.robots = data.get("robots", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as err:
+            printDebug("Ignoring the connection cache " + str(self.filename) + ": " + str(err), DEBUG_WARN)
+
+    def _save(self):
+        # must be called with the lock held; written to a temporary file first so an interrupted save can't leave
+        # a half written cache
+        import json
+
+        temp_file = self.filename + ".tmp"
+
+        try:
+            with open(temp_file, "w") as f:
+                json.dump({"format": CACHE_FORMAT, "robots": self.robots}, f, indent=1)
+
+            os.replace(temp_file, self.filename)
+        except OSError as err:
+            printDebug("Unable to save the connection cache " + str(self.filename) + ": " + str(err), DEBUG_WARN)
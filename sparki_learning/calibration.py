@@ -0,0 +1,118 @@
+################## Sparki Learning Library Motion Calibration ##################
+#
+# This file holds the model of how long a particular Sparki takes to move and turn
+#
+# moveForwardcm(), moveBackwardcm() and turnBy() wait on the computer for as long as the motion should take. Without
+# calibration that's SECS_PER_CM and SECS_PER_DEGREE, which were estimated by watching a few robots -- most robots
+# finish sooner. calibrateMotion() times real motions (Sparki stops sending SYNC while it moves, so the first SYNC
+# after a silence marks the end of a motion) and fits a line of time against distance and against angle
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+from sparki_learning.constants import SECS_PER_CM, SECS_PER_DEGREE
+
+
+# ***** CALIBRATION CONSTANTS ***** #
+CALIBRATION_DISTANCES = (2, 4, 8, 12)  # centimeters moved (forward, then back) by calibrateMotion()
+CALIBRATION_ANGLES = (30, 60, 90, 180)  # degrees turned (clockwise, then back) by calibrateMotion()
+CALIBRATION_GAP = .1  # seconds without SYNC which means Sparki is moving; motions must take longer than this to time
+
+
+class MotionModel:
+    """ The time a motion takes is offset + seconds per unit * size, for moves (in cm) and turns (in degrees)
+
+        arguments:
+        secs_per_cm - float seconds to move 1 cm (defaults to SECS_PER_CM)
+        cm_offset - float seconds added to every move (defaults to 0)
+        secs_per_degree - float seconds to turn 1 degree (defaults to SECS_PER_DEGREE)
+        degree_offset - float seconds added to every turn (defaults to 0)
+    """
+
+    def __init__(self, secs_per_cm=SECS_PER_CM, cm_offset=0.0, secs_per_degree=SECS_PER_DEGREE, degree_offset=0.0):
+        self.secs_per_cm = secs_per_cm
+        self.cm_offset = cm_offset
+        self.secs_per_degree = secs_per_degree
+        self.degree_offset = degree_offset
+
+    @classmethod
+    def fromDict(cls, values):
+        """ Returns a MotionModel from the dictionary made by toDict() (the default model if values is None) """
+        if not values:
+            return cls()
+
+        return cls(float(values.get("secs_per_cm", SECS_PER_CM)), float(values.get("cm_offset", 0.0)),
+                   float(values.get("secs_per_degree", SECS_PER_DEGREE)), float(values.get("degree_offset", 0.0)))
+
+    def moveTime(self, centimeters):
+        """ Returns the seconds a move of centimeters takes """
+        return max(self.cm_offset + self.secs_per_cm * abs(centimeters), 0.0)
+
+    def toDict(self):
+        """ Returns the model as a dictionary (which can be saved as JSON) """
+        return {"secs_per_cm": self.secs_per_cm,
+                "cm_offset": self.cm_offset,
+                "secs_per_degree": self.secs_per_degree,
+                "degree_offset": self.degree_offset}
+
+    def turnTime(self, degrees):
+        """ Returns the seconds a turn of degrees takes """
+        return max(self.degree_offset + self.secs_per_degree * abs(degrees), 0.0)
+
+
+def fitLine(xs, ys):
+    """ Fits y = offset + slope * x by least squares
+
+        arguments:
+        xs - list of floats
+        ys - list of floats, the same length as xs
+
+        returns:
+        tuple - (offset, slope); None if there are fewer than 2 different xs
+    """
+    count = len(xs)
+
+    if count < 2:
+        return None
+
+    mean_x = sum(xs) / count
+    mean_y = sum(ys) / count
+    spread = sum((x - mean_x) ** 2 for x in xs)
+
+    if spread == 0:
+        return None
+
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+
+    return mean_y - slope * mean_x, slope
+
+
+def fitModel(moves, turns, model=None):
+    """ Returns a MotionModel fitted to timed motions
+
+        A part of the model which can't be fitted (too few motions, or a fit where bigger motions are faster) is
+        kept from model
+
+        arguments:
+        moves - list of (centimeters, seconds) pairs
+        turns - list of (degrees, seconds) pairs
+        model - MotionModel to start from (defaults to the default model)
+
+        returns:
+        MotionModel
+    """
+    result = MotionModel.fromDict(model.toDict() if model else None)
+
+    fit = fitLine([abs(cm) for cm, _ in moves], [secs for _, secs in moves])
+
+    if fit is not None and fit[1] > 0:
+        result.cm_offset, result.secs_per_cm = fit
+
+    fit = fitLine([abs(degrees) for degrees, _ in turns], [secs for _, secs in turns])
+
+    if fit is not None and fit[1] > 0:
+        result.degree_offset, result.secs_per_degree = fit
+
+    return result
@@ -21,10 +21,17 @@ TERMINATOR = chr(23)  # this character is at the end of every message to / from
 # ***** SYNC ***** #
 SYNC = chr(22)  # this character is sent by Sparki after every command completes so we know it's ready for the next
 
+# ***** MOTION EVENT ***** #
+EVENT = chr(21)  # from version 1.1.5, Sparki sends this followed by the milliseconds taken when a motion command finishes
+
+# ***** MOTION QUEUE ***** #
+MOTION_QUEUE_SIZE = 8  # from version 1.1.6, Sparki can hold this many motions (see QUEUE_MOTION); set in sparki_myro.ino
+
 # ***** MISCELLANEOUS VARIABLES ***** #
 SECS_PER_CM = .4  # number of seconds it takes sparki to move 1 cm; estimated from observation - may vary depending on batteries and robot
 SECS_PER_DEGREE = .03  # number of seconds it takes sparki to rotate 1 degree; estimated from observation - may vary depending on batteries and robot
 MAX_TRANSMISSION = 20  # maximum message length is 20 to conserve Sparki's limited RAM
+FLOAT_DECIMALS = 3  # floats are sent with at most this many decimal places (Sparki's floats only have about 7 digits)
 
 LCD_BLACK = 0  # set in Sparki.h
 LCD_WHITE = 1  # set in Sparki.h
@@ -80,7 +87,13 @@ COMMAND_CODES = {
     'SET_NAME': 'P',  # set the Sparki's name in the EEPROM - USE_EEPROM must be True
     'READ_EEPROM': 'Q',  # reads data as stored in the EEPROM - USE_EEPROM & EXT_LCD_1 must be True
     'WRITE_EEPROM': 'R',  # writes data to the EEPROM - USE_EEPROM & EXT_LCD_1 must be True
-    'NOOP': 'Z'  # does nothing and returns nothing - NOOP must be True
+    'NOOP': 'Z',  # does nothing and returns nothing - NOOP must be True
+    'QUEUE_MOTION': 'M',  # requires 4 arguments: char command (MOTORS, FORWARD_CM, BACKWARD_CM, TURN_BY, SERVO or
+    # BEEP) and the command's arguments as 3 floats (0 for those it doesn't have; SERVO also takes the seconds to
+    # wait for the servo); adds the motion to the queue Sparki runs whenever it's free; returns int number of motions
+    # in the queue (-1 if it's full); EVENT and an int when each queued motion finishes - MOTION_QUEUE must be True
+    'RUN_PROGRAM': 'N'  # requires 1 argument: int location of a program in the EEPROM (see program.py); runs it, stopping
+    # early if a command arrives; returns nothing; EVENT and an int when it ends - EEPROM_PROGRAMS must be True
 }
 # ***** END OF COMMAND CHARACTER CODES ***** #
 
@@ -113,38 +126,49 @@ MAX_GRIPPER_DISTANCE = 7.0
 EEPROM_BLUETOOTH_ADDRESS = 80
 EEPROM_NAME_MAX_CHARS = 20
 EEPROM_MAX_ADDRESS = 1023
+EEPROM_PROGRAM_START = 128  # programs stored by uploadProgram() go from here to EEPROM_MAX_ADDRESS
 
 # ***** SERVO POSITIONS ***** #
 SERVO_LEFT = -80
 SERVO_CENTER = 0
 SERVO_RIGHT = 80
+SERVO_SETTLE_TIME = .02  # seconds the servo takes to settle after a move, on top of the time to turn
+SERVO_SECS_PER_DEGREE = .002  # seconds the servo takes to turn 1 degree; hobby servos turn 60 degrees in about .1 s
+
+# ***** WAIT TIMING ***** #
+WAIT_TOLERANCE = .002  # seconds before the end of a wait() spent spinning instead of sleeping -- sleeping can wake up
+                       # about a millisecond late (up to 16 on versions of Windows before Python 3.11)
 
 # ***** TABLE OF CAPABILITIES ***** #
 # this dictionary stores the capabilities of various versions of the program running on the Sparki itself
 # this is used in init to update the capabilities of the Sparki -- you could use this so that the library can
 #   work with different versions of the Sparki library
-# The order of the fields is NO_ACCEL, NO_MAG, SPARKI_DEBUGS, USE_EEPROM, EXT_LCD_1, reserved, NOOP
+# The order of the fields is NO_ACCEL, NO_MAG, SPARKI_DEBUGS, USE_EEPROM, EXT_LCD_1, MOTION_EVENTS, NOOP, MOTION_QUEUE,
+#   EEPROM_PROGRAMS
 # If a version number contains a lower case r, everything after the r will be stripped when determining the capabilities
 #   for example, 1.1.2r1 and 1.1.2r5 will have the same capabilities
-SPARKI_CAPABILITIES = {"z": (True, True, False, False, False, False, False),
-                       "DEBUG": (True, True, True, False, False, False, False),
-                       "DEBUG-ACCEL": (False, True, True, False, False, False, False),
-                       "DEBUG-EEPROM": (True, True, True, True, False, False, False),
-                       "DEBUG-LCD": (False, False, True, False, True, False, False),
-                       "DEBUG-MAG": (True, False, True, False, False, False, False),
-                       "DEBUG-PING": (True, True, True, False, False, False, False),
-                       "0.2 No Mag / No Accel": (True, True, False, False, False, False, False),
-                       "0.8.3 Mag / Accel On": (False, False, False, False, False, False, False),
-                       "0.9.6": (False, False, False, True, False, False, False),
-                       "0.9.7": (False, False, False, True, False, False, False),
-                       "0.9.8": (False, False, False, True, False, False, False),
-                       "1.0.0": (False, False, False, True, False, False, False),
-                       "1.0.1": (False, False, False, True, True, False, False),
-                       "1.1.0": (False, False, False, True, True, False, False),
-                       "1.1.1": (False, False, False, True, True, False, False),
-                       "1.1.2": (False, False, False, True, True, False, False),
-                       "1.1.3": (False, False, False, True, True, False, True),
-                       "1.1.4": (False, False, False, True, True, False, True)}
+SPARKI_CAPABILITIES = {"z": (True, True, False, False, False, False, False, False, False),
+                       "DEBUG": (True, True, True, False, False, False, False, False, False),
+                       "DEBUG-ACCEL": (False, True, True, False, False, False, False, False, False),
+                       "DEBUG-EEPROM": (True, True, True, True, False, False, False, False, False),
+                       "DEBUG-LCD": (False, False, True, False, True, False, False, False, False),
+                       "DEBUG-MAG": (True, False, True, False, False, False, False, False, False),
+                       "DEBUG-PING": (True, True, True, False, False, False, False, False, False),
+                       "0.2 No Mag / No Accel": (True, True, False, False, False, False, False, False, False),
+                       "0.8.3 Mag / Accel On": (False, False, False, False, False, False, False, False, False),
+                       "0.9.6": (False, False, False, True, False, False, False, False, False),
+                       "0.9.7": (False, False, False, True, False, False, False, False, False),
+                       "0.9.8": (False, False, False, True, False, False, False, False, False),
+                       "1.0.0": (False, False, False, True, False, False, False, False, False),
+                       "1.0.1": (False, False, False, True, True, False, False, False, False),
+                       "1.1.0": (False, False, False, True, True, False, False, False, False),
+                       "1.1.1": (False, False, False, True, True, False, False, False, False),
+                       "1.1.2": (False, False, False, True, True, False, False, False, False),
+                       "1.1.3": (False, False, False, True, True, False, True, False, False),
+                       "1.1.4": (False, False, False, True, True, False, True, False, False),
+                       "1.1.5": (False, False, False, True, True, True, True, False, False),
+                       "1.1.6": (False, False, False, True, True, True, True, True, False),
+                       "1.1.7": (False, False, False, True, True, True, True, True, True)}
 
 ########### END OF CONSTANTS ###########
 
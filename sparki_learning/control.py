@@ -0,0 +1,165 @@
+################## Sparki Learning Library Line Follower ##################
+#
+# This file works out the wheel speeds which keep Sparki on a line from its line sensors, with a PID controller
+# (proportional, integral and derivative) on where the line is under the sensors
+#
+# Where the line is comes from all 5 sensors -- the average of their positions, weighted by how dark each one
+# reads -- so it changes smoothly as the line moves across them, rather than in steps of a whole sensor. The
+# readings are a round trip old by the time new wheel speeds reach the robot, so the controller steers for where
+# the line will be by then (where it is, plus how fast it's moving times the link's latency)
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+import math
+
+from sparki_learning.util import constrain
+
+
+# ***** LINE FOLLOWING CONSTANTS ***** #
+LINE_THRESHOLD = 500  # line sensor readings below this are over the (dark) line
+LINE_WEIGHTS = (-2, -1, 0, 1, 2)  # where each line sensor is (edge left, left, middle, right, edge right), in
+                                  # sensor spacings from the middle
+LINE_LOST = 3.0  # the position given to a line no sensor sees: past the edge sensor on the side it was last seen
+FOLLOW_RATE = 20  # times a second followLine() reads the line sensors
+FOLLOW_KP = .6  # wheel speed (-1 to 1) added to one wheel and taken from the other for each sensor spacing off
+FOLLOW_KI = 0.0  # ...for each sensor spacing off for a second (the proportional gain follows curves well on its own)
+FOLLOW_KD = .1  # ...for each sensor spacing per second the line is moving
+FOLLOW_INTEGRAL_LIMIT = 2.0  # sensor spacing seconds the integral is kept within, so it can't wind up
+FOLLOW_FILTER = .5  # how much of each new measurement of the line's speed is used (the rest is the last one)
+FOLLOW_DEADBAND = .03  # wheel speeds which change less than this aren't sent to the robot
+
+
+class LineFollower:
+    """ A PID controller which turns line sensor readings into wheel speeds
+
+        Call update() with each reading; it returns the wheel speeds to send to the motors (or None if they haven't
+        changed enough to be worth sending)
+
+        arguments:
+        speed - float wheel speed (0 to 1) on a straight line
+        kp - float proportional gain
+        ki - float integral gain
+        kd - float derivative gain
+        threshold - int line sensor readings below this are over the line
+        deadband - float wheel speed changes smaller than this aren't returned
+    """
+
+    def __init__(self, speed=1.0, kp=FOLLOW_KP, ki=FOLLOW_KI, kd=FOLLOW_KD, threshold=LINE_THRESHOLD,
+                 deadband=FOLLOW_DEADBAND):
+        self.speed = constrain(float(speed), 0.0, 1.0)
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.threshold = threshold
+        self.deadband = deadband
+        self.reset()
+
+    def reset(self):
+        """ Forgets the line's past positions, the wheel speeds sent and the statistics """
+        self.position = None  # sensor spacings right of the middle the line was last at (None before the first)
+        self.rate = 0.0  # sensor spacings per second the line is moving right
+        self.integral = 0.0
+        self.time = None  # when the last reading was taken
+        self.sent = None  # the wheel speeds last returned by update()
+        self.updates = 0
+        self.skipped = 0
+        self.readings = 0
+        self.error_total = 0.0
+        self.error_squares = 0.0
+        self.error_max = 0.0
+        self.lost_time = 0.0
+
+    def stats(self):
+        """ Returns how well the line has been followed since the LineFollower was made (or reset)
+
+            returns:
+            dictionary - "readings" (int), "updates" (int wheel speeds returned), "skipped" (int wheel speeds too close
+                         to the last to return), "error_mean", "error_rms" and "error_max" (float sensor spacings the
+                         line was from the middle; 0.5 is about half way to the next sensor) and "lost_time" (float
+                         seconds no sensor could see the line)
+        """
+        count = self.readings or 1
+
+        return {"readings": self.readings, "updates": self.updates, "skipped": self.skipped,
+                "error_mean": self.error_total / count, "error_rms": math.sqrt(self.error_squares / count),
+                "error_max": self.error_max, "lost_time": self.lost_time}
+
+    def update(self, readings, now, latency=0.0):
+        """ Returns the wheel speeds which steer toward the line
+
+            arguments:
+            readings - 5 ints from getLine()
+            now - float time the readings were taken (time.perf_counter())
+            latency - float seconds between taking the readings and the wheel speeds reaching the robot
+
+            returns:
+            (left, right) - floats from -1 to 1 to send to motors(); None if they're within deadband of the last ones
+        """
+        position = linePosition(readings, self.threshold)
+        dt = now - self.time if self.time is not None else 0.0
+
+        if position is None:  # lost: steer hard toward the side it was last seen on
+            position = math.copysign(LINE_LOST, self.position) if self.position else 0.0
+            self.lost_time += dt
+
+        if self.position is not None and dt > 0:
+            rate = (position - self.position) / dt
+            self.rate = FOLLOW_FILTER * rate + (1 - FOLLOW_FILTER) * self.rate
+            self.integral = constrain(self.integral + position * dt, -FOLLOW_INTEGRAL_LIMIT, FOLLOW_INTEGRAL_LIMIT)
+
+        self.position = position
+        self.time = now
+
+        self.readings += 1
+        self.error_total += abs(position)
+        self.error_squares += position * position
+        self.error_max = max(self.error_max, abs(position))
+
+        # steer for where the line will be when these speeds reach the robot
+        ahead = position + self.rate * latency
+        turn = self.kp * ahead + self.ki * self.integral + self.kd * self.rate
+
+        left, right = wheelSpeeds(self.speed, turn)
+
+        if self.sent is not None and abs(left - self.sent[0]) < self.deadband and \
+                abs(right - self.sent[1]) < self.deadband:
+            self.skipped += 1
+            return None
+
+        self.sent = (left, right)
+        self.updates += 1
+        return self.sent
+
+
+def linePosition(readings, threshold=LINE_THRESHOLD):
+    """ Returns where the line is under the line sensors, in sensor spacings right of the middle sensor (negative is
+        left) -- the average of the sensors' positions, weighted by how much darker than threshold each reads
+
+        arguments:
+        readings - 5 ints from getLine() (edge left, left, middle, right, edge right)
+        threshold - int readings below this are over the line
+
+        returns:
+        float; None if no sensor is over the line
+    """
+    darkness = [max(threshold - reading, 0) for reading in readings]
+    total = sum(darkness)
+
+    if total <= 0:
+        return None
+
+    return sum(weight * dark for weight, dark in zip(LINE_WEIGHTS, darkness)) / total
+
+
+def wheelSpeeds(speed, turn):
+    """ Returns (left, right) wheel speeds (-1 to 1) for going forward at speed while turning by turn (positive turns
+        clockwise) -- turn is added to the left wheel and taken from the right, and both are scaled down if either
+        would be faster than full speed
+    """
+    left, right = speed + turn, speed - turn
+    fastest = max(abs(left), abs(right), 1.0)
+
+    return left / fastest, right / fastest
@@ -0,0 +1,337 @@
+################## Sparki Learning Library Emulator ##################
+#
+# This file implements a stand-in for a Sparki running sparki_myro.ino, connected through a pseudo terminal (pty)
+# It is intended for measuring and testing the library without a robot -- it speaks the same protocol as the
+# robot (commands and arguments ended by TERMINATOR, SYNC sent whenever the robot is ready), and motion commands
+# take about as long as they would on a real Sparki (scaled by time_scale)
+#
+# pseudo terminals are only available on Linux and Mac
+#
+# for example:
+#   emulator = SparkiEmulator()
+#   emulator.start()
+#   init(emulator.port)
+#
+# or, from the command line, python -m sparki_learning.emulator will print the port to give to init() (give a
+# version, like python -m sparki_learning.emulator 1.1.7r1, to emulate firmware built with more features)
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+import os
+import random
+import threading
+import time
+
+from sparki_learning.constants import *
+from sparki_learning.program import PROGRAM_WAIT, expandProgram
+
+
+# ***** EMULATOR CONSTANTS ***** #
+EMULATOR_VERSION = "1.1.4r5"  # the version of sparki_myro.ino which is emulated -- the one it builds as shipped;
+                              # give version="1.1.7r1" for one built with MOTION_EVENTS, MOTION_QUEUE and
+                              # EEPROM_PROGRAMS defined
+EMULATOR_SYNC_INTERVAL = .005  # seconds between SYNCs when the emulated robot is idle
+EEPROM_NAME_START = 20  # set in sparki_myro.ino
+
+# the number of arguments which follow each command code; anything not listed has no arguments
+ARGUMENT_COUNTS = {COMMAND_CODES["BEEP"]: 2,
+                   COMMAND_CODES["GRIPPER_CLOSE_DIS"]: 1,
+                   COMMAND_CODES["GRIPPER_OPEN_DIS"]: 1,
+                   COMMAND_CODES["LCD_DRAW_PIXEL"]: 2,
+                   COMMAND_CODES["LCD_DRAW_STRING"]: 3,
+                   COMMAND_CODES["LCD_PRINT"]: 1,
+                   COMMAND_CODES["LCD_PRINTLN"]: 1,
+                   COMMAND_CODES["LCD_READ_PIXEL"]: 2,
+                   COMMAND_CODES["LCD_SET_COLOR"]: 1,
+                   COMMAND_CODES["MOTORS"]: 3,
+                   COMMAND_CODES["BACKWARD_CM"]: 1,
+                   COMMAND_CODES["FORWARD_CM"]: 1,
+                   COMMAND_CODES["SEND_IR"]: 1,
+                   COMMAND_CODES["SERVO"]: 1,
+                   COMMAND_CODES["SET_DEBUG_LEVEL"]: 1,
+                   COMMAND_CODES["SET_RGB_LED"]: 3,
+                   COMMAND_CODES["SET_STATUS_LED"]: 1,
+                   COMMAND_CODES["TURN_BY"]: 1,
+                   COMMAND_CODES["SET_NAME"]: 1,
+                   COMMAND_CODES["READ_EEPROM"]: 2,
+                   COMMAND_CODES["WRITE_EEPROM"]: 2,
+                   COMMAND_CODES["QUEUE_MOTION"]: 4,
+                   COMMAND_CODES["RUN_PROGRAM"]: 1}
+
+# the commands which may be put in the motion queue (see QUEUE_MOTION)
+QUEUED_MOTIONS = (COMMAND_CODES["BACKWARD_CM"], COMMAND_CODES["BEEP"], COMMAND_CODES["FORWARD_CM"],
+                  COMMAND_CODES["MOTORS"], COMMAND_CODES["SERVO"], COMMAND_CODES["TURN_BY"])
+
+
+class SparkiEmulator(threading.Thread):
+    """ Emulates a Sparki running sparki_myro.ino on a pseudo terminal
+
+        arguments:
+        version - string version of sparki_myro.ino to report (defaults to EMULATOR_VERSION)
+        name - string name stored in the emulated EEPROM
+        bluetooth - string bluetooth address stored in the emulated EEPROM (see bluetoothWrite()); optional
+        time_scale - float multiplier for the time motion commands take (0 makes them instant)
+        secs_per_cm - float seconds the emulated robot takes to move 1 cm
+        secs_per_degree - float seconds the emulated robot takes to turn 1 degree
+    """
+
+    def __init__(self, version=EMULATOR_VERSION, name="Sparki", time_scale=1.0, secs_per_cm=SECS_PER_CM,
+                 secs_per_degree=SECS_PER_DEGREE, bluetooth=None):
+        super(SparkiEmulator, self).__init__(name="sparki emulator", daemon=True)
+        import tty
+
+        self.version = version
+        capabilities = SPARKI_CAPABILITIES.get(version.partition('r')[0])
+        self.motion_events = bool(capabilities and capabilities[5])  # versions from 1.1.5 report when motions end
+        self.has_motion_queue = bool(capabilities and capabilities[7])  # versions from 1.1.6 have a motion queue
+        self.has_programs = bool(capabilities and capabilities[8])  # versions from 1.1.7 run programs in the EEPROM
+        self.time_scale = time_scale
+        self.secs_per_cm = secs_per_cm
+        self.secs_per_degree = secs_per_degree
+
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        os.set_blocking(self.master, False)
+        self.port = os.ttyname(self.slave)  # give this to init()
+
+        self.eeprom = bytearray(b"\xff" * (EEPROM_MAX_ADDRESS + 1))
+        self.writeEEPROM(EEPROM_NAME_START, name)
+
+        if bluetooth is not None:
+            self.writeEEPROM(EEPROM_BLUETOOTH_ADDRESS, bluetooth)
+
+        self.buffer = bytearray()
+        self.commands = []  # every (command, args) received, for inspection
+        self.servo_position = SERVO_CENTER
+        self.motion_queue = []  # (command, args) of each queued motion waiting to be run
+        self._stop_event = threading.Event()
+
+    def getToken(self):
+        """ Returns the next TERMINATOR ended token as a string, blocking until it arrives (None if stopped) """
+        while TERMINATOR.encode() not in self.buffer:
+            if not self.readInput(None):
+                return None
+
+        token, _, self.buffer = self.buffer.partition(TERMINATOR.encode())
+        return token.decode(errors="replace")
+
+    def motionDone(self, start_time):
+        """ Sends EVENT and the milliseconds since start_time, if the emulated version reports when motions end """
+        if self.motion_events:
+            self.write(EVENT.encode())
+            self.reply(int((time.perf_counter() - start_time) * 1000))
+
+    def motionTime(self, seconds):
+        """ Blocks for the (scaled) number of seconds a motion takes, like the robot does """
+        if seconds > 0 and self.time_scale > 0:
+            time.sleep(seconds * self.time_scale)
+
+    def readInput(self, timeout):
+        """ Reads whatever is waiting on the pty into the buffer; returns False if the emulator was stopped """
+        import select
+
+        while not self._stop_event.is_set():
+            ready, _, _ = select.select([self.master], [], [], EMULATOR_SYNC_INTERVAL if timeout is None else timeout)
+
+            if ready:
+                try:
+                    self.buffer += os.read(self.master, 1024)
+                except OSError:
+                    return False
+                return True
+            elif timeout is not None:
+                return True
+
+        return False
+
+    def readEEPROM(self, location, amount):
+        """ Returns amount bytes from the emulated EEPROM beginning at location, up to a TERMINATOR """
+        data = bytes(self.eeprom[location:location + amount])
+        return data.partition(TERMINATOR.encode())[0].partition(b"\xff")[0].decode(errors="replace")
+
+    def reply(self, *values):
+        """ Sends each value to the computer ended by a TERMINATOR """
+        for value in values:
+            if isinstance(value, float):
+                value = "{:.2f}".format(value)  # the Arduino prints floats with 2 decimal places
+
+            self.write((str(value) + TERMINATOR).encode())
+
+    def run(self):
+        while not self._stop_event.is_set():
+            if self.buffer:
+                self.step()
+            elif self.motion_queue:  # like the robot, queued motions are run only when no command is waiting
+                self.runQueuedMotion()
+
+            self.write(SYNC.encode())  # like loop() on the robot, SYNC is sent every time through
+
+            if not self.buffer and not self.readInput(0 if self.motion_queue else EMULATOR_SYNC_INTERVAL):
+                return
+
+    def runProgram(self, location):
+        """ Runs the program in the emulated EEPROM at location, like the robot -- stopping early if a command arrives
+            -- then reports that it's done
+        """
+        start_time = time.perf_counter()
+
+        for command, args in expandProgram(self.readEEPROM(location, EEPROM_MAX_ADDRESS + 1 - location)):
+            if not self.readInput(0) or self.buffer:
+                break
+
+            if command == PROGRAM_WAIT:  # like the robot, a wait ends early if a command arrives
+                deadline = time.perf_counter() + args[0] / 1000 * self.time_scale
+
+                while not self.buffer and time.perf_counter() < deadline:
+                    if not self.readInput(min(EMULATOR_SYNC_INTERVAL, max(deadline - time.perf_counter(), 0))):
+                        break
+            else:
+                self.runStep(command, args)
+
+        self.motionDone(start_time)
+
+    def runQueuedMotion(self):
+        """ Runs the motion at the front of the motion queue, then reports that it's done """
+        command, args = self.motion_queue[0]
+        start_time = time.perf_counter()
+
+        self.runStep(command, [float(arg) for arg in args])
+        self.motion_queue.pop(0)
+        self.motionDone(start_time)
+
+    def runStep(self, command, args):
+        """ Takes as long as a queued motion or a step of a program (other than a wait) takes (args are floats) """
+        if command == COMMAND_CODES["BEEP"]:
+            self.motionTime(args[1] / 1000)
+        elif command == COMMAND_CODES["MOTORS"]:
+            self.motionTime(args[2])
+        elif command in (COMMAND_CODES["FORWARD_CM"], COMMAND_CODES["BACKWARD_CM"]):
+            self.motionTime(abs(args[0]) * self.secs_per_cm)
+        elif command == COMMAND_CODES["SERVO"]:
+            self.servo_position = int(args[0])
+            self.motionTime(args[1])
+        elif command == COMMAND_CODES["TURN_BY"]:
+            self.motionTime(abs(args[0]) * self.secs_per_degree)
+
+    def step(self):
+        """ Reads and carries out one command, like one trip through loop() on the robot """
+        command = self.getToken()
+
+        if command is None:
+            return
+
+        args = []
+
+        for _ in range(ARGUMENT_COUNTS.get(command, 0)):
+            arg = self.getToken()
+
+            if arg is None:
+                return
+
+            args.append(arg)
+
+        self.commands.append((command, args))
+        self.execute(command, args)
+
+    def execute(self, command, args):
+        """ Carries out command with args (a list of strings) """
+        if command == COMMAND_CODES["INIT"]:
+            self.reply(self.version)
+        elif command == COMMAND_CODES["BEEP"]:
+            self.motionTime(int(args[1]) / 1000)
+        elif command == COMMAND_CODES["COMPASS"]:
+            self.reply(random.uniform(0, 360))
+        elif command in (COMMAND_CODES["GET_ACCEL"], COMMAND_CODES["GET_MAG"]):
+            self.reply(random.uniform(-1, 1), random.uniform(-1, 1), random.uniform(-1, 1))
+        elif command == COMMAND_CODES["GET_LIGHT"]:
+            self.reply(*[random.randint(0, 1000) for _ in range(3)])
+        elif command == COMMAND_CODES["GET_LINE"]:
+            self.reply(*[random.randint(0, 1000) for _ in range(5)])
+        elif command in (COMMAND_CODES["GRIPPER_CLOSE_DIS"], COMMAND_CODES["GRIPPER_OPEN_DIS"]):
+            self.motionTime(float(args[0]))
+        elif command == COMMAND_CODES["LCD_READ_PIXEL"]:
+            self.reply(0)
+        elif command == COMMAND_CODES["MOTORS"]:
+            start_time = time.perf_counter()
+            self.motionTime(float(args[2]))
+
+            if float(args[2]) >= 0:  # motors without a time return right away, so there's nothing to report
+                self.motionDone(start_time)
+        elif command in (COMMAND_CODES["FORWARD_CM"], COMMAND_CODES["BACKWARD_CM"]):
+            start_time = time.perf_counter()
+            self.motionTime(abs(float(args[0])) * self.secs_per_cm)
+            self.motionDone(start_time)
+        elif command == COMMAND_CODES["TURN_BY"]:
+            start_time = time.perf_counter()
+            self.motionTime(abs(float(args[0])) * self.secs_per_degree)
+            self.motionDone(start_time)
+        elif command == COMMAND_CODES["QUEUE_MOTION"] and self.has_motion_queue:
+            if len(self.motion_queue) < MOTION_QUEUE_SIZE and args[0] in QUEUED_MOTIONS:
+                self.motion_queue.append((args[0], args[1:]))
+                self.reply(len(self.motion_queue))
+            else:
+                self.reply(-1)
+        elif command == COMMAND_CODES["RUN_PROGRAM"] and self.has_programs:
+            self.runProgram(int(args[0]))
+        elif command == COMMAND_CODES["PING"]:
+            self.reply(random.randint(5, 100))
+        elif command == COMMAND_CODES["RECEIVE_IR"]:
+            self.reply(-1)
+        elif command == COMMAND_CODES["SERVO"]:
+            self.servo_position = int(args[0])
+        elif command == COMMAND_CODES["STOP"]:
+            self.motion_queue = []
+        elif command == COMMAND_CODES["GET_NAME"]:
+            self.reply(self.readEEPROM(EEPROM_NAME_START, EEPROM_NAME_MAX_CHARS))
+        elif command == COMMAND_CODES["SET_NAME"]:
+            self.writeEEPROM(EEPROM_NAME_START, args[0])
+        elif command == COMMAND_CODES["READ_EEPROM"]:
+            self.reply(self.readEEPROM(int(args[0]), int(args[1]) + 1))
+        elif command == COMMAND_CODES["WRITE_EEPROM"]:
+            self.writeEEPROM(int(args[0]), args[1])
+        elif command not in COMMAND_CODES.values() or command in (COMMAND_CODES["QUEUE_MOTION"],
+                                                                  COMMAND_CODES["RUN_PROGRAM"]):
+            self.write(TERMINATOR.encode())  # the robot ignores bad commands, but sends a TERMINATOR
+
+    def stop(self):
+        """ Stops the emulator and closes the pty """
+        self._stop_event.set()
+        self.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+    def write(self, data):
+        # if nothing is reading the port, the pty fills up; like a real serial port, the data is then lost
+        try:
+            os.write(self.master, data)
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._stop_event.set()
+
+    def writeEEPROM(self, location, data):
+        """ Writes the string data followed by a TERMINATOR to the emulated EEPROM at location """
+        data = data.encode() + TERMINATOR.encode()
+        self.eeprom[location:location + len(data)] = data
+
+
+def main():
+    import sys
+
+    emulator = SparkiEmulator(*sys.argv[1:2])
+    emulator.start()
+    print("Emulated Sparki (version {}) is on port {}".format(emulator.version, emulator.port))
+    print("Use init(\"{}\") in another program; press Control-C to stop".format(emulator.port))
+
+    try:
+        while emulator.is_alive():
+            emulator.join(1)
+    except KeyboardInterrupt:
+        emulator.stop()
+
+
+if __name__ == "__main__":
+    main()
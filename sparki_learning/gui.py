@@ -5,16 +5,42 @@
 # Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
 # remain property of their respective owners
 #
+# PySimpleGUI (and with it Tk) is imported the first time a window is needed, not when this file is imported, so
+# programs which don't use the gui don't pay for it -- and still work where no gui library is installed
+#
 # written by Jeremy Eglen
 # Created: November 14, 2019
-# Last Modified: April 10, 2020
+# Last Modified: October 19, 2026
 from sparki_learning.util import printDebug
 
 import sys
-import PySimpleGUI as sg
     
 import sparki_learning.util
 
+_sg = None  # the PySimpleGUI module, once it has been imported by _gui()
+
+
+def __getattr__(name):
+    # sparki_learning.gui.sg used to be imported with this file; it's still available, but only imported when used
+    if name == "sg":
+        return _gui()
+
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def _gui():
+    """ Returns the PySimpleGUI module, importing it the first time
+
+        raises ImportError if PySimpleGUI isn't installed (each function below falls back to text when it is)
+    """
+    global _sg
+
+    if _sg is None:
+        import PySimpleGUI
+        _sg = PySimpleGUI
+
+    return _sg
+
 def ask(message, mytitle="Question"):
     """ Gets input from the user -- prints message
 
@@ -28,11 +54,11 @@ def ask(message, mytitle="Question"):
     printDebug("In ask, message={}; mytitle={}".format(message, mytitle), sparki_learning.util.DEBUG_INFO)
 
     try:
-        result = sg.PopupGetText(message, title=mytitle)
+        result = _gui().PopupGetText(message, title=mytitle)
         
     except Exception as err:
         printDebug("Error creating ask window -- gui may not be available", sparki_learning.util.DEBUG_ERROR)
-        printDebug(str(err), DEBUG_DEBUG)
+        printDebug(str(err), sparki_learning.util.DEBUG_DEBUG)
         result = input(message)
 
     return result
@@ -53,6 +79,7 @@ def askQuestion(message, options, mytitle="Question"):
     radio_group = "options"
 
     try:
+        sg = _gui()
         radio = [[sg.Radio(text, radio_group, key=text),] for text in options]
         layout = [[sg.Text(message)]] + radio + [[sg.OK(), sg.Cancel()]]
         window = sg.Window(mytitle, layout)
@@ -124,7 +151,7 @@ def messageWindow(message, mytitle="Message"):
     printDebug("In messageWindow, message={}; mytitle={}".format(message, mytitle), sparki_learning.util.DEBUG_INFO)
 
     try:
-        sg.Popup(message, title=mytitle, keep_on_top=True)
+        _gui().Popup(message, title=mytitle, keep_on_top=True)
         
     except Exception as err:
         printDebug("Error creating message window -- gui may not be available", sparki_learning.util.DEBUG_ERROR)
@@ -144,7 +171,7 @@ def pickAFile(prompt="Choose a file"):
     printDebug("In pickAFile", sparki_learning.util.DEBUG_INFO)
 
     try:
-        result = sg.PopupGetFile(prompt)
+        result = _gui().PopupGetFile(prompt)
         
     except Exception as err:
         printDebug("Error creating pickAFile window -- gui may not be available", sparki_learning.util.DEBUG_ERROR)
@@ -166,7 +193,7 @@ def pickAFolder(prompt="Choose a folder"):
     printDebug("In pickAFolder", sparki_learning.util.DEBUG_INFO)
 
     try:
-        result = sg.PopupGetFolder(prompt)
+        result = _gui().PopupGetFolder(prompt)
         
     except Exception as err:
         printDebug("Error creating pickAFolder window -- gui may not be available", sparki_learning.util.DEBUG_ERROR)
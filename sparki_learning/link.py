@@ -0,0 +1,132 @@
+################## Sparki Learning Library Link Monitor ##################
+#
+# This file keeps track of the health of the Bluetooth link to Sparki
+#
+# The time between sending a command and the first byte of Sparki's reply is a sample of the round trip time (RTT)
+# of the link. Like TCP (RFC 6298), a smoothed RTT and its variation are kept, and the time to wait for SYNC
+# before deciding the link is dead is derived from them -- a healthy link does not wait longer than it needs to,
+# and a flaky one (one which has recently timed out) is given more time, and more tries, before the library
+# reconnects
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+import threading
+
+
+# ***** LINK MONITOR CONSTANTS ***** #
+LINK_ALPHA = 1 / 8  # weight of a new sample in the smoothed RTT (from RFC 6298)
+LINK_BETA = 1 / 4  # weight of a new sample in the RTT variation (from RFC 6298)
+LINK_K = 4  # the retransmission timeout is the smoothed RTT plus this many times the variation
+LINK_MIN_RTO = .05  # seconds; the smallest retransmission timeout
+LINK_SYNC_RTOS = 8  # the time to wait for SYNC is this many retransmission timeouts...
+LINK_SYNC_MARGIN = .1  # ...plus this many seconds, for Sparki to finish the command it's on and get back to its loop
+LINK_LOSS_WEIGHT = .1  # weight of each sync attempt in the loss rate
+LINK_MAX_BACKOFF = 8  # after timeouts, the retransmission timeout is doubled, up to this many times its normal value
+LINK_MIN_RETRIES = 1  # the times to wait for SYNC again before reconnecting on a link which hasn't been losing syncs
+LINK_MAX_RETRIES = 3  # the most times to wait for SYNC again before reconnecting (when every recent sync was lost)
+
+
+class LinkMonitor:
+    """ Keeps a smoothed round trip time for the link to Sparki and derives the time to wait for SYNC from it
+
+        Until the first sample arrives, syncTimeout() returns the default it is given (the library's old fixed
+        timeout), so the behavior on a new connection is unchanged
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reconnects = 0
+        self.reset()
+
+    def addReconnect(self):
+        """ Counts a reconnection to Sparki after the link failed """
+        with self.lock:
+            self.reconnects += 1
+
+    def addSample(self, rtt):
+        """ Adds a round trip time sample (float seconds) """
+        with self.lock:
+            if self.srtt is None:
+                self.srtt = rtt
+                self.rttvar = rtt / 2
+            else:
+                self.rttvar = (1 - LINK_BETA) * self.rttvar + LINK_BETA * abs(self.srtt - rtt)
+                self.srtt = (1 - LINK_ALPHA) * self.srtt + LINK_ALPHA * rtt
+
+            self.samples += 1
+            self.backoff = 1  # a good sample means the link is working again
+
+    def addSync(self, timed_out):
+        """ Counts an attempt to sync with Sparki; timed_out is True if no SYNC arrived in time """
+        with self.lock:
+            self.syncs += 1
+            self.loss_rate = (1 - LINK_LOSS_WEIGHT) * self.loss_rate + LINK_LOSS_WEIGHT * (1 if timed_out else 0)
+
+            if timed_out:
+                self.timeouts += 1
+                self.backoff = min(self.backoff * 2, LINK_MAX_BACKOFF)
+
+    def reset(self):
+        """ Forgets the round trip time and the counts (but not the number of reconnects) """
+        with self.lock:
+            self.srtt = None
+            self.rttvar = None
+            self.samples = 0
+            self.syncs = 0
+            self.timeouts = 0
+            self.loss_rate = 0.0
+            self.backoff = 1
+
+    def retries(self):
+        """ Returns the number of times to wait for SYNC again after a timeout before reconnecting
+
+            A link which hasn't been losing syncs gets LINK_MIN_RETRIES (so one slow SYNC doesn't cause a reconnect,
+            but a dead link is still reconnected quickly); a lossy one gets up to LINK_MAX_RETRIES
+        """
+        with self.lock:
+            return self._retries()
+
+    def rto(self, default):
+        """ Returns the retransmission timeout in seconds (default if there are no samples) """
+        with self.lock:
+            return self._rto(default)
+
+    def summary(self, default):
+        """ Returns a dictionary of the link health metrics; default is the timeout used without samples """
+        with self.lock:
+            return {"srtt": self.srtt,
+                    "rttvar": self.rttvar,
+                    "rto": self._rto(default),
+                    "sync_timeout": self._syncTimeout(default),
+                    "samples": self.samples,
+                    "syncs": self.syncs,
+                    "timeouts": self.timeouts,
+                    "loss_rate": self.loss_rate,
+                    "retries": self._retries(),
+                    "reconnects": self.reconnects}
+
+    def syncTimeout(self, default):
+        """ Returns the number of seconds to wait for SYNC; default (the most it will be) is used without samples """
+        with self.lock:
+            return self._syncTimeout(default)
+
+    def _retries(self):
+        return max(int(round(self.loss_rate * LINK_MAX_RETRIES)), LINK_MIN_RETRIES)
+
+    def _rto(self, default):
+        if self.srtt is None:
+            return default
+
+        return min(max(self.srtt + LINK_K * self.rttvar, LINK_MIN_RTO) * self.backoff, default)
+
+    def _syncTimeout(self, default):
+        if self.srtt is None:
+            return default
+
+        # a link which has been losing syncs gets proportionally longer before it's given up on
+        timeout = LINK_SYNC_MARGIN + self._rto(default) * LINK_SYNC_RTOS * (1 + LINK_K * self.loss_rate)
+
+        return min(timeout, default)
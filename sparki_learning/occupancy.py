@@ -0,0 +1,298 @@
+################## Sparki Learning Library Occupancy Grid ##################
+#
+# This file builds a map of the obstacles around Sparki from its ultrasonic sensor (an "occupancy grid")
+#
+# The area is divided into square cells, and each cell holds the log-odds that it's occupied -- log(p / (1 - p)),
+# which is 0 for a cell nothing is known about. Each reading of the sensor is a ray from the robot: the cells the
+# ray passes through are more likely free, and the cell where it ends (if it found something) is more likely
+# occupied. In log-odds, taking account of a reading is adding a number, so many readings which disagree (the
+# sensor is noisy) settle on the likely answer
+#
+# The rays of a whole scan are traced at once, with the line drawing of util.bresenham() done on arrays, and the
+# cells are kept in square tiles made only where a ray has been, so a map of a large area where the robot has only
+# seen a corridor is only as big as the corridor
+#
+# This file needs NumPy, which isn't needed by the rest of the library (pip install sparki_learning[numpy]); it's
+# only imported when a program uses it
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+import math
+import struct
+import zlib
+
+import numpy as np
+
+
+# ***** OCCUPANCY CONSTANTS ***** #
+OCCUPANCY_RESOLUTION = 2.0  # cm on each side of a cell
+OCCUPANCY_TILE = 64  # cells on each side of a tile
+OCCUPANCY_MAX_RANGE = 100.0  # cm; readings farther than this (or -1, nothing found) only mark the cells up to it free
+OCCUPANCY_HIT = .85  # log-odds added to the cell where a reading ends (a sensor right 70% of the time)
+OCCUPANCY_MISS = -.4  # log-odds added to each cell a reading passes through
+OCCUPANCY_LIMIT = 5.0  # log-odds are kept between -OCCUPANCY_LIMIT and OCCUPANCY_LIMIT, so a cell can change again
+OCCUPANCY_OCCUPIED = .65  # probability above which a cell is shown as occupied...
+OCCUPANCY_FREE = .45  # ...and below which it's shown as free (one reading passing through is enough)
+
+
+class OccupancyGrid:
+    """ A map of log-odds of occupancy, on the grid of moveTo() (x to the right, y ahead of where the robot started,
+        in cm)
+
+        arguments:
+        resolution - float cm on each side of a cell
+        tile_size - int cells on each side of a tile
+    """
+
+    def __init__(self, resolution=OCCUPANCY_RESOLUTION, tile_size=OCCUPANCY_TILE):
+        self.resolution = float(resolution)
+        self.tile_size = int(tile_size)
+        self.tiles = {}  # (tile x, tile y) -> tile_size x tile_size array of log-odds, indexed [y, x]
+
+    @classmethod
+    def load(cls, filename):
+        """ Returns the OccupancyGrid saved by save() in filename """
+        with np.load(filename) as saved:
+            grid = cls(float(saved["resolution"]), int(saved["tile_size"]))
+
+            for key, tile in zip(saved["keys"], saved["tiles"]):
+                grid.tiles[(int(key[0]), int(key[1]))] = tile.copy()
+
+        return grid
+
+    def addScan(self, x, y, heading, readings, max_range=OCCUPANCY_MAX_RANGE):
+        """ Adds readings of the ultrasonic sensor, all taken from one pose
+
+            Each cell is changed once for the whole scan, however many rays pass through it; a cell where a ray
+            ended is occupied, even if another ray passed through it
+
+            arguments:
+            x - float cm, the robot's x position
+            y - float cm, the robot's y position
+            heading - float degrees clockwise (as getAngle())
+            readings - list of (angle, distance) pairs, as from scan(); angle is the servo angle (positive is to the
+                       right) and distance is cm (-1 if nothing was found)
+            max_range - float cm
+        """
+        readings = np.asarray(readings, dtype="f8").reshape(-1, 2)
+        readings = readings[readings[:, 1] != 0]  # 0 isn't a reading the sensor can make
+
+        if len(readings) == 0:
+            return
+
+        hit = (readings[:, 1] > 0) & (readings[:, 1] < max_range)
+        lengths = np.where(hit, readings[:, 1], max_range)
+        directions = np.radians(heading + readings[:, 0])
+
+        start_x, start_y = self.cells(x, y)
+        end_x, end_y = self.cells(x + lengths * np.sin(directions), y + lengths * np.cos(directions))
+        cells_x, cells_y, ray, last = traceRays(int(start_x), int(start_y), end_x, end_y)
+
+        hit_cells = last & hit[ray]
+        hits = np.unique(cellKeys(cells_x[hit_cells], cells_y[hit_cells]))
+        misses = np.setdiff1d(cellKeys(cells_x[~hit_cells], cells_y[~hit_cells]), hits)
+
+        self._addLogOdds(misses, OCCUPANCY_MISS)
+        self._addLogOdds(hits, OCCUPANCY_HIT)
+
+    def bounds(self):
+        """ Returns (x, y, width, height) in cells of the area with tiles; (0, 0, 0, 0) if there are none """
+        if not self.tiles:
+            return 0, 0, 0, 0
+
+        keys = np.array(list(self.tiles))
+        low = keys.min(axis=0) * self.tile_size
+        high = (keys.max(axis=0) + 1) * self.tile_size
+
+        return int(low[0]), int(low[1]), int(high[0] - low[0]), int(high[1] - low[1])
+
+    def cells(self, x, y):
+        """ Returns the cell (as ints, or arrays of ints) holding the point x, y (in cm) """
+        return (np.floor(np.asarray(x, dtype="f8") / self.resolution).astype(np.int64),
+                np.floor(np.asarray(y, dtype="f8") / self.resolution).astype(np.int64))
+
+    def logOdds(self, x, y):
+        """ Returns the log-odds of the cells holding the points x, y (floats or arrays, in cm); 0 is unknown """
+        cells_x, cells_y = self.cells(x, y)
+        shape = np.shape(cells_x)
+        cells_x, cells_y = np.ravel(cells_x), np.ravel(cells_y)
+        result = np.zeros(len(cells_x), dtype="f4")
+
+        for key, which, local_x, local_y in self._byTile(cells_x, cells_y):
+            if key in self.tiles:
+                result[which] = self.tiles[key][local_y, local_x]
+
+        return result.reshape(shape) if shape else float(result[0])
+
+    def probability(self, x, y):
+        """ Returns the probability that the cells holding the points x, y (floats or arrays, in cm) are occupied;
+            .5 is unknown
+        """
+        return 1 / (1 + np.exp(-np.asarray(self.logOdds(x, y), dtype="f8")))
+
+    def save(self, filename):
+        """ Saves the grid to filename, a compressed .npz file """
+        keys = np.array(list(self.tiles), dtype=np.int64).reshape(-1, 2)
+        tiles = np.array([self.tiles[tuple(key)] for key in keys], dtype="f4").reshape(-1, self.tile_size,
+                                                                                         self.tile_size)
+        np.savez_compressed(filename, resolution=self.resolution, tile_size=self.tile_size, keys=keys, tiles=tiles)
+
+    def savePNG(self, filename, scale=4, robot=None):
+        """ Saves the grid as a greyscale PNG image: occupied cells are black, free cells white and unknown cells
+            grey, with y up
+
+            arguments:
+            filename - string name of the file
+            scale - int pixels on each side of a cell
+            robot - (x, y) in cm to mark with a black dot (defaults to no mark)
+        """
+        grid, x, y = self.toArray()
+        image = np.rint(255 / (1 + np.exp(grid))).astype(np.uint8)  # 255 * (1 - probability)
+
+        if robot is not None and image.size:
+            cell_x, cell_y = self.cells(*robot)
+            if 0 <= cell_x - x < image.shape[1] and 0 <= cell_y - y < image.shape[0]:
+                image[cell_y - y, cell_x - x] = 0
+
+        image = np.repeat(np.repeat(image[::-1], scale, axis=0), scale, axis=1)
+        writePNG(filename, image)
+
+    def toArray(self):
+        """ Returns the log-odds of the area with tiles as one array, indexed [y, x], with the cell x and y of
+            element [0, 0] -- (array, x, y)
+        """
+        low_x, low_y, width, height = self.bounds()
+        grid = np.zeros((height, width), dtype="f4")
+
+        for (tile_x, tile_y), tile in self.tiles.items():
+            left = tile_x * self.tile_size - low_x
+            bottom = tile_y * self.tile_size - low_y
+            grid[bottom:bottom + self.tile_size, left:left + self.tile_size] = tile
+
+        return grid, low_x, low_y
+
+    def toASCII(self, robot=None):
+        """ Returns the grid as text, a line for each row of cells with y up: # is occupied, . is free and a space
+            is unknown. Only the area which has been seen is shown
+
+            arguments:
+            robot - (x, y) in cm to mark with an R (defaults to no mark)
+        """
+        grid, x, y = self.toArray()
+        known = np.argwhere(grid != 0)
+
+        if len(known) == 0:
+            return ""
+
+        (bottom, left), (top, right) = known.min(axis=0), known.max(axis=0)
+        grid = grid[bottom:top + 1, left:right + 1]
+        chars = np.full(grid.shape, " ", dtype="<U1")
+        chars[grid > math.log(OCCUPANCY_OCCUPIED / (1 - OCCUPANCY_OCCUPIED))] = "#"
+        chars[grid < math.log(OCCUPANCY_FREE / (1 - OCCUPANCY_FREE))] = "."
+
+        if robot is not None:
+            cell_x, cell_y = self.cells(*robot)
+            row, column = cell_y - y - bottom, cell_x - x - left
+            if 0 <= row < chars.shape[0] and 0 <= column < chars.shape[1]:
+                chars[row, column] = "R"
+
+        return "\n".join("".join(line) for line in chars[::-1])
+
+    def _addLogOdds(self, keys, amount):
+        # adds amount to the log-odds of each cell in keys (from cellKeys()), making the tiles needed
+        cells_x, cells_y = keyCells(keys)
+
+        for key, which, local_x, local_y in self._byTile(cells_x, cells_y):
+            tile = self.tiles.get(key)
+
+            if tile is None:
+                tile = self.tiles[key] = np.zeros((self.tile_size, self.tile_size), dtype="f4")
+
+            tile[local_y, local_x] = np.clip(tile[local_y, local_x] + amount, -OCCUPANCY_LIMIT, OCCUPANCY_LIMIT)
+
+    def _byTile(self, cells_x, cells_y):
+        # yields (tile key, indices into the cells, x within the tile, y within the tile) for each tile the cells
+        # (arrays) are in
+        if len(cells_x) == 0:
+            return
+
+        tiles_x, local_x = np.divmod(cells_x, self.tile_size)
+        tiles_y, local_y = np.divmod(cells_y, self.tile_size)
+        keys = cellKeys(tiles_x, tiles_y)
+        order = np.argsort(keys, kind="stable")
+        starts = np.flatnonzero(np.r_[True, keys[order][1:] != keys[order][:-1]])
+
+        for which in np.split(order, starts[1:]):
+            yield (int(tiles_x[which[0]]), int(tiles_y[which[0]])), which, local_x[which], local_y[which]
+
+
+def cellKeys(cells_x, cells_y):
+    """ Returns one int64 for each cell x, y (arrays of ints between -2 ** 31 and 2 ** 31), to sort and compare them """
+    return (np.asarray(cells_x, dtype=np.int64) << 32) + (np.asarray(cells_y, dtype=np.int64) + 2 ** 31)
+
+
+def keyCells(keys):
+    """ Returns the cells (cells_x, cells_y) of keys from cellKeys() """
+    keys = np.asarray(keys, dtype=np.int64)
+    return keys >> 32, (keys & 0xFFFFFFFF) - 2 ** 31
+
+
+def loadMap(filename):
+    """ Returns the OccupancyGrid saved (with OccupancyGrid.save()) in filename """
+    return OccupancyGrid.load(filename)
+
+
+def traceRays(start_x, start_y, ends_x, ends_y):
+    """ Returns the cells on the lines from the cell start_x, start_y to each of the cells ends_x, ends_y (arrays), as
+        util.bresenham() finds them, for all the lines at once
+
+        arguments:
+        start_x - int
+        start_y - int
+        ends_x - array of ints
+        ends_y - array of ints
+
+        returns:
+        tuple - (cells x, cells y, the line each cell is on, True for the last cell of each line), arrays with an
+                element for each cell of each line (starts and ends included)
+    """
+    dx = np.asarray(ends_x, dtype=np.int64) - start_x
+    dy = np.asarray(ends_y, dtype=np.int64) - start_y
+    x_major = np.abs(dx) > np.abs(dy)  # as bresenham(), lines at 45 degrees step along y
+    major = np.where(x_major, np.abs(dx), np.abs(dy))
+    minor = np.where(x_major, np.abs(dy), np.abs(dx))
+
+    counts = major + 1
+    ray = np.repeat(np.arange(len(dx)), counts)
+    step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    # bresenham() moves one cell along the minor axis each time its error term reaches 0, which happens
+    # floor((2 * step * minor + major) / (2 * major)) times by the step-th cell
+    major_ray, minor_ray = major[ray], minor[ray]
+    across = (2 * step * minor_ray + major_ray) // np.maximum(2 * major_ray, 1)
+
+    x_sign = np.where(dx > 0, 1, -1)[ray]
+    y_sign = np.where(dy > 0, 1, -1)[ray]
+    x_major_ray = x_major[ray]
+    cells_x = start_x + x_sign * np.where(x_major_ray, step, across)
+    cells_y = start_y + y_sign * np.where(x_major_ray, across, step)
+
+    return cells_x, cells_y, ray, step == major_ray
+
+
+def writePNG(filename, image):
+    """ Saves image (a 2 dimensional array of uint8, the first row at the top) as a greyscale PNG file """
+    height, width = image.shape
+    rows = np.hstack((np.zeros((height, 1), dtype=np.uint8), image)).tobytes()  # each row starts with filter 0
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    with open(filename, "wb") as png:
+        png.write(b"\x89PNG\r\n\x1a\n")
+        png.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)))
+        png.write(chunk(b"IDAT", zlib.compress(rows)))
+        png.write(chunk(b"IEND", b""))
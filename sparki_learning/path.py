@@ -0,0 +1,494 @@
+################## Sparki Learning Library Path Optimizer ##################
+#
+# This file turns a list of grid moves (moveTo(), moveBy(), turnTo() and turnBy() on the x,y plane) into as few
+# turnBy() and moveForwardcm() commands as possible
+#
+# moveBy() always turns to the new heading, then moves, and then (with turnBack) turns back; a list of waypoints
+# done that way has turns of nearly nothing, turns which undo the one before, turns the long way round (turnTo()
+# from 10 degrees to 350 turns 340 degrees) and points along a straight line each moved to separately. Each of
+# those is a command which costs a round trip over Bluetooth and the time for the robot to start and stop
+#
+# optimizeMoves() plans from the robot's position and heading:
+#   - turns are added together and only made before a move (or at the end), the shorter way round
+#   - a move to a point which is on (within tolerance of) the line of the move before extends that move
+#   - moves shorter than tolerance are dropped (the next move starts from where the robot really is, so the
+#     error doesn't add up)
+#   - turns smaller than min_turn are dropped
+#
+# for drawing a function, sampleFunction() adds points only where the curve bends, and simplifyPath() (the
+# Ramer-Douglas-Peucker algorithm) removes the points which aren't needed to stay within a tolerance of the curve,
+# so the number of moves depends on the shape being drawn, not on how finely it was sampled
+#
+# arcMotion() works out the wheel speeds and time for Sparki to drive along an arc of a circle in one motors()
+# command, so a curve doesn't have to be made of stops, turns and moves
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+import math
+
+from sparki_learning.calibration import MotionModel
+from sparki_learning.util import wrapAngle
+
+
+# ***** PATH CONSTANTS ***** #
+PATH_TOLERANCE = .5  # centimeters; moves shorter than this are dropped, and points this close to a line are on it
+PATH_MIN_TURN = .5  # degrees; turns smaller than this are dropped
+PATH_COMMAND_OVERHEAD = .05  # seconds each command costs on top of the motion (sending it and waiting for SYNC)
+PATH_MIN_DEPTH = 3  # sampleFunction() splits each interval between x values in half at least this many times (so a
+                    # bend whose middle happens to be on the straight line isn't missed)...
+PATH_MAX_DEPTH = 8  # ...and at most this many times
+
+
+def arcMotion(radius, degrees, speed=1.0, model=None):
+    """ Returns the wheel speeds and time for Sparki to drive along an arc of a circle of radius cm (the path of the
+        middle of the robot), turning degrees (positive is clockwise) on the way
+
+        The outer wheel runs at up to speed; the inner wheel's speed sets the radius. Sparki's wheels turn at whole
+        percents, so the outer wheel may be slowed a little to find the pair of speeds nearest the radius, and the time
+        is worked out from those speeds (so the angle comes out right). An arc too wide for the speeds to differ is
+        driven straight
+
+        arguments:
+        radius - float cm; 0 turns in place
+        degrees - float degrees the heading changes
+        speed - float between -1.0 and 1.0; negative drives backward along the arc
+        model - MotionModel of the robot (defaults to the default model)
+
+        returns:
+        tuple - (left speed, right speed, seconds); the speeds are floats between -1.0 and 1.0, as motors() takes
+    """
+    model = model or MotionModel()
+    radius = abs(radius)
+    outer = min(abs(speed), 1.0)
+
+    # the robot moves forward at the average of its wheel speeds, and turns at their difference; it follows a circle
+    # of radius (outer + inner) / (outer - inner) * half_track
+    half_track = math.degrees(model.secs_per_degree) / model.secs_per_cm
+    ratio = (radius - half_track) / (radius + half_track)  # inner / outer
+    fastest = round(outer * 100)
+
+    if fastest == 0:
+        return 0.0, 0.0, 0.0
+
+    def error(wheels):
+        if wheels[0] == wheels[1]:
+            return math.inf
+        return abs((wheels[0] + wheels[1]) / (wheels[0] - wheels[1]) * half_track - radius)
+
+    # the whole percents nearest the radius, from full speed down to half speed
+    choices = [(speed_outer, round(speed_outer * ratio)) for speed_outer in range(fastest, (fastest - 1) // 2, -1)]
+    outer, inner = min(choices, key=error)  # the fastest of the best, since min() keeps the first
+
+    if outer == inner:  # too wide to curve; drive the length of the arc
+        seconds = math.radians(abs(degrees)) * radius * model.secs_per_cm * 100 / outer
+    else:
+        seconds = abs(degrees) * 2 * model.secs_per_degree * 100 / (outer - inner)
+
+    left, right = (outer, inner) if degrees >= 0 else (inner, outer)
+
+    if speed < 0:  # backward, the wheels swap roles to turn the same way
+        left, right = -right, -left
+
+    return left / 100, right / 100, seconds
+
+
+def arcThrough(dx, dy, heading, backward=False):
+    """ Returns the arc which starts along heading (forward, or backward if backward is True) and ends at a point
+        dx, dy away, as (radius, degrees) for arcMotion(), with the distance to the point along the way the robot
+        goes (negative if it's behind); degrees is 0 (and radius is infinite) if the point is straight ahead or behind
+
+        arguments:
+        dx - float cm
+        dy - float cm
+        heading - float degrees, as moveBy() uses
+        backward - boolean; True if the robot drives backward along the arc
+
+        returns:
+        tuple - (radius, degrees, distance)
+    """
+    direction = math.radians(heading + (180 if backward else 0))
+    ahead = dx * math.sin(direction) + dy * math.cos(direction)
+    right = dx * math.cos(direction) - dy * math.sin(direction)
+
+    if abs(right) < 1e-9:
+        return math.inf, 0.0, ahead
+
+    # the circle which touches the line of travel and passes through the point; the arc turns through twice the
+    # angle between the line of travel and the chord to the point
+    return (ahead ** 2 + right ** 2) / (2 * abs(right)), 2 * math.degrees(math.atan2(right, ahead)), ahead
+
+
+def commandsTime(commands, model=None, overhead=PATH_COMMAND_OVERHEAD):
+    """ Returns the estimated seconds a list of commands takes
+
+        arguments:
+        commands - list of ("turnBy", degrees) and ("moveForwardcm", centimeters) tuples
+        model - MotionModel of the robot (defaults to the default model)
+        overhead - float seconds each command costs on top of its motion
+
+        returns:
+        float - seconds
+    """
+    model = model or MotionModel()
+    total = 0.0
+
+    for name, amount in commands:
+        if name == "turnBy":
+            total += model.turnTime(amount) + overhead
+        else:
+            total += model.moveTime(amount) + overhead
+
+    return total
+
+
+def expandMoves(moves, x=0.0, y=0.0, heading=0.0):
+    """ Returns the commands moveTo(), moveBy(), turnTo() and turnBy() would send for moves, one after another
+
+        arguments:
+        moves - list of grid moves (see gridTargets())
+        x - float starting x position of the robot
+        y - float starting y position of the robot
+        heading - float starting heading of the robot (as from getAngle())
+
+        returns:
+        list of ("turnBy", degrees) and ("moveForwardcm", centimeters) tuples
+    """
+    commands = []
+
+    def turnTo(new_heading):
+        # as turnTo(): the difference between headings wrapped by wrapAngle() on the way, not the shortest turn
+        nonlocal heading
+        degrees = wrapAngle(wrapAngle(new_heading) - heading)
+
+        if degrees != 0:
+            commands.append(("turnBy", degrees))
+            heading = wrapAngle(heading + degrees)
+
+    for kind, a, b, turn_back in gridTargets(moves, x, y, heading):
+        if kind == "turn":
+            turnTo(a)
+            continue
+
+        dx, dy = a - x, b - y
+
+        if dx == 0 and dy == 0:  # moveBy() does nothing at all, not even turnBack
+            continue
+
+        old_heading = heading
+        turnTo(headingTo(dx, dy))
+        commands.append(("moveForwardcm", math.hypot(dx, dy)))
+        x, y = a, b
+
+        if turn_back:
+            turnTo(old_heading)
+
+    return commands
+
+
+def gridTargets(moves, x=0.0, y=0.0, heading=0.0):
+    """ Yields each grid move as ("move", x, y, turn_back) with x, y absolute, or ("turn", heading, None, False)
+
+        A grid move is one of:
+            (x, y) - the same as ("moveTo", x, y)
+            ("moveTo", x, y) or ("moveTo", x, y, turn_back)
+            ("moveBy", dx, dy) or ("moveBy", dx, dy, turn_back)
+            ("turnTo", heading)
+            ("turnBy", degrees)
+
+        arguments:
+        moves - list of grid moves
+        x - float starting x position of the robot, needed to make moveBy moves absolute
+        y - float starting y position of the robot
+        heading - float starting heading of the robot, needed to make turnBy moves absolute
+
+        returns:
+        generator of tuples
+    """
+    x, y, heading = float(x), float(y), float(heading)
+
+    for move in moves:
+        if len(move) == 2 and not isinstance(move[0], str):
+            move = ("moveTo",) + tuple(move)
+
+        kind = move[0]
+
+        if kind in ("moveTo", "moveBy") and len(move) in (3, 4):
+            turn_back = bool(move[3]) if len(move) == 4 else False
+
+            if kind == "moveBy":
+                x, y = x + float(move[1]), y + float(move[2])  # relative to the last target, as moveBy() is
+            else:
+                x, y = float(move[1]), float(move[2])
+
+            yield "move", x, y, turn_back
+        elif kind == "turnTo" and len(move) == 2:
+            heading = float(move[1])
+            yield "turn", heading, None, False
+        elif kind == "turnBy" and len(move) == 2:
+            heading += float(move[1])
+            yield "turn", heading, None, False
+        else:
+            raise ValueError(str(move) + " is not a grid move")
+
+
+def headingTo(dx, dy):
+    """ Returns the heading (in degrees, clockwise from the positive Y axis, as moveBy() uses) of the vector dx, dy """
+    return math.degrees(math.atan2(dx, dy))
+
+
+def optimizeMoves(moves, x=0.0, y=0.0, heading=0.0, tolerance=PATH_TOLERANCE, min_turn=PATH_MIN_TURN):
+    """ Returns the fewest turnBy() and moveForwardcm() commands which follow moves
+
+        The x and y in moveBy moves are relative to the target of the move before (as with moveBy(), which is
+        relative to where the robot is); the robot finishes within tolerance of the last target
+
+        arguments:
+        moves - list of grid moves (see gridTargets())
+        x - float starting x position of the robot
+        y - float starting y position of the robot
+        heading - float starting heading of the robot (as from getAngle())
+        tolerance - float centimeters; shorter moves are dropped, and points closer than this to a line are merged
+        min_turn - float degrees; smaller turns are dropped
+
+        returns:
+        list of ("turnBy", degrees) and ("moveForwardcm", centimeters) tuples
+    """
+    # the plan is a list of segments [heading, start, end, points]: turn to heading then move from start to end;
+    # points are the targets merged into the segment, which must all stay within tolerance of it
+    # turns (including turning back) are only made before a move, so turns with no move between them fold into one
+    plan = []
+    position = (float(x), float(y))
+    final_heading = float(heading)  # the heading the robot should face when it's done
+
+    for kind, a, b, turn_back in gridTargets(moves, x, y, heading):
+        if kind == "turn":
+            final_heading = a
+            continue
+
+        target = (a, b)
+        dx, dy = target[0] - position[0], target[1] - position[1]
+
+        if math.hypot(dx, dy) < tolerance:  # too short to move; the next move starts from position
+            continue
+
+        last = plan[-1] if plan else None
+
+        if last is not None and onLine(last[1], target, last[3] + [last[2]], tolerance):
+            last[0] = headingTo(target[0] - last[1][0], target[1] - last[1][1])
+            last[3].append(last[2])
+            last[2] = target
+        else:
+            plan.append([headingTo(dx, dy), position, target, []])
+
+        position = target
+
+        if not turn_back:
+            final_heading = plan[-1][0]
+
+    commands = []
+    facing = float(heading)
+
+    for segment_heading, start, end, _ in plan:
+        degrees = shortestTurn(segment_heading - facing)
+
+        if abs(degrees) >= min_turn:
+            commands.append(("turnBy", degrees))
+            facing += degrees
+
+        commands.append(("moveForwardcm", math.hypot(end[0] - start[0], end[1] - start[1])))
+
+    degrees = shortestTurn(final_heading - facing)
+
+    if abs(degrees) >= min_turn:
+        commands.append(("turnBy", degrees))
+
+    return commands
+
+
+def onLine(start, end, points, tolerance):
+    """ Returns True if every point is within tolerance of the segment from start to end, in order along it
+
+        arguments:
+        start - (x, y) tuple
+        end - (x, y) tuple
+        points - list of (x, y) tuples
+        tolerance - float distance
+
+        returns:
+        boolean
+    """
+    length = math.hypot(end[0] - start[0], end[1] - start[1])
+
+    if length < tolerance:
+        return False
+
+    ux, uy = (end[0] - start[0]) / length, (end[1] - start[1]) / length
+    along = 0.0
+
+    for px, py in points:
+        rx, ry = px - start[0], py - start[1]
+        projection = rx * ux + ry * uy
+
+        # off the line, or going back along it (which would need the robot to turn around)
+        if abs(rx * uy - ry * ux) > tolerance or projection < along - tolerance or projection > length + tolerance:
+            return False
+
+        along = max(along, projection)
+
+    return True
+
+
+def pathLegs(points, x=0.0, y=0.0, heading=0.0, tolerance=PATH_TOLERANCE, min_turn=PATH_MIN_TURN):
+    """ Yields the commands which drive through points one at a time, working out each as it's needed (so points
+        may be a generator of any length)
+
+        Points closer than tolerance to the last point reached are skipped, and turns smaller than min_turn are
+        dropped; turns are made the shorter way round
+
+        arguments:
+        points - iterator of (x, y) tuples
+        x - float starting x position of the robot
+        y - float starting y position of the robot
+        heading - float starting heading of the robot (as from getAngle())
+        tolerance - float centimeters
+        min_turn - float degrees
+
+        returns:
+        generator of ("turnBy", degrees, (x, y)) and ("moveForwardcm", centimeters, (x, y)) tuples, where x, y is
+        the position once the command is done
+    """
+    position = (float(x), float(y))
+    facing = float(heading)
+
+    for point in points:
+        target = (float(point[0]), float(point[1]))
+        dx, dy = target[0] - position[0], target[1] - position[1]
+        distance = math.hypot(dx, dy)
+
+        if distance < tolerance:
+            continue
+
+        degrees = shortestTurn(headingTo(dx, dy) - facing)
+
+        if abs(degrees) >= min_turn:
+            facing += degrees
+            yield "turnBy", degrees, position
+
+        position = target
+        yield "moveForwardcm", distance, position
+
+
+def sampleFunction(function, xvals, tolerance, scale=1, min_depth=PATH_MIN_DEPTH, max_depth=PATH_MAX_DEPTH):
+    """ Returns points on the graph of function, adding points between the x values wherever the graph bends away
+        from the straight line between them by more than tolerance
+
+        arguments:
+        function - function which calculates y given x
+        xvals - an iterator which holds the values of x to start from (at least the first and the last)
+        tolerance - float distance (after scaling) the straight lines between the points may be from the graph
+        scale - a multiplier for x and y
+        min_depth - int fewest times each interval between x values is split in half
+        max_depth - int most times each interval between x values is split in half
+
+        returns:
+        list of (x, y) tuples, scaled; points are only added where function returns a finite number
+    """
+    def point(x):
+        return x * scale, function(x) * scale
+
+    def addedPoint(x):
+        # a point between the x values given, which may be where the function isn't defined (e.g. math.sqrt(x) just
+        # below 0, or 1 / x near 0) -- None there, and the interval is left as it is
+        try:
+            p = point(x)
+            return p if math.isfinite(p[1]) else None
+        except (ArithmeticError, TypeError, ValueError):
+            return None
+
+    samples = [(x, point(x)) for x in xvals]
+    result = samples[:1]
+
+    for (x0, p0), (x1, p1) in zip(samples, samples[1:]):
+        # depth first, so the points come out in order: each entry is an interval still to be checked
+        intervals = [(x0, p0, x1, p1, 0)]
+
+        while intervals:
+            a, pa, b, pb, depth = intervals.pop()
+            middle = (a + b) / 2
+            pm = addedPoint(middle)
+
+            if pm is not None and (depth < min_depth or
+                                   (depth < max_depth and segmentDistance(pm, pa, pb) > tolerance)):
+                intervals.append((middle, pm, b, pb, depth + 1))
+                intervals.append((a, pa, middle, pm, depth + 1))
+            else:
+                result.append((b, pb))
+
+    return [p for _, p in result]
+
+
+def segmentDistance(point, start, end):
+    """ Returns the distance from point to the line segment from start to end (each an (x, y) tuple) """
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    length_squared = dx * dx + dy * dy
+
+    if length_squared == 0:
+        return math.hypot(point[0] - start[0], point[1] - start[1])
+
+    along = ((point[0] - start[0]) * dx + (point[1] - start[1]) * dy) / length_squared
+    along = min(max(along, 0.0), 1.0)
+
+    return math.hypot(point[0] - start[0] - along * dx, point[1] - start[1] - along * dy)
+
+
+def shortestTurn(degrees):
+    """ Returns the turn, between -180 and 180 degrees, which ends at the same heading as turning degrees """
+    degrees = math.fmod(degrees, 360)
+
+    if degrees > 180:
+        degrees -= 360
+    elif degrees <= -180:
+        degrees += 360
+
+    return degrees
+
+
+def simplifyPath(points, tolerance):
+    """ Returns the fewest of points (always keeping the first and the last) such that none of the points left out is
+        further than tolerance from the path through the ones kept (the Ramer-Douglas-Peucker algorithm)
+
+        arguments:
+        points - list of (x, y) tuples
+        tolerance - float distance
+
+        returns:
+        list of (x, y) tuples
+    """
+    points = list(points)
+
+    if len(points) < 3:
+        return points
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    spans = [(0, len(points) - 1)]  # ranges of points between two which are kept, still to be checked
+
+    while spans:
+        first, last = spans.pop()
+        furthest, distance = None, tolerance
+
+        for i in range(first + 1, last):
+            d = segmentDistance(points[i], points[first], points[last])
+
+            if d > distance:
+                furthest, distance = i, d
+
+        if furthest is not None:
+            keep[furthest] = True
+            spans.append((first, furthest))
+            spans.append((furthest, last))
+
+    return [p for p, kept in zip(points, keep) if kept]
@@ -0,0 +1,306 @@
+################## Sparki Learning Library Path Planner ##################
+#
+# This file finds a path for Sparki around the obstacles on a map (an OccupancyGrid from occupancy.py)
+#
+# The obstacles are first grown by the robot's radius ("inflated"), so the middle of the robot can go anywhere that
+# isn't an obstacle. A* then searches the cells of the map for a short path (moving to any of the 8 cells around,
+# without cutting the corner of an obstacle; weighted toward the goal, so it searches far fewer cells for a path which
+# is nearly the shortest), and the path is smoothed by skipping every point which can be seen from an earlier one --
+# leaving a few straight moves which moveTo() can drive
+#
+# The search keeps the map as one flat bytearray with a border of obstacles (so a neighbour never needs a bounds
+# check), and the smoothing checks each line of sight with the array line drawing of occupancy.traceRays()
+#
+# This file needs NumPy, which isn't needed by the rest of the library (pip install sparki_learning[numpy]); it's
+# only imported when a program uses it
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+import heapq
+import math
+
+import numpy as np
+
+from sparki_learning.occupancy import OCCUPANCY_OCCUPIED, traceRays
+
+
+# ***** PLANNING CONSTANTS ***** #
+PLANNING_ROBOT_RADIUS = 6.0  # cm from the middle of Sparki to its farthest side
+PLANNING_MARGIN = 10  # cells of unknown space around the map, the start and the goal which a path may use
+PLANNING_MAX_REPLANS = 20  # the most times planPath() plans again before giving up
+PLANNING_WEIGHT = 1.5  # aStar() trusts its estimate of the distance left this much more than the distance so far,
+                       # which finds a path at most this much longer than the shortest (before smoothing) -- usually
+                       # after searching a small part of the cells the shortest path needs
+PLANNING_LOOKAHEAD = 32  # smoothPath() checks the line of sight to each of this many cells ahead (and farther ones
+                         # at doubling distances)
+
+
+def aStar(blocked, start, goal, weight=PLANNING_WEIGHT):
+    """ Returns a short path between two cells of a map, moving to any of the 8 cells around each cell (diagonally
+        only if neither of the cells beside the diagonal is blocked)
+
+        arguments:
+        blocked - 2 dimensional NumPy array of booleans, indexed [y, x]; True where the robot can't go
+        start - (x, y) cell
+        goal - (x, y) cell
+        weight - float; 1 finds the shortest path, and more finds a path at most weight times as long, faster
+
+        returns:
+        list of (x, y) cells from start to goal; None if there's no path
+    """
+    height, width = blocked.shape
+    stride = width + 2  # a row of the map with its border
+
+    padded = np.zeros((height + 2, stride), dtype=np.uint8)
+    padded[1:-1, 1:-1] = ~blocked
+    free = bytearray(padded.tobytes())  # 1 where the robot can go; indexing a bytearray is faster than an array
+
+    source = (start[1] + 1) * stride + start[0] + 1
+    target = (goal[1] + 1) * stride + goal[0] + 1
+
+    if not free[source] or not free[target]:
+        return None
+
+    goal_x, goal_y = goal[0] + 1, goal[1] + 1
+    diagonal = math.sqrt(2)
+
+    # (step, cost, the two steps beside a diagonal step)
+    steps = [(1, 1.0, 0, 0), (-1, 1.0, 0, 0), (stride, 1.0, 0, 0), (-stride, 1.0, 0, 0),
+             (stride + 1, diagonal, stride, 1), (stride - 1, diagonal, stride, -1),
+             (-stride + 1, diagonal, -stride, 1), (-stride - 1, diagonal, -stride, -1)]
+
+    cost = [math.inf] * len(free)
+    cost[source] = 0.0
+    came_from = {}
+    closed = bytearray(len(free))
+    heap = [(0.0, 0.0, source)]  # (estimated total, estimate left -- so ties go to the cell nearer the goal, cell)
+    push, pop = heapq.heappush, heapq.heappop
+
+    while heap:
+        _, _, cell = pop(heap)
+
+        if cell == target:
+            break
+
+        if closed[cell]:
+            continue
+
+        closed[cell] = 1
+        cell_cost = cost[cell]
+
+        for step, step_cost, beside_a, beside_b in steps:
+            neighbour = cell + step
+
+            if not free[neighbour] or closed[neighbour]:
+                continue
+
+            if beside_a and not (free[cell + beside_a] and free[cell + beside_b]):
+                continue
+
+            new_cost = cell_cost + step_cost
+
+            if new_cost < cost[neighbour]:
+                cost[neighbour] = new_cost
+                came_from[neighbour] = cell
+
+                # octile distance: diagonal steps as far as they go, then straight
+                y, x = divmod(neighbour, stride)
+                dx, dy = abs(x - goal_x), abs(y - goal_y)
+                left = dx + dy + (diagonal - 2) * (dx if dx < dy else dy)
+                push(heap, (new_cost + weight * left, left, neighbour))
+    else:
+        return None
+
+    path = [target]
+
+    while path[-1] != source:
+        path.append(came_from[path[-1]])
+
+    return [(cell % stride - 1, cell // stride - 1) for cell in reversed(path)]
+
+
+def blockedCells(grid, bounds, robot_radius=PLANNING_ROBOT_RADIUS):
+    """ Returns where the middle of the robot can't go on an area of grid, as a NumPy array of booleans indexed
+        [y, x] -- the occupied cells (see occupiedCells()) grown by robot_radius
+
+        arguments:
+        grid - OccupancyGrid
+        bounds - (x, y, width, height) in cells
+        robot_radius - float cm
+
+        returns:
+        NumPy array of booleans
+    """
+    return inflate(occupiedCells(grid, bounds), robot_radius / grid.resolution)
+
+
+def inflate(occupied, radius):
+    """ Returns occupied (a 2 dimensional NumPy array of booleans) with every True cell grown into a disc of radius
+        cells
+    """
+    reach = int(math.ceil(radius))
+    height, width = occupied.shape
+    result = occupied.copy()
+
+    # OR in a copy of the map shifted by each offset in the disc
+    for dy in range(-reach, reach + 1):
+        for dx in range(-reach, reach + 1):
+            if (dx or dy) and dx * dx + dy * dy <= radius * radius:
+                result[max(dy, 0):height + min(dy, 0), max(dx, 0):width + min(dx, 0)] |= \
+                    occupied[max(-dy, 0):height + min(-dy, 0), max(-dx, 0):width + min(-dx, 0)]
+
+    return result
+
+
+def lineOfSight(blocked, start, end):
+    """ Returns True if no cell on the line between the cells start and end (each (x, y)) is blocked """
+    cells_x, cells_y, _, _ = traceRays(start[0], start[1], np.array([end[0]]), np.array([end[1]]))
+    return not blocked[cells_y, cells_x].any()
+
+
+def occupiedCells(grid, bounds):
+    """ Returns which cells of an area of grid are likely occupied, as a NumPy array of booleans indexed [y, x].
+        Cells nothing is known about are free
+
+        arguments:
+        grid - OccupancyGrid
+        bounds - (x, y, width, height) in cells
+
+        returns:
+        NumPy array of booleans
+    """
+    low_x, low_y, width, height = bounds
+    occupied = np.zeros((height, width), dtype=bool)
+    known, known_x, known_y = grid.toArray()
+
+    # the part of the map inside bounds
+    left, bottom = max(known_x, low_x), max(known_y, low_y)
+    right = min(known_x + known.shape[1], low_x + width)
+    top = min(known_y + known.shape[0], low_y + height)
+
+    if right > left and top > bottom:
+        threshold = math.log(OCCUPANCY_OCCUPIED / (1 - OCCUPANCY_OCCUPIED))
+        occupied[bottom - low_y:top - low_y, left - low_x:right - low_x] = \
+            known[bottom - known_y:top - known_y, left - known_x:right - known_x] > threshold
+
+    return occupied
+
+
+def pathClear(grid, points, robot_radius=PLANNING_ROBOT_RADIUS):
+    """ Returns True if the robot can still drive the straight lines through points (each (x, y), in cm) on grid --
+        for finding out whether a path has to be planned again after the map changes
+
+        arguments:
+        grid - OccupancyGrid
+        points - list of (x, y) in cm; the robot's position first
+        robot_radius - float cm
+
+        returns:
+        boolean
+    """
+    if len(points) < 2:
+        return True
+
+    cells = [tuple(int(value) for value in grid.cells(*point)) for point in points]
+    bounds = planningBounds(grid, cells, robot_radius)
+    blocked = blockedCells(grid, bounds, robot_radius)
+    cells = [(x - bounds[0], y - bounds[1]) for x, y in cells]
+
+    return all(lineOfSight(blocked, start, end) for start, end in zip(cells, cells[1:]))
+
+
+def planningBounds(grid, cells, robot_radius=PLANNING_ROBOT_RADIUS):
+    """ Returns (x, y, width, height) in cells of the area to plan on: the map, and cells (the start and goal), with
+        PLANNING_MARGIN cells (and the robot's radius) around them
+    """
+    margin = PLANNING_MARGIN + int(math.ceil(robot_radius / grid.resolution))
+    low_x, low_y, width, height = grid.bounds()
+    xs = [x for x, _ in cells] + ([low_x, low_x + width - 1] if width else [])
+    ys = [y for _, y in cells] + ([low_y, low_y + height - 1] if height else [])
+
+    return min(xs) - margin, min(ys) - margin, max(xs) - min(xs) + 2 * margin + 1, max(ys) - min(ys) + 2 * margin + 1
+
+
+def planRoute(grid, start, goal, robot_radius=PLANNING_ROBOT_RADIUS):
+    """ Returns a path for the robot from start to goal (each (x, y) in cm) around the obstacles on grid
+
+        arguments:
+        grid - OccupancyGrid
+        start - (x, y) in cm
+        goal - (x, y) in cm
+        robot_radius - float cm
+
+        returns:
+        list of (x, y) points in cm to move to, one after another, ending with goal (not including start); None if
+        there's no path (or the start or goal is inside an obstacle)
+    """
+    start_cell = tuple(int(value) for value in grid.cells(*start))
+    goal_cell = tuple(int(value) for value in grid.cells(*goal))
+    bounds = planningBounds(grid, [start_cell, goal_cell], robot_radius)
+    occupied = occupiedCells(grid, bounds)
+    blocked = inflate(occupied, robot_radius / grid.resolution)
+
+    def local(cell):
+        return cell[0] - bounds[0], cell[1] - bounds[1]
+
+    start_x, start_y = local(start_cell)
+
+    # the robot is already where it is, even if that's closer to an obstacle than its radius; it may move anywhere
+    # within its radius (which isn't itself occupied) to get away
+    if blocked[start_y, start_x]:
+        reach = robot_radius / grid.resolution
+        rows, columns = np.ogrid[:blocked.shape[0], :blocked.shape[1]]
+        blocked &= ((columns - start_x) ** 2 + (rows - start_y) ** 2 > reach * reach) | occupied
+
+    path = aStar(blocked, (start_x, start_y), local(goal_cell))
+
+    if path is None:
+        return None
+
+    path = smoothPath(blocked, path)
+
+    # the middle of each cell, in cm -- except the goal itself, which replaces a cell next to it
+    points = [((x + bounds[0] + .5) * grid.resolution, (y + bounds[1] + .5) * grid.resolution) for x, y in path[1:-1]]
+
+    if points and max(abs(points[-1][0] - goal[0]), abs(points[-1][1] - goal[1])) < grid.resolution * 1.5:
+        points.pop()
+
+    return points + [(float(goal[0]), float(goal[1]))]
+
+
+def smoothPath(blocked, path, lookahead=PLANNING_LOOKAHEAD):
+    """ Returns path (a list of (x, y) cells) with the cells dropped which can be reached in a straight line from the
+        cell kept before them
+
+        arguments:
+        blocked - 2 dimensional NumPy array of booleans, indexed [y, x]; True where the robot can't go
+        path - list of (x, y) cells, as from aStar()
+        lookahead - int cells ahead to check every one of; beyond that, cells at doubling distances are checked
+
+        returns:
+        list of (x, y) cells
+    """
+    if len(path) < 3:
+        return list(path)
+
+    cells = np.array(path)
+    result = [path[0]]
+    index = 0
+
+    while index < len(path) - 1:
+        # the lines of sight to the cells ahead, all at once; the farthest one which can be seen is kept (the next
+        # cell always can be)
+        ahead = np.arange(1, min(lookahead, len(path) - 1 - index) + 1)
+        farther = lookahead * 2 ** np.arange(1, max(int(math.log2(len(path))), 1) + 1)
+        ahead = np.concatenate((ahead, farther[farther < len(path) - 1 - index], [len(path) - 1 - index]))
+        later = cells[index + ahead]
+
+        cells_x, cells_y, ray, _ = traceRays(int(cells[index][0]), int(cells[index][1]), later[:, 0], later[:, 1])
+        hidden = np.bincount(ray, weights=blocked[cells_y, cells_x], minlength=len(later)) > 0
+        index += int(ahead[np.flatnonzero(~hidden)[-1]])
+        result.append(path[index])
+
+    return result
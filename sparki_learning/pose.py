@@ -0,0 +1,262 @@
+################## Sparki Learning Library Pose Estimator ##################
+#
+# This file keeps track of where Sparki is on the grid and which way it's facing (its "pose"), from every motion
+# command sent to it -- not just the grid commands
+#
+# Sparki has no wheel encoders, so the pose is worked out by dead reckoning: each motion command sets the speed of
+# the wheels (and, for a timed motion, for how long), and the pose is found by integrating a differential drive
+# model -- the robot moves forward at the average of its wheel speeds and turns at a rate set by their difference,
+# so it follows a straight line or an arc of a circle while the speeds don't change
+#
+# the compass can be used to correct the heading, which drifts the most (see addCompass())
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+import math
+import threading
+import time
+
+from array import array
+
+from sparki_learning.path import shortestTurn
+
+
+# ***** POSE CONSTANTS ***** #
+POSE_HISTORY_LENGTH = 10000  # the most poses kept in the history; the oldest half is dropped when it's full
+
+
+class PoseEstimator:
+    """ Integrates the motions sent to Sparki into its position (in cm on the grid) and heading (in degrees,
+        clockwise, where 0 is the heading at the start -- the same as getAngle())
+
+        A motion is either given by speed with addMotion() -- a velocity (cm per second forward) and a turn rate
+        (degrees per second clockwise), for a time or until the next motion -- or by amount with addMove() -- a
+        distance and a turn over a time. A timed motion given with queued=True starts when the one before ends
+
+        The history holds (time, x, y, heading) for every change of motion, in a flat array of doubles
+
+        arguments:
+        x - float starting x position
+        y - float starting y position
+        heading - float starting heading
+        history_length - int most poses kept in the history
+    """
+
+    def __init__(self, x=0.0, y=0.0, heading=0.0, history_length=POSE_HISTORY_LENGTH):
+        self.lock = threading.Lock()  # motions may be stopped by the timers of MotionHandles, in other threads
+        self.x = float(x)  # the pose at the start of the current motion...
+        self.y = float(y)
+        self.heading = float(heading)
+        self.time = time.perf_counter()  # ...which started at this time (time.perf_counter())
+        self.motion = (0.0, 0.0, None)  # (distance, degrees, duration) of a timed motion, or (velocity, turn rate,
+                                        # None) of a motion which goes on until the next
+        self.queued = []  # timed motions waiting for the current one to end
+        self.compass_weight = 0.0  # how much each compass reading corrects the heading; 0 ignores the compass
+        self.compass_offset = None  # the compass reading when the heading was 0
+        self.history = array('d')
+        self.history_length = history_length
+        self._record()
+
+    def addCompass(self, reading, now=None):
+        """ Corrects the heading toward a compass reading (in degrees), by compass_weight of the difference
+
+            The first reading after the weight is set (or the heading is set) only finds the compass heading at
+            which the pose's heading is 0
+        """
+        with self.lock:
+            now = self._advance(now)
+
+            if self.compass_weight <= 0:
+                return
+
+            x, y, heading = self._pose(now)
+
+            if self.compass_offset is None:
+                self.compass_offset = reading - heading
+                return
+
+            heading += self.compass_weight * shortestTurn(reading - self.compass_offset - heading)
+            self._start(now, x, y, heading, self._remaining(now))
+
+    def addMotion(self, velocity, turn_rate, duration=None, queued=False, now=None):
+        """ Starts a motion of velocity cm per second and turn_rate degrees per second (clockwise)
+
+            arguments:
+            velocity - float cm per second; negative is backward
+            turn_rate - float degrees per second; negative is counterclockwise
+            duration - float seconds the motion lasts (after which the robot stops); None if it doesn't stop
+            queued - boolean; if True and a timed motion is going, this one starts when that one ends
+            now - float time the motion starts (defaults to now)
+        """
+        if duration is None:
+            self._add((float(velocity), float(turn_rate), None), queued, now)
+        else:
+            duration = max(float(duration), 0.0)
+            self._add((velocity * duration, turn_rate * duration, duration), queued, now)
+
+    def addMove(self, distance, degrees, duration, queued=False, now=None):
+        """ Starts a motion which moves distance cm (negative is backward) while turning degrees (clockwise) over
+            duration seconds -- as moveForwardcm() and turnBy() do
+
+            arguments:
+            distance - float centimeters
+            degrees - float degrees
+            duration - float seconds
+            queued - boolean; if True and a timed motion is going, this one starts when that one ends
+            now - float time the motion starts (defaults to now)
+        """
+        self._add((float(distance), float(degrees), max(float(duration), 0.0)), queued, now)
+
+    def finish(self, now=None):
+        """ Ends the current timed motion now, because the robot reported it's done (even if it was expected to take
+            longer), and starts the next queued motion
+        """
+        with self.lock:
+            now = self._advance(now)
+
+            if self.motion[2] is not None:
+                x, y, heading = self._pose(now, self.motion[2])
+                self._start(now, x, y, heading, self.queued.pop(0) if self.queued else (0.0, 0.0, None))
+
+    def pose(self, now=None):
+        """ Returns (x, y, heading) at now (defaults to now) """
+        with self.lock:
+            now = self._advance(now)
+            return self._pose(now)
+
+    def remainingTime(self, now=None):
+        """ Returns the seconds until the timed motions (the current one and those queued after it) are expected to
+            end -- 0 if there are none, or if a motion without a time is going
+        """
+        with self.lock:
+            now = self._advance(now)
+
+            if self.motion[2] is None:
+                return 0.0
+
+            return self._remaining(now)[2] + sum(motion[2] for motion in self.queued)
+
+    def records(self):
+        """ Returns the history as a list of (time, x, y, heading) tuples """
+        with self.lock:
+            values = self.history.tolist()
+
+        return list(zip(values[0::4], values[1::4], values[2::4], values[3::4]))
+
+    def setPose(self, x=None, y=None, heading=None, now=None):
+        """ Sets any of x, y and heading (the others are left as they are); a motion going on carries on from there
+        """
+        with self.lock:
+            now = self._advance(now)
+            current = self._pose(now)
+
+            if heading is not None:
+                self.compass_offset = None
+
+            self._start(now, current[0] if x is None else x, current[1] if y is None else y,
+                        current[2] if heading is None else heading, self._remaining(now))
+
+    def settle(self, now=None):
+        """ Finishes the timed motions, because the robot is known to be done with them (it sent SYNC), even if
+            they were expected to take longer; a motion without a time goes on
+        """
+        with self.lock:
+            now = self._advance(now)
+
+            if self.motion[2] is None:
+                return
+
+            x, y, heading = self._pose(None, self.motion[2])
+
+            for motion in self.queued:
+                x, y, heading = moveAlong(x, y, heading, motion[0], motion[1])
+
+            self.queued = []
+            self._start(now, x, y, heading)
+
+    def stop(self, now=None):
+        """ Stops the robot now (dropping any motions waiting) """
+        with self.lock:
+            now = self._advance(now)
+            self.queued = []
+            self._start(now, *self._pose(now))
+
+    def _add(self, motion, queued, now):
+        with self.lock:
+            now = self._advance(now)
+
+            if queued and self.motion[2] is not None and motion[2] is not None:
+                self.queued.append(motion)
+            else:
+                self.queued = []
+                self._start(now, *self._pose(now), motion=motion)
+
+    def _advance(self, now):
+        # ends each timed motion which is over by now, starting the next queued motion (if any) when it ends;
+        # returns now (the current time if now is None)
+        now = time.perf_counter() if now is None else now
+
+        while self.motion[2] is not None and self.time + self.motion[2] <= now:
+            end = self.time + self.motion[2]
+            x, y, heading = self._pose(None, self.motion[2])
+            self._start(end, x, y, heading, self.queued.pop(0) if self.queued else (0.0, 0.0, None))
+
+        return now
+
+    def _pose(self, now, elapsed=None):
+        # the pose at now, or elapsed seconds into the current motion
+        distance, degrees, duration = self.motion
+
+        if elapsed is None:
+            elapsed = max(now - self.time, 0.0)
+
+        if duration is None:  # velocity and turn rate
+            distance, degrees = distance * elapsed, degrees * elapsed
+        elif elapsed < duration:
+            distance, degrees = distance * elapsed / duration, degrees * elapsed / duration
+
+        return moveAlong(self.x, self.y, self.heading, distance, degrees)
+
+    def _record(self):
+        if len(self.history) >= self.history_length * 4:
+            del self.history[:self.history_length // 2 * 4]
+
+        self.history.extend((self.time, self.x, self.y, self.heading))
+
+    def _remaining(self, now):
+        # the rest of the current motion after now, as a motion
+        distance, degrees, duration = self.motion
+
+        if duration is None:
+            return self.motion
+
+        left = max(duration - (now - self.time), 0.0)
+        fraction = left / duration if duration > 0 else 0.0
+
+        return distance * fraction, degrees * fraction, left
+
+    def _start(self, now, x, y, heading, motion=(0.0, 0.0, None)):
+        # starts motion at now from the pose x, y, heading
+        self.time = now
+        self.x, self.y, self.heading = float(x), float(y), float(heading)
+        self.motion = motion
+        self._record()
+
+
+def moveAlong(x, y, heading, distance, degrees):
+    """ Returns the pose (x, y, heading) after moving distance cm while turning degrees at a steady rate from the pose
+        x, y, heading -- along a straight line, or an arc of a circle
+    """
+    start = math.radians(heading)
+    end = math.radians(heading + degrees)
+
+    if abs(end - start) < 1e-9:
+        return x + distance * math.sin(start), y + distance * math.cos(start), heading + degrees
+
+    radius = distance / (end - start)
+
+    return x + radius * (math.cos(start) - math.cos(end)), y + radius * (math.sin(end) - math.sin(start)), \
+        heading + degrees
@@ -0,0 +1,179 @@
+################## Sparki Learning Library Programs ##################
+#
+# This file compiles a list of steps (motions, beeps, colors of the RGB LED and waits) into a program which Sparki
+# keeps in its EEPROM and runs by itself (from version 1.1.7 of the Sparki library) -- so a fixed routine, like a
+# dance or drawing a shape, runs as fast as the robot can go, without waiting on the bluetooth link between steps
+#
+# A program is text: each step is a one character code followed by its arguments, as numbers separated by commas.
+# The codes are the command codes of the same commands (from COMMAND_CODES), so C10L90 is moveForwardcm(10) and then
+# turnBy(90); w waits a number of milliseconds, and the steps between [ and ] are repeated (so [4C10L90] is a
+# square). In the EEPROM, the program comes after a short header which identifies it, so that a program already on
+# the robot doesn't need to be sent again
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+import zlib
+
+from sparki_learning.constants import *
+from sparki_learning.util import constrain
+
+
+# ***** PROGRAM CONSTANTS ***** #
+PROGRAM_WAIT = "w"  # waits a number of milliseconds (the other steps use the code of their command)
+PROGRAM_REPEAT = "["  # repeats the steps up to the matching PROGRAM_END_REPEAT a number of times
+PROGRAM_END_REPEAT = "]"
+PROGRAM_MAX_DEPTH = 4  # the most repeats inside one another; set in sparki_myro.ino
+PROGRAM_HEADER = "#"  # starts the header, which is followed by 4 hex digits identifying the program
+PROGRAM_HEADER_SIZE = 6  # bytes the header takes in the EEPROM (with its TERMINATOR); the program follows it
+PROGRAM_MAX_LENGTH = EEPROM_MAX_ADDRESS - EEPROM_PROGRAM_START - PROGRAM_HEADER_SIZE  # leaves room for a TERMINATOR
+PROGRAM_CHUNK = MAX_TRANSMISSION - 1  # the most characters of a program written to the EEPROM at once
+
+NUMBER_CHARACTERS = "-.0123456789"  # the characters of the numbers in a program; anything else is a code or a comma
+
+
+def compileProgram(steps, motion_model, servo_from=SERVO_CENTER):
+    """ Returns the program which makes a list of steps, and about how long it takes
+
+        arguments:
+        steps - list of steps, each one of ("moveForwardcm", centimeters), ("moveBackwardcm", centimeters),
+                ("turnBy", degrees), ("motors", left_speed, right_speed, time), ("servo", position),
+                ("beep", time, freq), ("setRGBLED", red, green, blue), ("wait", seconds) -- the same as calling that
+                function (motors needs a time) -- or ("repeat", times, steps) to make a list of steps times over
+        motion_model - the MotionModel used to work out how long motions take
+        servo_from - int position of the servo before the program starts
+
+        returns:
+        tuple - (string program, float estimated seconds); raises ValueError if a step can't be compiled or the
+                program is longer than PROGRAM_MAX_LENGTH
+    """
+    code, seconds, _ = compileSteps(steps, motion_model, frozenset([servo_from]), 0)
+
+    if len(code) > PROGRAM_MAX_LENGTH:
+        raise ValueError("The program is {} characters; Sparki has room for {}".format(len(code), PROGRAM_MAX_LENGTH))
+
+    return code, seconds
+
+
+def compileSteps(steps, motion_model, servo_from, depth):
+    """ Returns (string program, float seconds, frozenset servo positions) for steps (see compileProgram()) --
+        servo_from is the set of positions the servo may be at before them (more than one inside a repeat, where it
+        may be where the steps start or where they end), and the positions it may be at after them are returned
+    """
+    code = []
+    seconds = 0.0
+
+    for step in steps:
+        name = step[0]
+
+        if name == "repeat" and len(step) == 3 and depth < PROGRAM_MAX_DEPTH:
+            times = int(step[1])
+
+            if times < 1:
+                continue
+
+            _, _, ends = compileSteps(step[2], motion_model, servo_from, depth + 1)
+
+            if times > 1:  # after the first time through, the servo starts where the steps left it
+                servo_from = servo_from | ends
+
+            body, body_seconds, servo_from = compileSteps(step[2], motion_model, servo_from, depth + 1)
+
+            if body:
+                code.append(PROGRAM_REPEAT + formatNumber(times) + body + PROGRAM_END_REPEAT)
+                seconds += body_seconds * times
+
+            continue
+
+        values = [float(value) for value in step[1:]] if name != "repeat" else []
+
+        if name in ("moveForwardcm", "moveBackwardcm") and len(values) == 1:
+            centimeters = values[0] if name == "moveForwardcm" else -values[0]
+            command = COMMAND_CODES["FORWARD_CM"] if centimeters >= 0 else COMMAND_CODES["BACKWARD_CM"]
+            args, time = [abs(centimeters)], motion_model.moveTime(centimeters)
+        elif name == "turnBy" and len(values) == 1:
+            command, args, time = COMMAND_CODES["TURN_BY"], [values[0]], motion_model.turnTime(values[0])
+        elif name == "motors" and len(values) == 3 and values[2] >= 0:  # a motion without a time would never end
+            left_speed, right_speed = constrain(values[0], -1.0, 1.0), constrain(values[1], -1.0, 1.0)
+            command, args, time = COMMAND_CODES["MOTORS"], [int(left_speed * 100), int(right_speed * 100),
+                                                             values[2]], values[2]
+        elif name == "servo" and len(values) == 1:
+            position = int(constrain(values[0], SERVO_LEFT, SERVO_RIGHT))
+            time = SERVO_SETTLE_TIME + SERVO_SECS_PER_DEGREE * max(abs(position - start) for start in servo_from)
+            command, args = COMMAND_CODES["SERVO"], [position, time]
+            servo_from = frozenset([position])
+        elif name == "beep" and len(values) <= 2:  # beep()'s defaults are 200 ms at 2800 Hz
+            time_ms = int(constrain(values[0], 0, 10000)) if values else 200
+            freq = int(constrain(values[1], 0, 40000)) if len(values) == 2 else 2800
+            command, args, time = COMMAND_CODES["BEEP"], [freq, time_ms], time_ms / 1000
+        elif name == "setRGBLED" and len(values) == 3:
+            command, args, time = COMMAND_CODES["SET_RGB_LED"], [int(constrain(value, 0, 100)) for value in values], 0.0
+        elif name == "wait" and len(values) == 1 and values[0] >= 0:
+            command, args, time = PROGRAM_WAIT, [int(values[0] * 1000)], values[0]
+        else:
+            raise ValueError("Steps are (\"moveForwardcm\", cm), (\"moveBackwardcm\", cm), (\"turnBy\", degrees), "
+                             "(\"motors\", left, right, time), (\"servo\", position), (\"beep\", time, freq), "
+                             "(\"setRGBLED\", red, green, blue), (\"wait\", seconds) or (\"repeat\", times, steps) "
+                             "(up to {} deep), not {}".format(PROGRAM_MAX_DEPTH, step))
+
+        code.append(command + ",".join(formatNumber(arg) for arg in args))
+        seconds += time
+
+    return "".join(code), seconds, servo_from
+
+
+def expandProgram(code):
+    """ Returns a generator of the steps of a program as Sparki runs them (with each repeat made as many times as it
+        says), as (string code, list of float arguments) tuples
+    """
+    repeats = []  # (index after the PROGRAM_REPEAT's number, times still to go) of the repeats being made
+    index = 0
+
+    while index < len(code):
+        command = code[index]
+        index += 1
+        args = []
+
+        while index < len(code) and code[index] in NUMBER_CHARACTERS:
+            end = index
+
+            while end < len(code) and code[end] in NUMBER_CHARACTERS:
+                end += 1
+
+            args.append(float(code[index:end]))
+            index = end + 1 if code[end:end + 1] == "," else end
+
+        if command == PROGRAM_REPEAT:
+            if len(repeats) < PROGRAM_MAX_DEPTH:
+                repeats.append([index, int(args[0]) if args else 1])
+        elif command == PROGRAM_END_REPEAT:
+            if repeats:
+                repeats[-1][1] -= 1
+
+                if repeats[-1][1] > 0:
+                    index = repeats[-1][0]
+                else:
+                    repeats.pop()
+        else:
+            yield command, args
+
+
+def formatNumber(value):
+    """ Returns value as the shortest text which keeps 2 decimal places (e.g. 90.0 is "90", and .25 is "0.25") """
+    text = "{:.2f}".format(value).rstrip("0").rstrip(".")
+
+    return "0" if text in ("", "-0") else text
+
+
+def programChunks(code, location):
+    """ Returns a list of (location, string) pieces of code small enough to write to the EEPROM one at a time, for a
+        program stored at location
+    """
+    return [(location + start, code[start:start + PROGRAM_CHUNK]) for start in range(0, len(code), PROGRAM_CHUNK)]
+
+
+def programHeader(code):
+    """ Returns the header which identifies the program code -- PROGRAM_HEADER and 4 hex digits of its checksum """
+    return PROGRAM_HEADER + "{:04x}".format(zlib.crc32(code.encode()) & 0xffff)
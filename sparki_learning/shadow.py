@@ -0,0 +1,83 @@
+################## Sparki Learning Library Actuator Shadow ##################
+#
+# This file keeps a copy (a "shadow") of the state last sent to each of Sparki's actuators -- the wheels when they
+# run without a time, the servo, the RGB LED, the LCD color and the gripper -- so that a command which wouldn't change
+# anything (like motors(1, -.5) in a loop, or setRGBLED() with the color it already is) doesn't need to be sent
+#
+# The shadow learns from every command sendSerial() sends, not just the ones which are checked against it, so a
+# command which changes an actuator some other way (a timed move, a motion queued on the robot or a program it runs
+# changes the wheels or the servo; STOP stops the wheels and the gripper; the gamepad can change everything) makes its
+# state unknown. A state which isn't known never matches, so the next command for it is always sent
+#
+# The status LED isn't shadowed, because Sparki lights it while it works on each command
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+import threading
+
+from sparki_learning.constants import COMMAND_CODES
+
+
+# ***** SHADOW CONSTANTS ***** #
+# the actuator each shadowed command sets; the command's arguments are the actuator's new state
+SHADOW_ACTUATORS = {COMMAND_CODES["MOTORS"]: "wheels",
+                    COMMAND_CODES["SERVO"]: "servo",
+                    COMMAND_CODES["SET_RGB_LED"]: "rgb",
+                    COMMAND_CODES["LCD_SET_COLOR"]: "lcd_color",
+                    COMMAND_CODES["GRIPPER_STOP"]: "gripper"}
+
+# the actuators left in a state which isn't known by other commands
+SHADOW_FORGETS = {COMMAND_CODES["BACKWARD_CM"]: ("wheels",),
+                  COMMAND_CODES["FORWARD_CM"]: ("wheels",),
+                  COMMAND_CODES["TURN_BY"]: ("wheels",),
+                  COMMAND_CODES["GRIPPER_CLOSE_DIS"]: ("gripper",),
+                  COMMAND_CODES["GRIPPER_OPEN_DIS"]: ("gripper",),
+                  COMMAND_CODES["GAMEPAD"]: ("wheels", "servo", "rgb", "gripper"),
+                  COMMAND_CODES["QUEUE_MOTION"]: ("wheels", "servo"),
+                  COMMAND_CODES["RUN_PROGRAM"]: ("wheels", "servo", "rgb")}
+
+
+class ActuatorShadow:
+    """ Remembers the state last sent to each of Sparki's actuators
+
+        sent() is called with every command sent to Sparki; unchanged() tells whether a command would leave its
+        actuator as it is (so it can be skipped)
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()  # commands may be sent by the timers of MotionHandles, in other threads
+        self.state = {}  # actuator name to the arguments last sent to it; a missing actuator isn't known
+
+    def forget(self):
+        """ Forgets the state of every actuator (e.g. after reconnecting, when Sparki may have been restarted) """
+        with self.lock:
+            self.state = {}
+
+    def sent(self, command, args=None):
+        """ Records that command (a command code from COMMAND_CODES) was sent to Sparki with args """
+        with self.lock:
+            if command == COMMAND_CODES["MOTORS"] and float(args[2]) >= 0:
+                self.state.pop("wheels", None)  # timed: the wheels stop by themselves, at a time not known here
+            elif command == COMMAND_CODES["STOP"]:
+                self.state["wheels"] = [0, 0, -1.0]
+                self.state["gripper"] = []
+            elif command in SHADOW_ACTUATORS:
+                self.state[SHADOW_ACTUATORS[command]] = list(args or [])
+            else:
+                for actuator in SHADOW_FORGETS.get(command, ()):
+                    self.state.pop(actuator, None)
+
+    def unchanged(self, command, args=None):
+        """ Returns True if sending command (a command code from COMMAND_CODES) with args would leave its actuator in
+            the state it's known to be in
+        """
+        actuator = SHADOW_ACTUATORS.get(command)
+
+        if actuator is None:
+            return False
+
+        with self.lock:
+            return self.state.get(actuator) == list(args or [])
@@ -12,12 +12,13 @@
 #
 # written by Jeremy Eglen
 # Created: November 2, 2015
-# Last Modified: August 30, 2023
+# Last Modified: October 19, 2026
 # Originally developed on Python 3.4 and 3.5; this version modified to work with 3.6; should work on any version >3
 # working with Python 3.7, 3.8, and 3.10 at least
 # don't use Python 2!
 
 #import logging
+import glob
 import math
 import platform
 import sys
@@ -25,13 +26,36 @@ import serial  # developed with pyserial 2.7, but also works with later versions
 import threading
 import time
 
+from sparki_learning.cache import ConnectionCache
+from sparki_learning.calibration import CALIBRATION_ANGLES, CALIBRATION_DISTANCES, CALIBRATION_GAP, MotionModel, \
+    fitModel
 from sparki_learning.constants import *
+from sparki_learning.control import FOLLOW_KD, FOLLOW_KI, FOLLOW_KP, FOLLOW_RATE, LINE_THRESHOLD, LineFollower
+from sparki_learning.link import LinkMonitor
+from sparki_learning.path import PATH_MIN_TURN, PATH_TOLERANCE, arcMotion, arcThrough, commandsTime, expandMoves, \
+    gridTargets, optimizeMoves as optimizeGridMoves, pathLegs, sampleFunction, simplifyPath
+from sparki_learning.pose import PoseEstimator
+from sparki_learning.program import PROGRAM_HEADER_SIZE, PROGRAM_WAIT, compileProgram as assembleProgram, \
+    expandProgram, programChunks, programHeader
+from sparki_learning.shadow import ActuatorShadow
+from sparki_learning.stats import CommandRecorder, formatStats
+from sparki_learning.trace import traceModule
 from sparki_learning.util import *
 
 
 ########### GLOBAL VARIABLES ###########
 # ***** SERIAL TIMEOUT ***** #
 CONN_TIMEOUT = 1  # in seconds
+PROBE_TIMEOUT = 5  # seconds initAuto() waits for a Sparki to answer on each port (the ports are tried at the same time)
+PROBE_READ_TIMEOUT = .1  # seconds; how often a port being probed checks whether another port has already answered
+PROBE_MAX_THREADS = 16  # the most ports initAuto() tries at once
+MOTION_EVENT_SLACK = 2  # with MOTION_EVENTS, wait up to this many times the expected time of a motion for it to end
+MOTION_EVENT_MARGIN = 1  # seconds added to that, for short motions and a slow link
+ROBOT_TIMED_MOTIONS = False  # if True (and with MOTION_EVENTS), moves and turns given blocking=False are timed by
+                             # Sparki itself -- more exactly, but Sparki can't read the sensors or stop until they end
+BLOCKING_COMMANDS = (COMMAND_CODES["BACKWARD_CM"], COMMAND_CODES["FORWARD_CM"], COMMAND_CODES["MOTORS"],
+                     COMMAND_CODES["TURN_BY"], COMMAND_CODES["QUEUE_MOTION"], COMMAND_CODES["RUN_PROGRAM"])  # commands
+                     # during which Sparki may not send SYNC for as long as the motion takes
 
     
 # ***** COMPILE OPTIONS ***** #
@@ -44,10 +68,39 @@ SPARKI_DEBUGS = False  # setSparkiDebug()
 USE_EEPROM = False  # EEPROMread(), EEPROMwrite(), getName(), setName()
 EXT_LCD_1 = False  # EEPROMread(), EEPROMwrite(), LCDdrawLine(), LCDdrawString(), LCDreadPixel()
 NOOP = False  # noop() -- if False, noop is simulated with setStatusLED
+MOTION_EVENTS = False  # if True, Sparki reports when a motion finishes (otherwise the motion model guesses)
+MOTION_QUEUE = False  # queueMotions() -- if False, the motions are made one at a time
+EEPROM_PROGRAMS = False  # runProgram(), uploadProgram() -- if False, runProgram() makes the steps one at a time
 
 # ***** RUNTIME OPTIONS ***** #
 command_queue = []  # this stores every command sent to Sparki
 
+command_stats = CommandRecorder()  # this stores the count, bytes and timing histograms of every command sent to Sparki
+                                   # see getStats(), resetStats() and printStats()
+
+link_monitor = LinkMonitor()  # this keeps the smoothed round trip time to Sparki, which sets how long to wait for SYNC
+                              # see getLinkStats()
+reply_wait_start = None  # the time (time.perf_counter()) the last command was sent, until the first byte of its reply
+                         # arrives; used to measure the round trip time
+skipped_events = []  # float seconds of each motion EVENT getSerialBytes() found ahead of a reply (the last
+                    # MOTION_QUEUE_SIZE of them); queueMotions() takes the times of its motions from here
+robot_busy = False  # True from sending a motion (which Sparki may block on, without sending SYNC) until Sparki is
+                    # heard from again; waitForSync() doesn't shorten its timeout with the link monitor meanwhile
+
+connection_cache = ConnectionCache()  # this remembers the robots connected to (and their ports) between programs
+                                      # see init(), initAuto() and clearConnectionCache()
+
+motion_model = MotionModel()  # how long this robot takes to move and turn; loaded by init() from the connection
+                              # cache if the robot has been calibrated (see calibrateMotion())
+
+pose_estimator = PoseEstimator()  # this works out the robot's position and heading from every motion command sent
+                                  # to it; getPosition() and getAngle() read it (see trackMotion())
+
+trajectory_recorder = None  # the TrajectoryRecorder of the run being recorded (or last recorded) by startRecording()
+recording = False  # set to True by startRecording() and False by stopRecording()
+
+occupancy_map = None  # the OccupancyGrid of the obstacles found by scanMap()
+
 command_semaphore = None  # this locks the sparki such that only one command is sent at any time
                           # we care about commands being atomic -- not reads and/or writes, because
                           # a command may generate a data response from the robot
@@ -61,16 +114,27 @@ centimeters_moved = 0  # this stores the sum of centimeters moved forward or bac
 
 current_lcd_color = LCD_BLACK  # this is the color that an LCDdraw command will draw in -- can be LCD_BLACK or LCD_WHITE
 
-degrees_turned = 0  # this stores the sum of degrees turned using the turnBy() function; positive is clockwise
-# and negative is counterclockwise
-# can be set by setAngle() or retrieved with getAngle()
+degrees_turned = 0  # this stores the sum of degrees turned; positive is clockwise and negative is counterclockwise
+# can be set by setAngle() or retrieved with getAngle(); updated from pose_estimator by syncPose()
 
 in_motion = False  # set to True when moving -- note this is a guess set in motors(), stop() & turnBy()
 # this library is not multi-thread safe (for many reasons), so this doesn't need to be
 # set whenever the robot is actually moving -- only when the user can do something after it
 # starts moving
 
+current_motion = None  # the MotionHandle of the last motion started with blocking=False
+
+servo_position = SERVO_CENTER  # where the servo was last told to point (Sparki points it to the center when it starts)
+
+actuator_shadow = ActuatorShadow()  # the state last sent to the wheels, servo, RGB LED, LCD color and gripper, so
+                                    # commands which wouldn't change them can be skipped
+
+wait_tolerance = WAIT_TOLERANCE  # seconds before the end of a wait() spent spinning; see setWaitTolerance()
+wait_drift = 0.0  # the total seconds wait() and waitNoop() have ended late; see getWaitDrift()
+
 init_time = -1  # time when the robot was initialized
+init_phase_times = {}  # seconds the last init() spent in each phase: port_open, init (sending INIT and reading the
+                       # version), capabilities, get_name, cache_update and total; used by the startup benchmark
 
 robot_library_version = None  # version of the code on the robot
 
@@ -78,12 +142,12 @@ serial_port = None  # save the serial port on which we're connected
 serial_conn = None  # hold the pyserial object
 serial_is_connected = False  # set to true once connection is done
 robot_name = None # cache the robot's name
+robot_bluetooth = None  # the bluetooth address stored on the robot (see bluetoothRead()), once init() has read it
 
 xpos = 0  # for the moveBy(), moveTo(), getPosition() and setPosition() commands (the "grid commands"), these
 ypos = 0  # variables keep track of the current x,y position of the robot; each integer coordinate is 1cm, and
 # the robot starts at 0,0
-# note that these _only_ update with the grid commands (e.g. motors(1,1,1) will not change the xpos & ypos)
-# making these of limited value
+# these are updated from pose_estimator by syncPose(), so other motions (e.g. motors(1,1,1)) change them too
 ########### END OF GLOBAL VARIABLES ###########
 
 ########### INTERNAL FUNCTIONS ###########
@@ -189,6 +253,166 @@ class NoopThread(StoppableThread):
             return
 
 
+class MotionHandle:
+    """ Keeps track of a motion started with blocking=False (e.g. moveForwardcm(10, blocking=False))
+        Other commands (like reading the sensors) can be given while the motion goes on; when its time is up, the
+        computer tells the robot to stop
+
+        for example:
+          handle = moveForwardcm(30, blocking=False)
+          while not handle.done():
+              if getLine(LINE_CENTER) < 500:
+                  handle.cancel()
+
+        arguments:
+        duration - float number of seconds the motion takes
+        stop_robot - boolean whether the robot has to be told to stop when the time is up (False for the servo)
+        on_end - function called as on_end(fraction) when the motion ends, with the fraction of it that was done
+        robot_timed - boolean whether the robot times the motion itself and sends EVENT when it's done (with
+                      ROBOT_TIMED_MOTIONS and MOTION_EVENTS); the computer then waits for that rather than stopping
+                      the robot. Sparki can't be interrupted in such a motion, so cancel() waits for it to end, and
+                      commands given meanwhile are answered once it has
+
+        the estimated finish time (in time.perf_counter() seconds) is in finish_time
+    """
+
+    def __init__(self, duration, stop_robot=True, on_end=None, robot_timed=False):
+        self.duration = max(float(duration), 0.0)
+        self.start_time = time.perf_counter()
+        self.finish_time = self.start_time + self.duration
+        self.stop_robot = stop_robot and not robot_timed
+        self.on_end = on_end
+        self.robot_timed = robot_timed
+        self.cancelled = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._timer = threading.Timer(self.duration, self._expire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def cancel(self):
+        """ Stops the motion now; returns True if it was still going (False if it had already ended) """
+        if self.robot_timed:  # Sparki only reads the STOP once the motion is done, so just wait for the end
+            going = not self._done.is_set()
+            self._expire()
+            return going
+
+        with self._lock:
+            if self._done.is_set():
+                return False
+
+            self._timer.cancel()
+
+            if self.stop_robot and serial_is_connected:
+                with command_semaphore:
+                    sendSerial(COMMAND_CODES["STOP"])
+
+            self._finish(True)
+
+        return True
+
+    def done(self):
+        """ Returns True if the motion has ended """
+        # a program busy reading sensors can keep the timer from getting command_semaphore (the robot's own timed
+        # motions end when sendSerial() or the timer reads the EVENT, since that waits for the robot)
+        if self.overdue() and not self.robot_timed:
+            self._expire()
+
+        return self._done.is_set()
+
+    def overdue(self):
+        """ Returns True if the motion's time is up but the robot hasn't been told to stop yet """
+        return not self._done.is_set() and time.perf_counter() >= self.finish_time
+
+    def remaining(self):
+        """ Returns the estimated number of seconds until the motion ends """
+        if self._done.is_set():
+            return 0.0
+
+        return max(self.finish_time - time.perf_counter(), 0.0)
+
+    def wait(self, timeout=None):
+        """ Waits for the motion to end, or for timeout seconds (forever if timeout is None)
+            returns True if the motion has ended
+        """
+        return self._done.wait(timeout)
+
+    def _expire(self, semaphore_held=False):
+        # called by the timer when the motion's time is up, or by done() and sendSerial() if the timer is late
+        # if the caller already holds command_semaphore and the timer has the lock, the timer will stop the robot
+        # as soon as the semaphore is released (so this doesn't wait for the lock, which would deadlock)
+        if self.robot_timed:
+            self._awaitEvent(semaphore_held)
+            return
+
+        if not self._lock.acquire(not semaphore_held):
+            return
+
+        try:
+            if self._done.is_set():
+                return
+
+            if self.stop_robot and serial_is_connected:
+                try:
+                    if semaphore_held:
+                        sendSerial(COMMAND_CODES["STOP"])
+                    else:
+                        with command_semaphore:
+                            sendSerial(COMMAND_CODES["STOP"])
+                except (serial.SerialException, RuntimeError) as err:
+                    printDebug("In MotionHandle, unable to stop the robot: " + str(err), DEBUG_ERROR)
+
+            self._finish(False)
+        finally:
+            self._lock.release()
+
+    def _awaitEvent(self, semaphore_held):
+        # reads the EVENT Sparki sends at the end of a motion it times itself; command_semaphore is always taken
+        # before the lock here (nothing else can be sent until the robot is done anyway), so waiting for the lock
+        # can't deadlock
+        if not semaphore_held:
+            with command_semaphore:
+                self._awaitEvent(True)
+            return
+
+        with self._lock:
+            if self._done.is_set():
+                return
+
+            self._timer.cancel()
+
+            try:
+                if serial_is_connected:
+                    waitForMotion(self.duration)
+            finally:
+                self._finish(False)
+
+    def _finish(self, cancelled):
+        # must be called with the lock held
+        self.cancelled = cancelled
+
+        if cancelled and self.duration > 0:
+            fraction = min((time.perf_counter() - self.start_time) / self.duration, 1.0)
+        else:
+            fraction = 1.0
+
+        if self.on_end is not None:
+            self.on_end(fraction)
+
+        self._done.set()
+
+    def _supersede(self):
+        # ends the motion without stopping the robot, because another command has taken over the wheels -- except
+        # one the robot times itself, which it finishes first; sendSerial() waits for that
+        if self.robot_timed:
+            return
+
+        with self._lock:
+            if not self._done.is_set():
+                self._timer.cancel()
+                self._finish(True)
+
+
 def getSerialBytes():
     """ Returns bytes from the serial port up to TERMINATOR
     
@@ -198,13 +422,16 @@ def getSerialBytes():
         returns:
         string - created from bytes in the serial port
     """
+    global reply_wait_start
     global serial_conn
     global serial_is_connected
+    global skipped_events
 
     if not serial_is_connected:
         printDebug("Sparki is not connected - use init()", DEBUG_CRITICAL)
         raise RuntimeError
 
+    start_time = time.perf_counter()
     result = bytearray()
 
     try:
@@ -216,7 +443,24 @@ def getSerialBytes():
     printDebug("Getting Bytes... first byte is " + str(inByte), DEBUG_DEBUG)
 
     while inByte != TERMINATOR.encode():  # read until we see a TERMINATOR
-        if inByte != SYNC.encode():  # ignore it - we don't care about SYNCs
+        if inByte == EVENT.encode():  # a queued motion finished just before the reply -- keep its time aside
+            event = bytearray()
+            inByte = serial_conn.read()
+
+            while inByte and inByte != TERMINATOR.encode():
+                event += inByte
+                inByte = serial_conn.read()
+
+            try:
+                skipped_events.append(int(event) / 1000)
+                del skipped_events[:-MOTION_QUEUE_SIZE]
+            except ValueError:
+                printDebug("In getSerialBytes, bad motion event " + str(event), DEBUG_WARN)
+        elif inByte != SYNC.encode():  # ignore it - we don't care about SYNCs
+            if inByte and reply_wait_start is not None:  # the first byte of the reply is a sample of the round trip
+                link_monitor.addSample(max(time.perf_counter() - reply_wait_start, 0.0))
+                reply_wait_start = None
+
             result = result + inByte
 
         try:
@@ -228,6 +472,8 @@ def getSerialBytes():
         if inByte != SYNC.encode():
             printDebug("Next byte is " + str(inByte), DEBUG_DEBUG)
 
+    command_stats.addReply(time.perf_counter() - start_time, len(result) + 1)  # + 1 for the TERMINATOR
+
     printDebug("Finished fetching bytes, result is " + str(result), DEBUG_DEBUG)
     return result.decode()
 
@@ -317,6 +563,44 @@ def music_sunrise():
     beep(1000, 1047)
 
 
+def possiblePorts():
+    """ Returns a list of the ports on which a Sparki might be found
+
+        These are the serial ports the operating system reports, the Bluetooth serial ports (/dev/rfcomm*) on Linux
+        and the usual names for Sparki's Bluetooth port on Macs and Windows
+
+        arguments:
+        none
+
+        returns:
+        list - strings naming the ports
+    """
+    import serial.tools.list_ports  # imported here, rather than with the library, because only initAuto() needs it
+
+    currentOS = platform.system()
+
+    possible_ports = [port.device for port in serial.tools.list_ports.comports()]
+
+    if currentOS == "Darwin":
+        possible_ports += ["/dev/tty.ArcBotics-DevB", "/dev/tty.HC-06-DevB", "/dev/tty.ArcBotics-SPPDev"]
+    elif currentOS == "Windows":
+        possible_ports += ["COM" + str(x) for x in range(3, 11)]
+    else:
+        possible_ports += sorted(glob.glob("/dev/rfcomm*"))  # Bluetooth serial ports bound with rfcomm
+
+    result = []
+    seen = set()
+
+    for port in possible_ports:
+        key = port.upper() if currentOS == "Windows" else port  # Windows port names aren't case sensitive
+
+        if key not in seen:
+            seen.add(key)
+            result.append(port)
+
+    return result
+
+
 def printUnableToConnect():
     """ Prints a troubleshooting message
 
@@ -338,17 +622,152 @@ def printUnableToConnect():
     print("If you're testing your program, you can try setDebug(DEBUG_DEBUG) to get more error messages", file=sys.stderr)
 
 
-def sendSerial(command, args=None):
+def probePort(port, cancel):
+    """ Checks whether a Sparki is on port by opening it, waiting for SYNC and asking for the robot library version
+        The port is closed again afterwards -- use init() to connect
+
+        arguments:
+        port - string name of the port to check
+        cancel - threading.Event which, when set, makes this give up (because another port has answered)
+
+        returns:
+        string - the robot library version if a Sparki answered; otherwise None
+    """
+    printDebug("In probePort, port is " + str(port), DEBUG_DEBUG)
+
+    deadline = time.perf_counter() + PROBE_TIMEOUT
+
+    try:
+        conn = serial.Serial(port=port, baudrate=9600, timeout=PROBE_READ_TIMEOUT)
+    except (serial.SerialException, OSError, ValueError):
+        printDebug("In probePort, unable to open " + str(port), DEBUG_DEBUG)
+        return None
+
+    try:
+        inByte = None
+
+        while inByte != SYNC.encode():  # Sparki sends SYNC whenever it's ready for a command
+            if cancel.is_set() or time.perf_counter() > deadline:
+                return None
+
+            inByte = conn.read()
+
+        conn.write((COMMAND_CODES["INIT"] + TERMINATOR).encode())
+        conn.flush()
+
+        version = bytearray()
+        inByte = conn.read()
+
+        while inByte != TERMINATOR.encode():
+            if cancel.is_set() or time.perf_counter() > deadline:
+                return None
+
+            if inByte and inByte != SYNC.encode():
+                version += inByte
+
+            inByte = conn.read()
+
+        return version.decode(errors="replace") or None
+    except (serial.SerialException, OSError):
+        printDebug("In probePort, error reading " + str(port), DEBUG_DEBUG)
+        return None
+    finally:
+        conn.close()
+
+
+def probePorts(ports):
+    """ Checks all of ports for a Sparki at the same time (see probePort())
+
+        arguments:
+        ports - list of strings naming the ports to check
+
+        returns:
+        string - the first port on which a Sparki answered; None if there was none
+    """
+    import concurrent.futures  # imported here, rather than with the library, because only initAuto() needs it
+
+    printDebug("In probePorts, ports are " + str(ports), DEBUG_DEBUG)
+
+    if not ports:
+        return None
+
+    # the first port on which a Sparki answers wins, and the others give up
+    successful_port = None
+    cancel = threading.Event()
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(len(ports), PROBE_MAX_THREADS))
+    probes = {executor.submit(probePort, port, cancel): port for port in ports}
+    pending = set(probes)
+
+    while pending and successful_port is None:
+        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+
+        for probe in done:
+            if probe.result() is None:
+                printDebug("{} is not the correct port".format(probes[probe]), DEBUG_DEBUG)
+            elif successful_port is None:
+                successful_port = probes[probe]
+
+    cancel.set()
+
+    for probe in pending:
+        probe.cancel()
+
+    executor.shutdown(wait=False)  # probes which are still opening a port will finish on their own
+
+    return successful_port
+
+
+def queuedMotion(motion, servo_from):
+    """ Returns how to put a motion in Sparki's motion queue (see queueMotions())
+
+        arguments:
+        motion - a tuple of a function name and its arguments, like ("turnBy", 90)
+        servo_from - int position of the servo before the motion (to work out how long the servo takes to turn)
+
+        returns:
+        tuple - (string command code, list of 3 arguments, float seconds the motion should take)
+    """
+    name, values = motion[0], [float(value) for value in motion[1:]]
+
+    if name in ("moveForwardcm", "moveBackwardcm") and len(values) == 1:
+        centimeters = values[0] if name == "moveForwardcm" else -values[0]
+        command = COMMAND_CODES["FORWARD_CM"] if centimeters >= 0 else COMMAND_CODES["BACKWARD_CM"]
+        return command, [abs(centimeters), 0, 0], motion_model.moveTime(centimeters)
+    elif name == "turnBy" and len(values) == 1:
+        return COMMAND_CODES["TURN_BY"], [values[0], 0, 0], motion_model.turnTime(values[0])
+    elif name == "motors" and len(values) == 3 and values[2] >= 0:  # a motion without a time would never end
+        left_speed, right_speed = constrain(values[0], -1.0, 1.0), constrain(values[1], -1.0, 1.0)
+        return COMMAND_CODES["MOTORS"], [int(left_speed * 100), int(right_speed * 100), values[2]], values[2]
+    elif name == "servo" and len(values) == 1:
+        position = int(constrain(values[0], SERVO_LEFT, SERVO_RIGHT))
+        settle = servoSettleTime(position - servo_from)
+        return COMMAND_CODES["SERVO"], [position, round(settle, 3), 0], settle
+    elif name == "beep" and len(values) <= 2:  # beep()'s defaults are 200 ms at 2800 Hz
+        time_ms = int(constrain(values[0], 0, 10000)) if values else 200
+        freq = int(constrain(values[1], 0, 40000)) if len(values) == 2 else 2800
+        return COMMAND_CODES["BEEP"], [freq, time_ms, 0], time_ms / 1000
+
+    printDebug("In queuedMotion, " + str(motion) + " can't be queued", DEBUG_ERROR)
+    raise ValueError("Motions to queue are (\"moveForwardcm\", cm), (\"moveBackwardcm\", cm), (\"turnBy\", degrees), "
+                     "(\"motors\", left, right, time), (\"servo\", position) or (\"beep\", time, freq), not "
+                     + str(motion))
+
+
+def sendSerial(command, args=None, sync=True):
     """ Sends the command with the args over a serial connection
         
         arguments:
         command - a character command code as defined at the top of this file
         args - a list of arguments to be sent; optional
+        sync - boolean; if False, the command is sent without waiting for SYNC (and without throwing away what
+               Sparki has sent), so it waits in Sparki's serial buffer until Sparki finishes what it's doing -- only
+               for a short command following a motion whose end the caller is waiting for
         
         returns:
         nothing
     """
     global command_queue
+    global reply_wait_start, robot_busy
     global serial_conn
     global serial_is_connected
     global serial_port
@@ -361,26 +780,52 @@ def sendSerial(command, args=None):
         printDebug("In sendSerial, no command given", DEBUG_ALWAYS)
         raise RuntimeError("Attempt to send message to Sparki without command")
 
+    if current_motion is not None and (current_motion.robot_timed or
+                                       (command != COMMAND_CODES["STOP"] and current_motion.overdue())):
+        # the motion's timer hasn't been able to get command_semaphore to stop it -- or the robot is timing it, so
+        # it can't take the command until it's done, and waitForSync() would throw away the EVENT it sends then
+        current_motion._expire(True)
+
     if command != COMMAND_CODES["NOOP"]:
         command_queue.append((command, args))  # keep track of every command sent except noops
 
+    command_stats.begin(command)
+    sync_start = time.perf_counter()
+
     try:
-        waitForSync()  # be sure Sparki is available before sending
+        if sync:
+            waitForSync()  # be sure Sparki is available before sending
     except serial.SerialTimeoutException:  # Macs seem to be sensitive to disconnecting, so we try to reconnect if we have a problem
         # if there's a failure, try to reconnect unless we're init'ing
         if command != COMMAND_CODES["INIT"]:
-            init(serial_port, False)
-            try:
-                waitForSync()
-            except:
-                printDebug("In sendSerial, retry failed", DEBUG_CRITICAL)
-                printUnableToConnect()
-                raise
+            synced = False
+
+            # on a link which has been losing syncs, SYNC may just be late -- so wait again (as many times as the link
+            # monitor allows) before going to the trouble of reconnecting
+            for _ in range(link_monitor.retries()):
+                try:
+                    waitForSync()
+                    synced = True
+                    break
+                except serial.SerialTimeoutException:
+                    printDebug("In sendSerial, sync timed out, retrying", DEBUG_WARN)
+
+            if not synced:
+                init(serial_port, False)
+                link_monitor.addReconnect()
+                try:
+                    waitForSync()
+                except:
+                    printDebug("In sendSerial, retry failed", DEBUG_CRITICAL)
+                    printUnableToConnect()
+                    raise
         else:
             printDebug("In sendSerial, serial timeout on init", DEBUG_CRITICAL)
             printUnableToConnect()
             raise
 
+    command_stats.addSyncWait(time.perf_counter() - sync_start)
+
     printDebug("In sendSerial, Sending command - " + command, DEBUG_DEBUG)
 
     values = []  # this will hold what we're actually sending to Sparki
@@ -394,7 +839,13 @@ def sendSerial(command, args=None):
         else:
             values = values + args
 
+    write_start = time.perf_counter()
+    bytes_sent = 0
+
     for value in values:
+        if isinstance(value, float):  # a computed float (like the length of a path's leg) could be too long to send
+            value = round(value, FLOAT_DECIMALS)
+
         message = (str(value) + TERMINATOR).encode()
 
         if len(message) > MAX_TRANSMISSION:
@@ -411,9 +862,23 @@ def sendSerial(command, args=None):
             printUnableToConnect()
             raise
 
+        bytes_sent += len(message)
+
     serial_conn.flush()  # ensure the buffer is flushed
+    write_end = time.perf_counter()
+    trackMotion(command, args, sync)
+    actuator_shadow.sent(command, args)
+    command_stats.addWrite(write_end - write_start, bytes_sent)
     wait(.01)
 
+    if command in BLOCKING_COMMANDS:
+        robot_busy = True
+
+    # the round trip is timed from the end of the pause, so the pause isn't counted as time spent on the link
+    # (a reply which arrived during the pause is then read straight away, and times as a round trip of about 0)
+    reply_wait_start = time.perf_counter()
+    command_stats.touch()
+
 
 def senses_text():
     """ Displays the senses in text
@@ -448,6 +913,155 @@ def senses_text():
     print("#########################################")
 
 
+def servoScan(angles):
+    """ Points the servo at each of angles and pings, as quickly as the servo allows
+
+        The angles are visited in order of position, starting from the end nearer where the servo points (so scans
+        one after another sweep back and forth). Each ping is sent without waiting for SYNC, once the servo has had
+        servoSettleTime() to turn -- so a point costs one round trip, rather than the two round trips and a fixed
+        wait of servo() and ping()
+
+        arguments:
+        angles - list of ints between SERVO_LEFT and SERVO_RIGHT
+
+        returns:
+        list of (angle, distance) tuples, in the order of angles; a distance of -1 means nothing was found
+    """
+    global servo_position
+
+    angles = [int(constrain(angle, SERVO_LEFT, SERVO_RIGHT)) for angle in angles]
+    order = sorted(set(angles))
+
+    if order and abs(order[-1] - servo_position) < abs(order[0] - servo_position):
+        order.reverse()
+
+    distances = {}
+
+    with command_semaphore:
+        for angle in order:
+            settle = servoSettleTime(angle - servo_position)
+            sendSerial(COMMAND_CODES["SERVO"], [angle], sync=not distances)
+            ready = reply_wait_start + settle  # when the servo has had time to turn
+            servo_position = angle
+
+            if ready > time.perf_counter():
+                wait(ready - time.perf_counter())
+
+            sendSerial(COMMAND_CODES["PING"], sync=False)
+            distances[angle] = getSerialInt()
+
+            if recording:
+                trajectory_recorder.sense(ping=distances[angle])
+
+    return [(angle, distances[angle]) for angle in angles]
+
+
+def servoSettleTime(degrees):
+    """ Returns the seconds the servo takes to turn degrees and settle
+
+        arguments:
+        degrees - float degrees turned (either way)
+
+        returns:
+        float - seconds
+    """
+    return SERVO_SETTLE_TIME + SERVO_SECS_PER_DEGREE * abs(degrees)
+
+
+def startMotion(left_speed, right_speed, duration, on_end=None, timed_command=None):
+    """ Starts the wheels at left_speed and right_speed and returns without waiting; the robot is stopped by the
+        computer after duration seconds
+
+        The wheels are started without a time and stopped by a timer, so that other commands (like reading the
+        sensors, or cancel()) are answered while the robot moves. If ROBOT_TIMED_MOTIONS is True and Sparki has
+        MOTION_EVENTS, timed_command is sent instead: the robot times the motion itself (more exactly than the
+        computer can) and reports when it's done, but can't take other commands until then
+
+        arguments:
+        left_speed - float between -1.0 and 1.0
+        right_speed - float between -1.0 and 1.0
+        duration - float number of seconds to move
+        on_end - function called as on_end(fraction) when the motion ends (see MotionHandle)
+        timed_command - tuple of the command code and args of the robot's own motion command for the motion
+                        (like (COMMAND_CODES["FORWARD_CM"], [10.0])); optional
+
+        returns:
+        MotionHandle - for the motion
+    """
+    global current_motion
+    global in_motion
+
+    def ended(fraction):
+        global in_motion
+
+        in_motion = False
+
+        if on_end is not None:
+            on_end(fraction)
+
+    supersedeMotion()
+
+    robot_timed = ROBOT_TIMED_MOTIONS and MOTION_EVENTS and timed_command is not None
+
+    if robot_timed:
+        command, args = timed_command
+    else:
+        command = COMMAND_CODES["MOTORS"]
+        args = [int(constrain(left_speed, -1.0, 1.0) * 100), int(constrain(right_speed, -1.0, 1.0) * 100), -1.0]
+
+    with command_semaphore:
+        printDebug("In startMotion, command is {}, args are {}; duration is {}".format(command, args, duration),
+                   DEBUG_DEBUG)
+
+        in_motion = True
+        sendSerial(command, args)
+        current_motion = MotionHandle(duration, True, ended, robot_timed)
+
+    return current_motion
+
+
+def startMove(centimeters):
+    """ Moves centimeters (negative is backward) without waiting (see startMotion())
+
+        arguments:
+        centimeters - float number of centimeters to move
+
+        returns:
+        MotionHandle - for the motion
+    """
+    def moved(fraction):
+        global centimeters_moved
+
+        centimeters_moved += abs(centimeters) * fraction
+
+    if centimeters == 0:
+        return MotionHandle(0, False)
+
+    speed = 1.0 if centimeters > 0 else -1.0
+    command = COMMAND_CODES["FORWARD_CM"] if centimeters > 0 else COMMAND_CODES["BACKWARD_CM"]
+
+    return startMotion(speed, speed, motion_model.moveTime(centimeters), moved, (command, [abs(float(centimeters))]))
+
+
+def startTurn(degrees):
+    """ Turns by degrees (positive is clockwise) without waiting (see startMotion())
+
+        arguments:
+        degrees - float number of degrees to turn
+
+        returns:
+        MotionHandle - for the motion
+    """
+    if degrees == 0:
+        return MotionHandle(0, False)
+
+    speed = 1.0 if degrees > 0 else -1.0
+
+    command = (COMMAND_CODES["TURN_BY"], [float(degrees)])
+
+    return startMotion(speed, -speed, motion_model.turnTime(degrees), None, command)  # pose_estimator follows the turn
+
+
 def start_noop_thread(noop_wait=10):
     """ Begins the noop thread
         Attempts to ensure that there isn't another noop thread running prior to initiating
@@ -487,8 +1101,9 @@ def stop_noop_thread(t):
     t.join()
 
 
-def waitForSync():
-    """ Waits for the SYNC character from Sparki
+def supersedeMotion():
+    """ Ends the motion started with blocking=False, if it's still going, because another command is taking over
+        the wheels (the robot isn't told to stop -- the new command replaces the motion)
 
         arguments:
         none
@@ -496,82 +1111,392 @@ def waitForSync():
         returns:
         nothing
     """
-    global serial_conn
-    global serial_is_connected
-
-    if not serial_is_connected:
-        printDebug("Sparki is not connected - use init()", DEBUG_CRITICAL)
-        raise RuntimeError("Attempt to listen for message from Sparki without initialization")
-
-    serial_conn.flushInput()  # get rid of any waiting bytes
+    if current_motion is not None:
+        current_motion._supersede()
 
-    start_time = currentTime()
-
-    inByte = -1
 
-    if platform.system() == "Darwin":  # Macs seem to be extremely likely to timeout -- this is attempting to deal with that quickly
-        retries = 1  # the number of times to retry connecting in the case of a timeout
-        loop_wait = 0  # pause this long each time through the loop
-    else:
-        retries = 5  # the number of times to retry connecting in the case of a timeout
-        loop_wait = .01  # pause this long each time through the loop
-
-    while inByte != SYNC.encode():  # loop, doing nothing substantive, while we wait for SYNC
-        if currentTime() > start_time + (CONN_TIMEOUT * retries):
-            if platform.system() == "Darwin":  # Macs seem to be extremely likely to timeout -- so we report at a different debug level
-                printDebug(
-                    "In waitForSync, unable to sync with Sparki (this may not be due to power saving settings)",
-                    DEBUG_INFO)
-            else:
-                printDebug("In waitForSync, unable to sync with Sparki", DEBUG_ERROR)
-            raise serial.SerialTimeoutException("Unable to sync with Sparki -- may be temporary error due to power saving")
+def syncPose():
+    """ Updates xpos, ypos and degrees_turned from pose_estimator
 
-        try:
-            inByte = serial_conn.read()
-        except serial.SerialTimeoutException:
-            printDebug("SerialTimeoutException caught in waitForSync, unable to sync with Sparki", DEBUG_ERROR)
-            raise
+        arguments:
+        none
 
-        wait(loop_wait)
+        returns:
+        nothing
+    """
+    global degrees_turned
+    global xpos, ypos
 
+    xpos, ypos, heading = pose_estimator.pose()
+    degrees_turned = wrapAngle(heading)
 
-########### END OF INTERNAL FUNCTIONS ###########
 
+def syncRetries():
+    """ Returns how waitForSync() waits for SYNC on this computer
 
-###################### SPARKI MYRO FUNCTIONS ######################
-# These functions are intended to be called by users of this library        
-def backward(speed, time=-1):
-    """ Moves backward at speed for time; time is optional
-    
         arguments:
-        speed - a float between -1.0 and 1.0
-        time - the number of seconds to move; negative numbers will cause the robot to move without stopping
-        
+        none
+
         returns:
-        nothing
+        tuple - (int number of CONN_TIMEOUTs to wait at most, float seconds to pause each time through the loop)
     """
-    printDebug("In backward, speed is " + str(speed) + " and time is " + str(time), DEBUG_INFO)
-    speed = float(speed)
+    if platform.system() == "Darwin":  # Macs seem to be extremely likely to timeout -- this is attempting to deal with that quickly
+        return 1, 0
 
-    # adjust speed to Sparki's requirements
-    if speed < 0:
-        printDebug("In backward, speed < 0, calling forward", DEBUG_WARN)
-        forward(-speed, time)
-        return
-    elif speed == 0:
-        printDebug("In backward, speed == 0, doing nothing", DEBUG_WARN)
-        return
-    elif speed > 1.0:
-        printDebug("In forward, speed > 1.0, reducing to 1", DEBUG_ERROR)
-        speed = 1
+    return 5, .01
 
-    motors(-speed, -speed, time)
 
+def timeMotion(command, args, timeout):
+    """ Sends a motion command and times how long Sparki takes to finish it
 
-def beep(time=200, freq=2800):
-    """ Plays a tone on the Sparki buzzer at freq for time; both are optional
-        (note that for myro compatibility reasons, the arguments for this function are opposite other functions with a time argument)
-    
+        With MOTION_EVENTS, Sparki reports the time itself; otherwise, since Sparki doesn't send SYNC while it's
+        moving, the motion is finished at the first SYNC after a silence of at least CALIBRATION_GAP seconds
+
+        arguments:
+        command - the motion command code from COMMAND_CODES
+        args - the arguments of the command
+        timeout - float seconds after which to give up
+
+        returns:
+        float - seconds from sending the command to the end of the motion; None if the end couldn't be found
+    """
+    global in_motion
+
+    with command_semaphore:
+        in_motion = True
+        sendSerial(command, args)
+
+        if MOTION_EVENTS:
+            try:
+                return waitForMotion(timeout / MOTION_EVENT_SLACK)
+            finally:
+                in_motion = False
+
+        start = reply_wait_start  # when the command finished being written
+        last_heard = start
+
+        try:
+            while time.perf_counter() - start < timeout:
+                inByte = serial_conn.read()
+                now = time.perf_counter()
+
+                if inByte == SYNC.encode() and now - last_heard >= CALIBRATION_GAP:
+                    return now - start
+                elif inByte:
+                    last_heard = now
+
+            printDebug("In timeMotion, unable to find the end of the motion", DEBUG_WARN)
+            return None
+        finally:
+            in_motion = False
+
+
+def trackMotion(command, args, sync):
+    """ Tells pose_estimator (and trajectory_recorder, while recording) about a command just sent to Sparki
+
+        Sparki's wheels run at a speed of up to 1 / secs_per_cm centimeters per second (from motion_model), and
+        turning in place at full speed it turns 1 / secs_per_degree degrees per second
+
+        arguments:
+        command - the command code sent
+        args - the list of arguments sent
+        sync - boolean; True if Sparki was waiting for the command (so it's finished any motion before it)
+
+        returns:
+        nothing
+    """
+    if command == COMMAND_CODES["QUEUE_MOTION"]:  # a queued motion starts when the ones queued before it end
+        command, args, sync = args[0], args[1:], False
+
+        if command in (COMMAND_CODES["SERVO"], COMMAND_CODES["BEEP"]):  # nothing moves, but it takes time
+            seconds = float(args[1]) if command == COMMAND_CODES["SERVO"] else float(args[1]) / 1000
+            pose_estimator.addMove(0.0, 0.0, seconds, True)
+
+    if sync:
+        pose_estimator.settle()
+
+    wheels = None  # (left, right, duration) commanded, for trajectory_recorder
+
+    if command == COMMAND_CODES["MOTORS"]:
+        left_speed, right_speed, duration = float(args[0]) / 100, float(args[1]) / 100, float(args[2])
+        velocity = (left_speed + right_speed) / 2 / motion_model.secs_per_cm
+        turn_rate = (left_speed - right_speed) / 2 / motion_model.secs_per_degree
+        pose_estimator.addMotion(velocity, turn_rate, duration if duration >= 0 else None, not sync)
+        wheels = (round(left_speed * 100), round(right_speed * 100), duration if duration >= 0 else None)
+    elif command in (COMMAND_CODES["FORWARD_CM"], COMMAND_CODES["BACKWARD_CM"]):
+        centimeters = float(args[0]) if command == COMMAND_CODES["FORWARD_CM"] else -float(args[0])
+        pose_estimator.addMove(centimeters, 0.0, motion_model.moveTime(centimeters), not sync)
+        speed = 100 if centimeters >= 0 else -100
+        wheels = (speed, speed, motion_model.moveTime(centimeters))
+    elif command == COMMAND_CODES["TURN_BY"]:
+        degrees = float(args[0])
+        pose_estimator.addMove(0.0, degrees, motion_model.turnTime(degrees), not sync)
+        speed = 100 if degrees >= 0 else -100
+        wheels = (speed, -speed, motion_model.turnTime(degrees))
+    elif command == COMMAND_CODES["STOP"]:
+        pose_estimator.stop()
+        wheels = (0, 0, None)
+
+    if wheels is not None and recording:
+        trajectory_recorder.command(*wheels, queued=not sync)
+
+
+def updateConnectionCache(**fields):
+    """ Records the robot connected to (its port, library version, capabilities and, if they're known, its name and
+        bluetooth address) in the connection cache -- without asking the robot anything
+
+        arguments:
+        fields - any other fields to record, like calibration
+
+        returns:
+        nothing
+    """
+    printDebug("In updateConnectionCache, fields are " + str(fields), DEBUG_DEBUG)
+
+    entry = {"version": robot_library_version,
+             "capabilities": [NO_ACCEL, NO_MAG, SPARKI_DEBUGS, USE_EEPROM, EXT_LCD_1, MOTION_EVENTS, NOOP, MOTION_QUEUE,
+                              EEPROM_PROGRAMS]}
+
+    if robot_name:
+        entry["name"] = robot_name
+
+    if robot_bluetooth:
+        entry["bluetooth"] = robot_bluetooth
+
+    entry.update(fields)
+    connection_cache.update(serial_port, **entry)
+
+
+def waitForMotion(expected_time):
+    """ Waits for the motion command just sent to finish
+
+        With MOTION_EVENTS, Sparki sends EVENT and the milliseconds the motion took when it finishes, so this returns
+        as soon as the robot is done (however long that takes); otherwise this waits for expected_time
+
+        arguments:
+        expected_time - float seconds the motion should take
+
+        returns:
+        float - seconds Sparki took to make the motion; None if Sparki doesn't report it
+    """
+    global reply_wait_start, robot_busy
+
+    if not MOTION_EVENTS:
+        wait(expected_time)
+        return None
+
+    reply_wait_start = None  # the event isn't a sample of the round trip time -- it waits for the motion
+
+    deadline = time.perf_counter() + expected_time * MOTION_EVENT_SLACK + MOTION_EVENT_MARGIN
+    event = None  # the bytes of the event once EVENT has been seen
+
+    while time.perf_counter() < deadline:
+        inByte = serial_conn.read()
+
+        if inByte == EVENT.encode():
+            event = bytearray()
+        elif event is not None and inByte == TERMINATOR.encode():
+            try:
+                elapsed = int(event) / 1000
+            except ValueError:
+                printDebug("In waitForMotion, bad motion event " + str(event), DEBUG_WARN)
+                event = None
+                continue
+
+            printDebug("In waitForMotion, motion took " + str(elapsed) + " seconds (expected " + str(expected_time)
+                       + ")", DEBUG_INFO)
+            pose_estimator.finish()
+            robot_busy = False  # the robot is done, so SYNC is due straight away
+            return elapsed
+        elif event is not None:
+            event += inByte
+
+    # waitForSync() will still wait for the robot before the next command
+    printDebug("In waitForMotion, Sparki didn't report the end of the motion", DEBUG_WARN)
+    return None
+
+
+def waitForSync():
+    """ Waits for the SYNC character from Sparki
+
+        arguments:
+        none
+
+        returns:
+        nothing
+    """
+    global robot_busy
+    global serial_conn
+    global serial_is_connected
+
+    if not serial_is_connected:
+        printDebug("Sparki is not connected - use init()", DEBUG_CRITICAL)
+        raise RuntimeError("Attempt to listen for message from Sparki without initialization")
+
+    serial_conn.flushInput()  # get rid of any waiting bytes
+
+    start_time = currentTime()
+
+    inByte = -1
+    retries, loop_wait = syncRetries()
+
+    # CONN_TIMEOUT * retries is the most we'll wait; once the round trip time to the robot has been measured,
+    # the link monitor shortens that for a healthy link (so a dead link is detected quickly) -- but not after a
+    # motion, since Sparki doesn't send SYNC while it's making one; the time the motions sent are expected to take
+    # yet is added too
+    sync_timeout = CONN_TIMEOUT * retries if robot_busy else link_monitor.syncTimeout(CONN_TIMEOUT * retries)
+    sync_timeout += pose_estimator.remainingTime() * MOTION_EVENT_SLACK
+    read_timeout = min(CONN_TIMEOUT, sync_timeout)
+    original_timeout = serial_conn.timeout  # put back afterwards, since the replies are read with it
+
+    if original_timeout != read_timeout:
+        serial_conn.timeout = read_timeout
+
+    try:
+        while inByte != SYNC.encode():  # loop, doing nothing substantive, while we wait for SYNC
+            if currentTime() > start_time + sync_timeout:
+                link_monitor.addSync(True)
+                robot_busy = False  # it has had the time of the longest motion, so the retries use the usual timeout
+
+                if platform.system() == "Darwin":  # Macs seem to be extremely likely to timeout -- so we report at a different debug level
+                    printDebug(
+                        "In waitForSync, unable to sync with Sparki (this may not be due to power saving settings)",
+                        DEBUG_INFO)
+                else:
+                    printDebug("In waitForSync, unable to sync with Sparki", DEBUG_ERROR)
+                raise serial.SerialTimeoutException("Unable to sync with Sparki -- may be temporary error due to power saving")
+
+            try:
+                inByte = serial_conn.read()
+            except serial.SerialTimeoutException:
+                printDebug("SerialTimeoutException caught in waitForSync, unable to sync with Sparki", DEBUG_ERROR)
+                raise
+
+            wait(loop_wait)
+    finally:
+        if serial_conn.timeout != original_timeout:
+            serial_conn.timeout = original_timeout
+
+    link_monitor.addSync(False)
+    robot_busy = False
+
+
+########### END OF INTERNAL FUNCTIONS ###########
+
+
+###################### SPARKI MYRO FUNCTIONS ######################
+# These functions are intended to be called by users of this library        
+def arcBy(radius, degrees, speed=1.0, blocking=True):
+    """ Drives Sparki along an arc of a circle in one smooth motion, rather than stopping to turn and move
+
+        The middle of the robot follows a circle of radius cm; the robot turns degrees (positive is clockwise) on the
+        way, so arcBy(10, 90) ends 10 cm to the right and 10 cm ahead, facing right. The grid position is kept
+        up to date
+
+        arguments:
+        radius - float cm; 0 turns in place
+        degrees - float number of degrees to turn; positive is clockwise and negative is counter clockwise
+        speed - float between -1.0 and 1.0, the speed of the outer wheel; negative drives backward along the arc
+        blocking - boolean; if False, this returns as soon as the robot starts moving, so that other commands can be
+                   given while it moves
+
+        returns:
+        nothing if blocking is True; otherwise a MotionHandle, with done(), wait(), cancel() and remaining()
+    """
+    global centimeters_moved
+
+    printDebug("In arcBy, radius is {}, degrees is {} and speed is {}".format(radius, degrees, speed), DEBUG_INFO)
+
+    left_speed, right_speed, duration = arcMotion(float(radius), float(degrees), float(speed), motion_model)
+
+    if duration <= 0:
+        printDebug("In arcBy, no arc to drive... doing nothing", DEBUG_WARN)
+        return None if blocking else MotionHandle(0, False)
+
+    handle = motors(left_speed, right_speed, duration, blocking)  # pose_estimator follows the arc
+    centimeters_moved += abs(float(radius) * math.radians(float(degrees)))
+    syncPose()
+
+    return handle
+
+
+def arcTo(newX, newY, speed=1.0, blocking=True):
+    """ Drives Sparki to the x,y coordinate specified along an arc of a circle, in one smooth motion
+
+        The arc starts in the direction the robot is facing (without turning first, as moveTo() does), so the
+        heading at the end depends on where the point is: a point ahead and to the right ends facing further right.
+        A point straight ahead or behind is driven to in a straight line
+
+        arguments:
+        newX - float new X position of the robot
+        newY - float new Y position of the robot
+        speed - float between -1.0 and 1.0, the speed of the outer wheel; negative drives backward along the arc
+        blocking - boolean; if False, this returns as soon as the robot starts moving, so that other commands can be
+                   given while it moves
+
+        returns:
+        nothing if blocking is True; otherwise a MotionHandle, with done(), wait(), cancel() and remaining()
+    """
+    global centimeters_moved
+    global xpos, ypos
+
+    printDebug("In arcTo, moving to {}, {} at speed {}".format(newX, newY, speed), DEBUG_INFO)
+
+    syncPose()
+    speed = constrain(float(speed), -1.0, 1.0)
+
+    if (newX == xpos and newY == ypos) or speed == 0:
+        printDebug("In arcTo, already at location " + str(newX) + ", " + str(newY) + " or speed is 0", DEBUG_WARN)
+        return None if blocking else MotionHandle(0, False)
+
+    radius, degrees, distance = arcThrough(newX - xpos, newY - ypos, pose_estimator.pose()[2], speed < 0)
+
+    if degrees == 0:  # straight along the way the robot is going, or back the other way
+        wheel_speed = speed if distance >= 0 else -speed
+        handle = motors(wheel_speed, wheel_speed, motion_model.moveTime(distance) / abs(speed), blocking)
+        centimeters_moved += abs(distance)
+    else:
+        handle = arcBy(radius, degrees, speed, blocking)
+
+    if blocking:
+        xpos, ypos = newX, newY
+        pose_estimator.setPose(xpos, ypos)  # exactly where it was asked to go, rather than the sum of the motions
+
+    return handle
+
+
+def backward(speed, time=-1):
+    """ Moves backward at speed for time; time is optional
+    
+        arguments:
+        speed - a float between -1.0 and 1.0
+        time - the number of seconds to move; negative numbers will cause the robot to move without stopping
+        
+        returns:
+        nothing
+    """
+    printDebug("In backward, speed is " + str(speed) + " and time is " + str(time), DEBUG_INFO)
+    speed = float(speed)
+
+    # adjust speed to Sparki's requirements
+    if speed < 0:
+        printDebug("In backward, speed < 0, calling forward", DEBUG_WARN)
+        forward(-speed, time)
+        return
+    elif speed == 0:
+        printDebug("In backward, speed == 0, doing nothing", DEBUG_WARN)
+        return
+    elif speed > 1.0:
+        printDebug("In forward, speed > 1.0, reducing to 1", DEBUG_ERROR)
+        speed = 1
+
+    motors(-speed, -speed, time)
+
+
+def beep(time=200, freq=2800):
+    """ Plays a tone on the Sparki buzzer at freq for time; both are optional
+        (note that for myro compatibility reasons, the arguments for this function are opposite other functions with a time argument)
+    
         arguments:
         time - time in milliseconds to play freq (default 200ms)
         freq - integer frequency of the tone (default 2800Hz)
@@ -596,6 +1521,110 @@ def beep(time=200, freq=2800):
         wait(time / 1000)
 
 
+def calibrateMotion(save=True):
+    """ Times how long this Sparki takes to move and turn, and uses that (instead of SECS_PER_CM and SECS_PER_DEGREE)
+        to decide how long moveForwardcm(), moveBackwardcm() and turnBy() wait
+        Sparki will move forward and back, and turn back and forth, so it needs about 15cm of space in front of it
+
+        arguments:
+        save - boolean whether or not to save the calibration in the connection cache, so init() uses it next time
+
+        returns:
+        dictionary - secs_per_cm, cm_offset, secs_per_degree and degree_offset (the time for a motion is the offset
+                     plus the seconds per unit times the size of the motion)
+    """
+    global motion_model, robot_name
+
+    printDebug("In calibrateMotion, save is " + str(save), DEBUG_INFO)
+
+    moves = []
+    turns = []
+
+    # each motion is undone straight away, so the robot ends up where it started
+    for centimeters in CALIBRATION_DISTANCES:
+        for command in (COMMAND_CODES["FORWARD_CM"], COMMAND_CODES["BACKWARD_CM"]):
+            seconds = timeMotion(command, [float(centimeters)], 3 * motion_model.moveTime(centimeters) + 2)
+
+            if seconds is not None:
+                moves.append((centimeters, seconds))
+
+    for degrees in CALIBRATION_ANGLES:
+        for direction in (1, -1):
+            seconds = timeMotion(COMMAND_CODES["TURN_BY"], [float(degrees * direction)],
+                                 3 * motion_model.turnTime(degrees) + 2)
+
+            if seconds is not None:
+                turns.append((degrees, seconds))
+
+    printDebug("In calibrateMotion, moves are {}; turns are {}".format(moves, turns), DEBUG_DEBUG)
+
+    motion_model = fitModel(moves, turns, motion_model)
+
+    if save and serial_port is not None:  # saved under the robot's name, so it isn't taken for another robot's
+        if USE_EEPROM and robot_name is None:
+            robot_name = getName()
+
+        updateConnectionCache(calibration=motion_model.toDict())
+
+    return motion_model.toDict()
+
+
+def clearConnectionCache():
+    """ Forgets the robots (and the ports they were on) remembered by init() and initAuto()
+
+        arguments:
+        none
+
+        returns:
+        nothing
+    """
+    printDebug("In clearConnectionCache", DEBUG_INFO)
+
+    connection_cache.clear()
+
+
+def clearMap(resolution=2.0):
+    """ Forgets the obstacles found by scanMap(), and starts a new map with cells resolution cm on each side
+
+        arguments:
+        resolution - float cm on each side of a cell of the map
+
+        returns:
+        OccupancyGrid - the new, empty map; None if NumPy isn't installed
+    """
+    global occupancy_map
+    printDebug("In clearMap, resolution is " + str(resolution), DEBUG_INFO)
+
+    try:
+        from sparki_learning.occupancy import OccupancyGrid  # imported here, because it needs NumPy
+    except ImportError as err:
+        printDebug("Mapping needs NumPy; install it with pip install numpy", DEBUG_CRITICAL)
+        printDebug(str(err), DEBUG_DEBUG)
+        return None
+
+    occupancy_map = OccupancyGrid(resolution)
+    return occupancy_map
+
+
+def compileProgram(steps):
+    """ Returns the program runProgram() and uploadProgram() would store on Sparki for a list of steps -- to check
+        the steps, or see how long they'll take, without sending anything to the robot
+
+        A program is text: each step is a command code followed by its arguments (C10L90 is moveForwardcm(10) then
+        turnBy(90)), and the steps between [ and ] are repeated the number of times after the [
+
+        arguments:
+        steps - list of steps; see runProgram()
+
+        returns:
+        tuple - (string program, float estimated seconds it takes); raises ValueError if a step can't be compiled or
+                the program doesn't fit in the EEPROM
+    """
+    printDebug("In compileProgram, steps are " + str(steps), DEBUG_INFO)
+
+    return assembleProgram(steps, motion_model, servo_position)
+
+
 def compass():
     """ Gets the current compass heading of the Sparki - can be flakey
 
@@ -616,10 +1645,11 @@ def compass():
 
         sendSerial(COMMAND_CODES["COMPASS"])
         result = getSerialFloat()
+        pose_estimator.addCompass(result)  # only corrects the heading if setCompassFusion() has been used
         return result
 
 
-def drawFunction(function, xvals, scale=1):
+def drawFunction(function, xvals, scale=1, tolerance=None):
     """ Draws the function specified on the coordinate plane using moveTo()
 
         The arguments are the function which calculates y as a value of x, a list of x values to calculate from,
@@ -627,19 +1657,30 @@ def drawFunction(function, xvals, scale=1):
 
         For example, a valid call to this would be drawFunction( lambda x: x**2, flrange(-5, 5.1, .1) ) which
         would draw the function y = x**2 for values of x from -2 up to 2 going .1 of a value at a time
+
+        If tolerance is given, more points are added where the graph bends, and then only the points needed to stay
+        within tolerance centimeters of the graph are drawn -- so the drawing takes as long as the shape needs, not
+        as long as the number of x values
     
         arguments:
         function - should be a lambda function; the function should calculate the value of y given x
         xvals - an iterator which holds the values of x
         scale - a multiplier for x and y to make them larger on the plane
+        tolerance - float centimeters the drawing may be from the graph (after scaling); None to move to every x
         
         returns:
         nothing
     """
     printDebug("In drawFunction, xvals are " + str(xvals) + ", and scale is " + str(scale), DEBUG_INFO)
 
-    for x in xvals:
-        moveTo(x * scale, function(x) * scale)
+    if tolerance is None:  # every point is drawn, like moveTo() for each one -- none are merged or dropped
+        runMoves([(x * scale, function(x) * scale) for x in xvals], optimize=False)
+        return
+
+    points = simplifyPath(sampleFunction(function, xvals, tolerance, scale), tolerance)
+
+    printDebug("In drawFunction, drawing " + str(len(points)) + " points", DEBUG_INFO)
+    runMoves(points, tolerance=tolerance)
 
 
 def EEPROMread(location, amount):
@@ -721,50 +1762,191 @@ def EEPROMwrite(location, data):
         sendSerial(COMMAND_CODES["WRITE_EEPROM"], args)
 
 
-def forward(speed, time=-1):
-    """ Moves forward at speed for time; time is optional
-    
+def followLine(duration, speed=1.0, hz=FOLLOW_RATE, kp=FOLLOW_KP, ki=FOLLOW_KI, kd=FOLLOW_KD,
+               threshold=LINE_THRESHOLD):
+    """ Follows a dark line on the floor for duration seconds, steering with a PID controller on where the line is
+        under the line sensors (see sparki_learning.control)
+
+        The sensors are read hz times a second. The readings are a round trip old by the time the new wheel speeds
+        reach the robot, so the controller steers for where the line will be then -- and the wheel speeds are only
+        sent when they change by enough to matter, so most loops cost one round trip instead of two
+
         arguments:
-        speed - a float between -1.0 and 1.0
-        time - the number of seconds to move; negative numbers will cause the robot to move without stopping
-        
+        duration - float seconds to follow the line
+        speed - float wheel speed (0 to 1) on a straight line
+        hz - float times a second to read the sensors
+        kp - float proportional gain; wheel speed added to one wheel and taken from the other for each sensor
+             spacing the line is off the middle
+        ki - float integral gain
+        kd - float derivative gain
+        threshold - int line sensor readings below this are over the line
+
         returns:
-        nothing
+        dictionary - "loop_rate" (float times a second the sensors were read), "overruns" (int loops which took
+                     longer than 1 / hz), "readings", "updates" (int wheel speeds sent), "skipped" (int wheel speeds
+                     not sent), "error_mean", "error_rms" and "error_max" (float sensor spacings the line was from the
+                     middle) and "lost_time" (float seconds no sensor could see the line)
     """
-    printDebug("In forward, speed is " + str(speed) + " and time is " + str(time), DEBUG_INFO)
-    speed = float(speed)
+    global in_motion
 
-    # adjust speed to Sparki's requirements
-    if speed < 0:
-        printDebug("In forward, speed < 0, calling backward", DEBUG_WARN)
-        backward(-speed, time)
-        return
-    elif speed == 0:
-        printDebug("In forward, speed == 0, doing nothing", DEBUG_WARN)
-        return
-    elif speed > 1.0:
-        printDebug("In forward, speed > 1.0, reducing to 1", DEBUG_ERROR)
-        speed = 1
+    printDebug("In followLine, duration is " + str(duration) + ", speed is " + str(speed), DEBUG_INFO)
 
-    motors(speed, speed, time)
+    supersedeMotion()
+    follower = LineFollower(speed, kp, ki, kd, threshold)
+    rate = Rate(hz)
 
+    try:
+        while rate.elapsed() < duration:
+            with command_semaphore:
+                sendSerial(COMMAND_CODES["GET_LINE"])
+                sent = reply_wait_start
+                lines = tuple(getSerialInt() for _ in range(5))
 
-def gamepad():
-    """ Drives the robot using the remote control
-        Do not send additional commands until gamepad() terminates
-    
-        arguments:
-        none
-        
-        returns:
-        nothing
-    """
-    printDebug("Beginning gamepad control", DEBUG_INFO)
+                if recording:
+                    trajectory_recorder.sense(line=lines)
 
-    sendSerial(COMMAND_CODES["GAMEPAD"])
-    print("Sparki will not respond to other commands until remote control ends")
-    print("You must press - or + on the remote to stop using the gamepad")
-    # we could put a waitForSync() here, but it would likely time out
+                # Sparki read the sensors half a round trip after the command was sent, and the wheel speeds will
+                # reach it half a round trip after they're sent -- so they act on readings this old
+                speeds = follower.update(lines, sent, time.perf_counter() - sent)
+
+                if speeds is not None:
+                    in_motion = True
+                    sendSerial(COMMAND_CODES["MOTORS"], [int(speeds[0] * 100), int(speeds[1] * 100), -1.0],
+                               sync=False)
+
+            rate.sleep()
+    finally:
+        stop()
+
+    result = follower.stats()
+    result["loop_rate"] = result["readings"] / rate.elapsed() if rate.elapsed() > 0 else 0.0
+    result["overruns"] = rate.stats()["overruns"]
+
+    return result
+
+
+def followPath(points, tolerance=PATH_TOLERANCE):
+    """ Drives through each point on the grid in turn, updating the grid position, like moveTo() for each point
+
+        The turn and move for each leg are worked out as they're needed, so points may be a generator of any
+        length. With a robot which reports when a motion ends (library version 1.1.5 or later), each command is sent
+        while the one before is still running, so Sparki starts it as soon as it's done with the last -- instead of
+        waiting for the computer to hear that it's finished and send the next. With a robot which has a motion queue
+        (1.1.6 or later), the commands go through queueMotions(), which keeps several waiting on the robot
+
+        This lookahead needs MOTION_EVENTS, which sparki_myro.ino doesn't define as shipped (1.1.4): without it the
+        computer can't tell when a leg ends (Sparki sends SYNC when it's idle, too, and the motion model's times
+        drift), so it couldn't keep just one leg waiting without overflowing Sparki's serial buffer -- each leg is
+        sent and waited for in turn instead
+
+        arguments:
+        points - an iterator of (x, y) grid positions
+        tolerance - float centimeters; points closer than this to where the robot is are skipped
+
+        returns:
+        nothing
+    """
+    global centimeters_moved, degrees_turned, in_motion
+    global xpos, ypos
+
+    printDebug("In followPath, tolerance is " + str(tolerance), DEBUG_INFO)
+
+    supersedeMotion()
+    syncPose()
+
+    if MOTION_QUEUE:
+        targets = []  # the grid position after each leg, as the legs are queued
+
+        def legs():
+            for name, amount, position in pathLegs(points, xpos, ypos, getAngle(), tolerance):
+                targets.append(position)
+                yield name, amount
+
+        queueMotions(legs())
+
+        if targets:
+            xpos, ypos = targets[-1]
+            pose_estimator.setPose(xpos, ypos)
+
+        return
+
+    with command_semaphore:
+        in_motion = True
+        pending = []  # the expected times of commands sent which haven't finished yet
+
+        try:
+            for name, amount, position in pathLegs(points, xpos, ypos, getAngle(), tolerance):
+                if name == "turnBy":
+                    command, expected = COMMAND_CODES["TURN_BY"], motion_model.turnTime(amount)
+                    degrees_turned = wrapAngle(degrees_turned + amount)
+                else:
+                    command, expected = COMMAND_CODES["FORWARD_CM"], motion_model.moveTime(amount)
+                    centimeters_moved += amount
+
+                printDebug("In followPath, " + name + " " + str(amount), DEBUG_DEBUG)
+
+                # with a command already running, this one waits in Sparki's serial buffer until Sparki is free
+                sendSerial(command, [amount], sync=not pending)
+                pending.append(expected)
+                xpos, ypos = position
+
+                # keep one command queued behind the one running (without events, wait for each command in turn --
+                # see above)
+                while len(pending) > (1 if MOTION_EVENTS else 0):
+                    waitForMotion(pending.pop(0))
+
+            while pending:
+                waitForMotion(pending.pop(0))
+
+            pose_estimator.setPose(xpos, ypos)
+        finally:
+            in_motion = False
+
+
+def forward(speed, time=-1):
+    """ Moves forward at speed for time; time is optional
+    
+        arguments:
+        speed - a float between -1.0 and 1.0
+        time - the number of seconds to move; negative numbers will cause the robot to move without stopping
+        
+        returns:
+        nothing
+    """
+    printDebug("In forward, speed is " + str(speed) + " and time is " + str(time), DEBUG_INFO)
+    speed = float(speed)
+
+    # adjust speed to Sparki's requirements
+    if speed < 0:
+        printDebug("In forward, speed < 0, calling backward", DEBUG_WARN)
+        backward(-speed, time)
+        return
+    elif speed == 0:
+        printDebug("In forward, speed == 0, doing nothing", DEBUG_WARN)
+        return
+    elif speed > 1.0:
+        printDebug("In forward, speed > 1.0, reducing to 1", DEBUG_ERROR)
+        speed = 1
+
+    motors(speed, speed, time)
+
+
+def gamepad():
+    """ Drives the robot using the remote control
+        Do not send additional commands until gamepad() terminates
+    
+        arguments:
+        none
+        
+        returns:
+        nothing
+    """
+    printDebug("Beginning gamepad control", DEBUG_INFO)
+
+    sendSerial(COMMAND_CODES["GAMEPAD"])
+    print("Sparki will not respond to other commands until remote control ends")
+    print("You must press - or + on the remote to stop using the gamepad")
+    # we could put a waitForSync() here, but it would likely time out
 
 
 def getAccel():
@@ -830,8 +2012,8 @@ def getAccelZ():
 
 
 def getAngle():
-    """ Returns the number of degrees that the robot has turned using turnBy since it was initialized
-        OR since setAngle() was called
+    """ Returns the number of degrees that the robot has turned since it was initialized OR since setAngle() was
+        called -- worked out from every motion command (turnBy(), motors(), turnLeft(), etc.)
 
         arguments:
         none
@@ -843,6 +2025,7 @@ def getAngle():
 
     printDebug("In getAngle", DEBUG_INFO)
 
+    syncPose()
     return degrees_turned
 
 
@@ -942,6 +2125,9 @@ def getLight(position=LIGHT_SENS_RIGHT + 3):
         sendSerial(COMMAND_CODES["GET_LIGHT"])
         lights = (getSerialInt(), getSerialInt(), getSerialInt())
 
+        if recording:
+            trajectory_recorder.sense(light=lights)
+
         if position == LIGHT_SENS_LEFT or position == LIGHT_SENS_MID or position == LIGHT_SENS_RIGHT:
             return lights[position]
         else:
@@ -973,6 +2159,9 @@ def getLine(position=LINE_EDGE_RIGHT + 5):
         sendSerial(COMMAND_CODES["GET_LINE"])
         lines = (getSerialInt(), getSerialInt(), getSerialInt(), getSerialInt(), getSerialInt())
 
+        if recording:
+            trajectory_recorder.sense(line=lines)
+
         if position == LINE_EDGE_LEFT or position == LINE_MID_LEFT or position == LINE_MID or position == LINE_MID_RIGHT or position == LINE_EDGE_RIGHT:
             return lines[position]
         else:
@@ -1041,6 +2230,40 @@ def getMagZ():
     return getMag()[2]
 
 
+def getMap():
+    """ Returns the map of the obstacles found by scanMap()
+
+        arguments:
+        none
+
+        returns:
+        OccupancyGrid - with probability(x, y), toASCII(), savePNG(filename) and save(filename); None if there's no
+                        map yet
+    """
+    printDebug("In getMap", DEBUG_INFO)
+
+    return occupancy_map
+
+
+def getLinkStats():
+    """ Gets measurements of the health of the Bluetooth link to Sparki
+
+        arguments:
+        none
+
+        returns:
+        dictionary - srtt (smoothed round trip time in seconds, None until measured), rttvar (its variation),
+                     rto (the retransmission timeout), sync_timeout (seconds the library will wait for Sparki to be
+                     ready before trying to reconnect), samples, syncs, timeouts, loss_rate (recent fraction of syncs
+                     which timed out), retries (times a timed out sync is retried before reconnecting) and reconnects
+    """
+    printDebug("In getLinkStats", DEBUG_INFO)
+
+    retries, _ = syncRetries()
+
+    return link_monitor.summary(CONN_TIMEOUT * retries)
+
+
 def getName():
     """ Gets the name of this robot as set in the EEPROM
 
@@ -1099,8 +2322,7 @@ def getObstacle(position="all"):
     elif position == "right":
         position = SERVO_RIGHT
     elif position == "all":
-        result = (getObstacle(SERVO_LEFT), getObstacle(SERVO_CENTER), getObstacle(SERVO_RIGHT))  # recursion
-        return result
+        return tuple(distance for _, distance in servoScan((SERVO_LEFT, SERVO_CENTER, SERVO_RIGHT)))
 
     position = int(constrain(position, SERVO_LEFT, SERVO_RIGHT))
 
@@ -1112,8 +2334,8 @@ def getObstacle(position="all"):
 
 def getPosition():
     """ Gets the current x,y position of Sparki - used with the grid commands (moveTo() & moveBy())
-        Note that only use of the grid commands actually changes this value -- the x & y coordinates
-        do not change for other move commends
+        The position is worked out from every motion command (the grid commands, motors(), forward(), etc.) by dead
+        reckoning, so it's less exact after motions other than the grid commands
         The robot begins at 0,0, and by definition is facing the positive coordinates of the Y axis
 
         arguments:
@@ -1126,9 +2348,64 @@ def getPosition():
 
     printDebug("In getPosition", DEBUG_INFO)
 
+    syncPose()
     return (xpos, ypos)
 
 
+def getPoseHistory():
+    """ Returns the robot's recent positions and headings, as worked out from the motion commands sent to it
+
+        There's an entry each time the robot's motion changed (it started, stopped or changed speed), and each
+        time the position was set or corrected by the compass
+
+        arguments:
+        none
+
+        returns:
+        list of (time, x, y, heading) tuples; time is in seconds (as from time.perf_counter())
+    """
+    printDebug("In getPoseHistory", DEBUG_INFO)
+
+    return pose_estimator.records()
+
+
+def getRecording():
+    """ Returns the run recorded since startRecording() (up to now, or to stopRecording())
+
+        arguments:
+        none
+
+        returns:
+        NumPy structured array - a row for each motion command, sensor reading and sample (see startRecording());
+                                 the fields are time (seconds since the recording started), x, y, heading, left and
+                                 right (the commanded wheel speeds), ping, light (3 values) and line (5 values);
+                                 None if nothing has been recorded
+    """
+    printDebug("In getRecording", DEBUG_INFO)
+
+    if trajectory_recorder is None:
+        return None
+
+    return trajectory_recorder.array()
+
+
+def getStats():
+    """ Gets statistics about the commands sent to Sparki since the library was imported (or resetStats() was called)
+        Useful for figuring out whether slowness comes from the Bluetooth link, the robot, or the program
+
+        arguments:
+        none
+
+        returns:
+        dictionary - keys are command names (e.g. "PING"); each value is a dictionary with the count of commands,
+                     bytes_sent, bytes_received, and dictionaries for sync_wait, write, reply and latency (the whole
+                     exchange) which hold the count, total, mean, min, max, p50, p90 and p99 times in seconds
+    """
+    printDebug("In getStats", DEBUG_INFO)
+
+    return command_stats.summary()
+
+
 def getUptime():
     """ Gets the amount of time since the robot was initialized - returns a -1 if the robot has not been initialized
     
@@ -1164,6 +2441,21 @@ def getVersion():
     return (SPARKI_MYRO_VERSION, robot_library_version)
 
 
+def getWaitDrift():
+    """ Gets the total time that wait() and waitNoop() (and the commands which use them to wait for the robot) have
+        ended late since the library was imported (or resetStats() was called)
+
+        arguments:
+        none
+
+        returns:
+        float - seconds
+    """
+    printDebug("In getWaitDrift", DEBUG_INFO)
+
+    return wait_drift
+
+
 def gripperClose(distance=MAX_GRIPPER_DISTANCE):
     """ Closes the gripper by distance; defaults to MAX_GRIPPER_DISTANCE
 
@@ -1207,11 +2499,11 @@ def gripperOpen(distance=MAX_GRIPPER_DISTANCE):
         wait(distance)
 
 
-def gripperStop():
+def gripperStop(force=False):
     """ Stops gripper movement
 
         arguments:
-        distance - float distance in cm to open
+        force - boolean; if True, the command is sent even if the gripper is known to be stopped already
 
         returns:
         nothing
@@ -1221,10 +2513,14 @@ def gripperStop():
     with command_semaphore:
         printDebug("In gripperStop", DEBUG_INFO)
 
+        if not force and actuator_shadow.unchanged(COMMAND_CODES["GRIPPER_STOP"]):
+            command_stats.addElided(COMMAND_CODES["GRIPPER_STOP"])
+            return
+
         sendSerial(COMMAND_CODES["GRIPPER_STOP"])
 
 
-def init(com_port, print_versions=True, auto=False, retries=2):
+def init(com_port, print_versions=True, auto=False, retries=2, use_cache=True):
     """ Connects to the Sparki robot on com_port; if it is already connected, this will disconnect and reconnect on the given port
         Note that Sparki MUST already be paired with the computer over Bluetooth
         
@@ -1235,6 +2531,10 @@ def init(com_port, print_versions=True, auto=False, retries=2):
         print_versions - boolean whether or not to print connection message
         auto - boolean whether this is an auto connection attempt -- True suppresses serial exceptions
         retries - int number of times to attempt connections -- done to deal with power saving, primarily
+        use_cache - boolean whether or not to use the connection cache -- if a robot with the same library version
+                    was connected to on com_port recently, its capabilities, name, bluetooth address and calibration
+                    come from the cache instead of being asked for (use clearConnectionCache() or False if another
+                    robot has been put on com_port since)
         
         returns:
         boolean - True if connected, False otherwise
@@ -1247,13 +2547,19 @@ def init(com_port, print_versions=True, auto=False, retries=2):
     global serial_conn
     global serial_port
     global serial_is_connected
-    global robot_name
+    global robot_name, robot_bluetooth
     global CONN_TIMEOUT
-    global NO_ACCEL, NO_MAG, SPARKI_DEBUGS, USE_EEPROM, EXT_LCD_1, NOOP
+    global NO_ACCEL, NO_MAG, SPARKI_DEBUGS, USE_EEPROM, EXT_LCD_1, MOTION_EVENTS, NOOP, MOTION_QUEUE, EEPROM_PROGRAMS
     global command_semaphore
+    global init_phase_times
+    global motion_model
 
     printDebug("In init, com_port is " + str(com_port), DEBUG_INFO)
 
+    init_start = time.perf_counter()
+    init_phase_times = {}
+    previous_port = serial_port
+
     if serial_is_connected:
         disconnectSerial()
 
@@ -1262,8 +2568,13 @@ def init(com_port, print_versions=True, auto=False, retries=2):
     elif com_port == "hc06":
         com_port = "/dev/tty.HC-06-DevB"
 
+    if com_port != previous_port:  # the link to a different port (or robot) will have a different round trip time
+        link_monitor.reset()
+
     robot_name = None
+    robot_bluetooth = None
     serial_port = com_port
+    phase_start = time.perf_counter()
 
     for attempt in range(retries):    # retry a few times to avoid power saving port shutdown
         try:
@@ -1279,6 +2590,9 @@ def init(com_port, print_versions=True, auto=False, retries=2):
         
     serial_is_connected = True  # have to do this prior to sendSerial, or sendSerial will never try to send
     command_semaphore = threading.Semaphore()
+    actuator_shadow.forget()  # Sparki may have been restarted (or be a different robot)
+    init_phase_times["port_open"] = time.perf_counter() - phase_start
+    phase_start = time.perf_counter()
 
     with command_semaphore:
         printDebug("In init, grabbing semaphore to initialize robot", DEBUG_DEBUG)
@@ -1286,6 +2600,9 @@ def init(com_port, print_versions=True, auto=False, retries=2):
 
         robot_library_version = getSerialString()  # Sparki sends us its library version in response
 
+    init_phase_times["init"] = time.perf_counter() - phase_start
+    phase_start = time.perf_counter()
+
     if robot_library_version:
         init_time = currentTime()
 
@@ -1294,29 +2611,72 @@ def init(com_port, print_versions=True, auto=False, retries=2):
             printDebug("  Python library version is " + SPARKI_MYRO_VERSION, DEBUG_ALWAYS)
             printDebug("  Robot library version is " + robot_library_version, DEBUG_ALWAYS)
 
-        # use the version number to try to figure out capabilities
+        cached = connection_cache.lookup(com_port) if use_cache else None
+
+        if not connection_cache.isFresh(cached) or cached.get("version") != robot_library_version \
+                or "capabilities" not in cached:
+            cached = None  # nothing from a stale entry, or one made with other firmware, is used
+
+        # use the version number to try to figure out capabilities (or the cache, which has them for a robot
+        # connected to recently on this port with the same version)
         # if the version has a lower case r, strip off the r and anything to the right of it (that's what .partition() does below)
         try:
-            # the order is NO_ACCEL, NO_MAG, SPARKI_DEBUGS, USE_EEPROM, EXT_LCD_1, reserved, NOOP
-            NO_ACCEL, NO_MAG, SPARKI_DEBUGS, USE_EEPROM, EXT_LCD_1, reserved2, NOOP = SPARKI_CAPABILITIES[
-                robot_library_version.partition('r')[0]]
+            # the order is NO_ACCEL, NO_MAG, SPARKI_DEBUGS, USE_EEPROM, EXT_LCD_1, MOTION_EVENTS, NOOP, MOTION_QUEUE,
+            # EEPROM_PROGRAMS
+            if cached is not None:
+                capabilities = tuple(cached["capabilities"])
+            else:
+                capabilities = SPARKI_CAPABILITIES[robot_library_version.partition('r')[0]]
+
+            NO_ACCEL, NO_MAG, SPARKI_DEBUGS, USE_EEPROM, EXT_LCD_1, MOTION_EVENTS, NOOP, MOTION_QUEUE, \
+                EEPROM_PROGRAMS = capabilities
             printDebug("Sparki Capabilities:", DEBUG_INFO)
-            printDebug("\tNO_ACCEL:\tNO_MAG:\tSPARKI_DEBUGS:\tUSE_EEPROM:\tEXT_LCD_1:", DEBUG_INFO)
+            printDebug("\tNO_ACCEL:\tNO_MAG:\tSPARKI_DEBUGS:\tUSE_EEPROM:\tEXT_LCD_1:\tMOTION_EVENTS:\tMOTION_QUEUE:"
+                       "\tEEPROM_PROGRAMS:", DEBUG_INFO)
             printDebug("\t" + str(NO_ACCEL) + "\t\t" + str(NO_MAG) + "\t" + str(SPARKI_DEBUGS) + "\t\t" + str(
-                USE_EEPROM) + "\t\t" + str(EXT_LCD_1), DEBUG_INFO)
+                USE_EEPROM) + "\t\t" + str(EXT_LCD_1) + "\t\t" + str(MOTION_EVENTS) + "\t\t" + str(MOTION_QUEUE)
+                       + "\t\t" + str(EEPROM_PROGRAMS), DEBUG_INFO)
         except KeyError:
             printDebug(
                 "Unknown library version, using defaults -- you might need an upgrade of the Sparki Learning Python library",
                 DEBUG_ALWAYS)
             printDebug("(to upgrade the library type: pip3 sparki-learning --upgrade)", DEBUG_ALWAYS)
             printDebug("Sparki Capabilities will be limited", DEBUG_ALWAYS)
-        
-        if USE_EEPROM and print_versions:
+
+        init_phase_times["capabilities"] = time.perf_counter() - phase_start
+        phase_start = time.perf_counter()
+
+        # a fresh entry for com_port is trusted to be the same robot (a paired robot keeps its port), so its name
+        # isn't asked for; otherwise the name and bluetooth address are read once, to know the robot by next time
+        if cached is not None:
+            robot_name = cached.get("name")
+            robot_bluetooth = cached.get("bluetooth")
+        elif USE_EEPROM and (print_versions or use_cache):
             robot_name = getName()
+
+            if use_cache and EXT_LCD_1:
+                robot_bluetooth = bluetoothRead()
+
+        if print_versions and USE_EEPROM and robot_name is not None:
             printDebug(robot_name + " is ready", DEBUG_ALWAYS)
-            
+
+        init_phase_times["get_name"] = time.perf_counter() - phase_start
+        phase_start = time.perf_counter()
+
+        if use_cache and cached is None:
+            updateConnectionCache()
+
+            if robot_bluetooth or robot_name:  # the robot has said who it is, so what's saved for it can be used
+                cached = connection_cache.lookup(com_port)
+
+        motion_model = MotionModel.fromDict(cached.get("calibration") if cached else None)
+
+        init_phase_times["cache_update"] = time.perf_counter() - phase_start
+
         start_noop_thread()
 
+        init_phase_times["total"] = time.perf_counter() - init_start
+
         return True
     else:
         if not auto:
@@ -1332,44 +2692,40 @@ def init(com_port, print_versions=True, auto=False, retries=2):
 initialize = init # Synonym for init(com_port)
 
 
-def initAuto(print_versions=True, print_correct_port=True):
+def initAuto(print_versions=True, print_correct_port=True, use_cache=True):
     """ Connects to the Sparki robot by guessing the com port; if it is already connected, this will disconnect and reconnect on the given port
         Note that Sparki MUST already be paired with the computer over Bluetooth for this to work
         
         arguments:
         print_versions - boolean whether or not to print connection message
         print_correct_port - boolean whether or not to print the correct port
+        use_cache - boolean whether or not to try the ports of robots connected to before first (see init())
         
         returns:
         string - the com port used to connect
     """
-    printDebug("In initAuto, print_versions={}; print_correct_port={}".format(print_versions, print_correct_port), DEBUG_INFO)
+    printDebug("In initAuto, print_versions={}; print_correct_port={}; use_cache={}".format(print_versions,
+               print_correct_port, use_cache), DEBUG_INFO)
 
-    possible_ports = [] # store potential ports to try
-    successful_port = None
-    
-    currentOS = platform.system()
+    if serial_is_connected:
+        disconnectSerial()  # otherwise the port we're connected on would be busy
 
-    if currentOS == "Darwin":
-        possible_ports = [ "/dev/tty.ArcBotics-DevB", "/dev/tty.HC-06-DevB", "/dev/tty.ArcBotics-SPPDev" ]
-    elif currentOS == "Windows":
-        possible_ports = [ "com" + str(x) for x in range(3,11) ]
-    else:
-        raise RuntimeError("unable to choose the port automatically for your OS")
+    possible_ports = possiblePorts()  # store potential ports to try
+
+    # the ports robots were found on before are tried first, so the others usually don't have to be opened at all
+    cached_ports = [port for port in connection_cache.ports() if port in possible_ports] if use_cache else []
+    successful_port = probePorts(cached_ports)
+
+    if successful_port is None:
+        successful_port = probePorts([port for port in possible_ports if port not in cached_ports])
+
+    if successful_port is not None and not init(successful_port, print_versions=print_versions, auto=True,
+                                                use_cache=use_cache):
+        successful_port = None
+
+    if successful_port is not None and print_correct_port:
+        print("{} is the correct port, which you can use with init() in the future".format(successful_port))
 
-    for port in possible_ports:
-        success = init(port, print_versions=print_versions, auto=True)
-        
-        if success:
-            successful_port = port
-            
-            if print_correct_port:
-                print("{} is the correct port, which you can use with init() in the future".format(port))
-                
-            break  
-        else:
-            printDebug("{} is not the correct port".format(port), DEBUG_DEBUG)
-            
     if successful_port is None:
         printDebug("No Sparki found!", DEBUG_ALWAYS)
         printDebug("Ports tested: {}".format("; ".join(possible_ports)), DEBUG_ERROR)
@@ -1760,11 +3116,12 @@ def LCDreadPixel(x, y):
             return False
 
 
-def LCDsetColor(color=LCD_BLACK):
+def LCDsetColor(color=LCD_BLACK, force=False):
     """ Sets the color that LCDdraw commands will draw with; LCD_BLACK will be normal drawing, LCD_WHITE will erase
 
         arguments:
         color - int color value; should be LCD_BLACK or LCD_WHITE
+        force - boolean; if True, the command is sent even if the LCD is known to be drawing in color already
 
         returns:
         nothing
@@ -1783,6 +3140,10 @@ def LCDsetColor(color=LCD_BLACK):
 
         args = [color]
 
+        if not force and actuator_shadow.unchanged(COMMAND_CODES["LCD_SET_COLOR"], args):
+            command_stats.addElided(COMMAND_CODES["LCD_SET_COLOR"])
+            return
+
         sendSerial(COMMAND_CODES["LCD_SET_COLOR"], args)
 
         current_lcd_color = color
@@ -1805,20 +3166,33 @@ def LCDupdate():
         sendSerial(COMMAND_CODES["LCD_UPDATE"])
 
 
-def motors(left_speed, right_speed, time=-1):
+def motors(left_speed, right_speed, time=-1, blocking=True, force=False):
     """ Moves wheels at left_speed and right_speed for time; time is optional
+
+        Without a time, the command isn't sent if the wheels are known to be moving at those speeds already
     
         arguments:
         left_speed - the left wheel speed; a float between -1.0 and 1.0
         right_speed - the right wheel speed; a float between -1.0 and 1.0
         time - float the number of seconds to move; negative numbers will cause the robot to move without stopping
+        blocking - boolean; if False (and time is not negative), this returns as soon as the robot starts moving, so
+                   that other commands can be given while it moves
+        force - boolean; if True, the command is sent even if the wheels are known to be moving at these speeds
         
         returns:
-        nothing
+        nothing if blocking is True or time is negative; otherwise a MotionHandle, with done(), wait(), cancel()
+        and remaining()
     """
     global in_motion
     global command_semaphore
-    
+
+    if not blocking and float(time) >= 0 and (float(left_speed) != 0 or float(right_speed) != 0):
+        printDebug("In motors, left speed is {}, right speed is {} and time is {} (not blocking)".format(left_speed,
+                   right_speed, time), DEBUG_INFO)
+        return startMotion(float(left_speed), float(right_speed), float(time))
+
+    supersedeMotion()
+
     with command_semaphore:
         printDebug(
             "In motors, left speed is " + str(left_speed) + ", right speed is " + str(right_speed) + " and time is " + str(
@@ -1847,11 +3221,15 @@ def motors(left_speed, right_speed, time=-1):
         time = float(time)
         args = [left_speed, right_speed, time]
 
+        if time < 0 and not force and actuator_shadow.unchanged(COMMAND_CODES["MOTORS"], args):
+            command_stats.addElided(COMMAND_CODES["MOTORS"])
+            return
+
         in_motion = True
         try:
             sendSerial(COMMAND_CODES["MOTORS"], args)
             if time >= 0:
-                wait(time)
+                waitForMotion(time)
         finally:
             if time >= 0:
                 in_motion = False
@@ -1893,19 +3271,27 @@ def move(translate_speed, rotate_speed):  # NOT WELL TESTED
         turnLeft(rotate_speed)
 
 
-def moveBackwardcm(centimeters):
+def moveBackwardcm(centimeters, blocking=True):
     """ Move Sparki backward by centimeters
 
         arguments:
         centimeters - float number of centimeters to move
+        blocking - boolean; if False, this returns as soon as the robot starts moving, so that other commands (like
+                   reading the sensors) can be given while it moves
 
         returns:
-        nothing
+        nothing if blocking is True; otherwise a MotionHandle, with done(), wait(), cancel() and remaining()
     """
     global centimeters_moved
     global in_motion
     global command_semaphore
-    
+
+    if not blocking:
+        printDebug("In moveBackwardcm, centimeters is " + str(centimeters) + " (not blocking)", DEBUG_INFO)
+        return startMove(-float(centimeters))
+
+    supersedeMotion()
+
     with command_semaphore:
         printDebug("In moveBackwardcm, centimeters is " + str(centimeters), DEBUG_INFO)
 
@@ -1919,209 +3305,643 @@ def moveBackwardcm(centimeters):
             moveForwardcm(-centimeters)
             return
 
-        centimeters_moved += centimeters
+        centimeters_moved += centimeters
+
+        args = [centimeters]
+
+        in_motion = True
+        sendSerial(COMMAND_CODES["BACKWARD_CM"], args)
+        waitForMotion(motion_model.moveTime(centimeters))
+        in_motion = False
+
+
+def moveForwardcm(centimeters, blocking=True):
+    """ Move Sparki forward by centimeters
+
+        arguments:
+        centimeters - float number of centimeters to move
+        blocking - boolean; if False, this returns as soon as the robot starts moving, so that other commands (like
+                   reading the sensors) can be given while it moves
+
+        returns:
+        nothing if blocking is True; otherwise a MotionHandle, with done(), wait(), cancel() and remaining()
+    """
+    global centimeters_moved
+    global in_motion
+    global command_semaphore
+
+    if not blocking:
+        printDebug("In moveForwardcm, centimeters is " + str(centimeters) + " (not blocking)", DEBUG_INFO)
+        return startMove(float(centimeters))
+
+    supersedeMotion()
+
+    with command_semaphore:
+        printDebug("In moveForwardcm, centimeters is " + str(centimeters), DEBUG_INFO)
+
+        centimeters = float(centimeters)
+
+        if centimeters == 0:
+            printDebug("In moveForwardcm, centimeters is 0... doing nothing", DEBUG_WARN)
+            return
+        elif centimeters < 0:
+            printDebug("In moveForwardcm, centimeters is negative, calling moveBackwardcm", DEBUG_ERROR)
+            moveBackwardcm(-centimeters)
+            return
+
+        centimeters_moved += centimeters
+
+        args = [centimeters]
+
+        in_motion = True
+        sendSerial(COMMAND_CODES["FORWARD_CM"], args)
+        waitForMotion(motion_model.moveTime(centimeters))
+        in_motion = False
+
+
+def moveBy(dX, dY, turnBack=False):
+    """ Moves to the relative x,y coordinate specified (i.e. treats the current position as 0,0 and does a moveTo, but
+        maintains the x,y coordinates correctly; for example, if the robot is currently at 3,4, and you give it moveBy(1,2)
+        it will move to 4,5)
+        
+        When turned on, the robot begins at 0,0, and by definition is facing the positive coordinates of the Y axis
+
+        The robot's heading is changed from "facing the positive coordinates of the Y axis" by every movement command
+        If you want the robot to be "reset" to "facing the positive coordinates of the Y axis", call setAngle() prior to this
+
+        Every movement command (including forward(), turnLeft() and motors()) updates the X & Y coordinates
+        Robot returns to original heading at the end of the function if turnBack is True
+
+        arguments:
+        dX - float relative X position of the robot
+        dY - float relative Y position of the robot
+        turnBack - boolean - True if the robot should turn back to the direction it faced prior to the command
+
+        returns:
+        none
+    """
+    global xpos, ypos
+
+    printDebug("In moveBy, moving to relative position " + str(dX) + ", " + str(dY), DEBUG_INFO)
+
+    syncPose()
+
+    if (dX == 0) and (dY == 0):
+        printDebug("In moveBy, already at location " + str(dX) + ", " + str(dY), DEBUG_WARN)
+        return
+
+    # determine the length (in cm) we need to move to the new position
+    hypotenuse = math.hypot(dX, dY)
+
+    # our angle is set relative to the Y axis
+    # determine the angle to the new position (law of cosines, dY / hypotenuse)
+    angle = math.degrees(math.acos(dY / hypotenuse))  # acos gives the value in radians
+
+    if dX < 0:
+        angle = -angle
+
+    # turn & move
+    oldHeading = getAngle()
+    turnTo(angle)
+    moveForwardcm(hypotenuse)
+
+    xpos, ypos = xpos + dX, ypos + dY  # set the new position
+    pose_estimator.setPose(xpos, ypos)  # exactly where it was asked to go, rather than the sum of the motions
+
+    if turnBack:
+        # return to the original heading
+        turnTo(oldHeading)
+
+
+def moveTo(newX, newY, turnBack=False):
+    """ Moves to the x,y coordinate specified 
+        
+        When turned on, the robot begins at 0,0, and by definition is facing the positive coordinates of the Y axis
+
+        The robot's heading is changed from "facing the positive coordinates of the Y axis" by every movement command
+        If you want the robot to be "reset" to "facing the positive coordinates of the Y axis", call setAngle()
+        
+        Every movement command (including forward(), turnLeft() and motors()) updates the X & Y coordinates
+        Robot returns to original heading at the end of the function if turnBack is True
+
+        arguments:
+        newX - float new X position of the robot
+        newY - float new Y position of the robot
+        turnBack - boolean - True if the robot should turn back to the direction it faced prior to the command
+
+        returns:
+        none
+    """
+    global xpos, ypos
+
+    printDebug("In moveTo, moving to " + str(newX) + ", " + str(newY), DEBUG_INFO)
+
+    syncPose()
+    moveBy(newX - xpos, newY - ypos, turnBack)
+
+
+def noop():
+    """ Sends a command to the Sparki which should do nothing
+
+        Intended as a way to prevent serial timeouts
+
+        arguments:
+        none
+
+        returns:
+        none
+    """
+    printDebug("In noop", DEBUG_INFO)
+
+    if NOOP:
+        sendSerial(COMMAND_CODES["NOOP"])
+    else:
+        printDebug("no op is not available on sparki; simulating", DEBUG_WARN)
+        setStatusLED("on")
+        setStatusLED("off")
+
+
+def optimizeMoves(moves, tolerance=PATH_TOLERANCE, min_turn=PATH_MIN_TURN):
+    """ Returns the fewest turnBy() and moveForwardcm() commands which make the grid moves from where the robot is,
+        and how much time that saves over making the moves one at a time with moveTo(), moveBy(), turnTo() and turnBy()
+
+        Turns are added together and made the shorter way round, moves along a straight line are merged, and moves
+        shorter than tolerance and turns smaller than min_turn are dropped
+
+        arguments:
+        moves - list of grid moves, each one of (x, y) (the same as moveTo(x, y)), ("moveTo", x, y),
+                ("moveTo", x, y, turnBack), ("moveBy", dX, dY), ("moveBy", dX, dY, turnBack), ("turnTo", heading) or
+                ("turnBy", degrees)
+        tolerance - float centimeters; shorter moves are dropped, and points closer than this to a line are merged
+        min_turn - float degrees; smaller turns are dropped
+
+        returns:
+        tuple - (list of ("turnBy", degrees) and ("moveForwardcm", centimeters) tuples, float estimated seconds saved)
+    """
+    printDebug("In optimizeMoves, moves are " + str(moves), DEBUG_INFO)
+
+    moves = list(moves)
+    heading = getAngle()  # also updates xpos and ypos
+
+    commands = optimizeGridMoves(moves, xpos, ypos, heading, tolerance, min_turn)
+    saved = commandsTime(expandMoves(moves, xpos, ypos, heading), motion_model) - commandsTime(commands, motion_model)
+
+    printDebug("In optimizeMoves, " + str(len(commands)) + " commands, saving about " + str(round(saved, 2))
+               + " seconds", DEBUG_INFO)
+    return commands, saved
+
+
+def ping():
+    """ Returns the reading from the ultrasonic sensor on the servo
+
+        arguments:
+        none
+
+        returns:
+        int - approximate distance in centimeters from nearest object (-1 means nothing was found)
+    """
+    global command_semaphore
+    
+    with command_semaphore:
+        printDebug("In ping", DEBUG_INFO)
+
+        sendSerial(COMMAND_CODES["PING"])
+        result = getSerialInt()
+
+        if recording:
+            trajectory_recorder.sense(ping=result)
+
+        return result
+
+
+def planPath(newX, newY, scan=True, robot_radius=6.0):
+    """ Moves to the x,y coordinate specified, going around the obstacles on the map (see scanMap())
+
+        A path is planned on the map (with the obstacles grown by robot_radius, so the robot fits past them) and driven
+        as straight moves with moveTo(). If scan is True, the robot scans before it plans and after each move, and if
+        something new is in the way, it plans again from where it is. Space which hasn't been scanned is taken to be
+        free
+
+        arguments:
+        newX - float new X position of the robot
+        newY - float new Y position of the robot
+        scan - boolean - True if the robot should scan for obstacles as it goes
+        robot_radius - float cm from the middle of the robot to its farthest side
+
+        returns:
+        boolean - True if the robot got there; False if there's no path (or NumPy isn't installed)
+    """
+    printDebug("In planPath, moving to " + str(newX) + ", " + str(newY), DEBUG_INFO)
+
+    try:
+        from sparki_learning import planning  # imported here, because it needs NumPy
+    except ImportError as err:
+        printDebug("Planning needs NumPy; install it with pip install numpy", DEBUG_CRITICAL)
+        printDebug(str(err), DEBUG_DEBUG)
+        return False
+
+    if occupancy_map is None and clearMap() is None:
+        return False
+
+    for _ in range(planning.PLANNING_MAX_REPLANS):
+        if scan:
+            scanMap()
+
+        syncPose()
+        route = planning.planRoute(occupancy_map, (xpos, ypos), (newX, newY), robot_radius)
+
+        if route is None:
+            printDebug("In planPath, no path to " + str(newX) + ", " + str(newY), DEBUG_WARN)
+            return False
+
+        for index, point in enumerate(route):
+            moveTo(*point)
+
+            if scan and index < len(route) - 1:
+                scanMap()
+
+                if not planning.pathClear(occupancy_map, [(xpos, ypos)] + route[index + 1:], robot_radius):
+                    printDebug("In planPath, path is blocked; planning again", DEBUG_INFO)
+                    break
+        else:
+            return True
+
+    printDebug("In planPath, gave up after planning " + str(planning.PLANNING_MAX_REPLANS) + " times", DEBUG_WARN)
+    return False
+
+
+def printStats():
+    """ Prints a table of statistics about the commands sent to Sparki (see getStats())
+
+        arguments:
+        none
+
+        returns:
+        nothing
+    """
+    printDebug("In printStats", DEBUG_INFO)
+
+    print(formatStats(getStats()))
+
+
+def queueMotions(motions):
+    """ Makes a list of motions one straight after another -- like a dance, or the sides of a shape
+
+        With a robot which has a motion queue (library version 1.1.6 or later, built with MOTION_QUEUE), the motions
+        are put in the queue while the ones before them are still going, so Sparki starts each one the moment it's
+        done with the last, instead of waiting for the computer to hear that it's finished and send the next;
+        otherwise they're made one at a time. MOTION_QUEUE is opt-in (sparki_myro.ino as shipped doesn't define it,
+        since it hasn't been checked to fit in Sparki's memory), so a robot built from it makes them one at a time
+
+        For example, queueMotions([("servo", 80), ("beep", 100), ("turnBy", 90), ("moveForwardcm", 10)])
+
+        arguments:
+        motions - an iterator of motions, each one of ("moveForwardcm", centimeters), ("moveBackwardcm", centimeters),
+                  ("turnBy", degrees), ("motors", left_speed, right_speed, time), ("servo", position) or
+                  ("beep", time, freq) -- the same as calling that function (motors needs a time)
+
+        returns:
+        list - float seconds Sparki took to make each motion (None if it didn't say -- always, without a motion queue)
+    """
+    global centimeters_moved, in_motion, servo_position
+    global reply_wait_start
+
+    printDebug("In queueMotions, MOTION_QUEUE is " + str(MOTION_QUEUE), DEBUG_INFO)
+
+    times = []
+
+    if not MOTION_QUEUE:
+        functions = {"beep": beep, "motors": motors, "moveBackwardcm": moveBackwardcm,
+                     "moveForwardcm": moveForwardcm, "servo": servo, "turnBy": turnBy}
+
+        for motion in motions:
+            queuedMotion(motion, servo_position)  # checks the motion can be made, like it would be on the robot
+            functions[motion[0]](*motion[1:])
+            times.append(None)
+
+        return times
+
+    supersedeMotion()
+
+    with command_semaphore:
+        in_motion = True
+        pending = []  # the expected times of the motions in Sparki's queue which haven't been reported done
+        skipped_events[:] = []
+
+        try:
+            for motion in motions:
+                command, args, expected = queuedMotion(motion, servo_position)
+
+                while len(pending) >= MOTION_QUEUE_SIZE:
+                    times.append(waitForMotion(pending.pop(0)))
+
+                # while the queue is running, Sparki doesn't send SYNC until it's between motions -- so the motion is
+                # sent without waiting, and Sparki reads it then
+                sendSerial(COMMAND_CODES["QUEUE_MOTION"], [command] + args, sync=not pending)
+
+                if pending:
+                    reply_wait_start = None  # the reply waits for a motion to end, so it doesn't time the link
+
+                depth = getSerialInt()
+
+                if depth < 0:
+                    printDebug("In queueMotions, Sparki didn't queue " + str(motion), DEBUG_CRITICAL)
+                    raise RuntimeError("Sparki didn't queue " + str(motion))
+
+                # the motions which ended before the reply aren't counted in it (their events came before it)
+                while len(pending) >= depth:
+                    pending.pop(0)
+                    times.append(skipped_events.pop(0) if skipped_events else None)
+
+                pending.append(expected)
+
+                if command in (COMMAND_CODES["FORWARD_CM"], COMMAND_CODES["BACKWARD_CM"]):
+                    centimeters_moved += args[0]
+                elif command == COMMAND_CODES["SERVO"]:
+                    servo_position = args[0]
+
+            while pending:
+                times.append(waitForMotion(pending.pop(0)))
+
+            pose_estimator.settle()  # the queue is empty, so Sparki has finished every motion
+        except BaseException:
+            if pending:  # don't leave the robot running the rest of the queue
+                sendSerial(COMMAND_CODES["STOP"], sync=False)
+            raise
+        finally:
+            in_motion = False
+
+    syncPose()
+    return times
+
+
+def receiveIR():
+    """ Returns the reading from the IR sensor on front of the Sparki (presumably sent from another Sparki using sendIR)
+    
+        arguments:
+        none
+        
+        returns:
+        int - reading (-1 indicates no data is available)
+        note that the TERMINATOR and SYNC characters would never be received if sent
+    """
+    global command_semaphore
+    
+    with command_semaphore:
+        printDebug("In receiveIR", DEBUG_INFO)
+
+        sendSerial(COMMAND_CODES["RECEIVE_IR"])
+        result = getSerialInt()
+        return result
+
+
+def resetPosition():
+    """ Sets the number of degrees that the robot has turned to 0 and sets angle to 0 (used by the grid commands moveBy() & moveTo())
+        Like reseting the Sparki to the position when it was initialized
+
+        arguments:
+        none
+        
+        returns:
+        nothing
+    """
+    printDebug("In resetPosition", DEBUG_INFO)
+
+    setAngle(0)
+    setPosition(0, 0)
 
-        args = [centimeters]
 
-        in_motion = True
-        sendSerial(COMMAND_CODES["BACKWARD_CM"], args)
-        wait(centimeters * SECS_PER_CM)
-        in_motion = False
+def resetLinkStats():
+    """ Forgets the measurements of the Bluetooth link to Sparki (see getLinkStats())
+
+        arguments:
+        none
+
+        returns:
+        nothing
+    """
+    printDebug("In resetLinkStats", DEBUG_INFO)
 
+    link_monitor.reset()
 
-def moveForwardcm(centimeters):
-    """ Move Sparki forward by centimeters
+
+def resetStats():
+    """ Throws away the statistics about the commands sent to Sparki (see getStats()), and the wait drift (see
+        getWaitDrift())
 
         arguments:
-        centimeters - float number of centimeters to move
+        none
 
         returns:
         nothing
     """
-    global centimeters_moved
-    global in_motion
-    global command_semaphore
-    
-    with command_semaphore:
-        printDebug("In moveForwardcm, centimeters is " + str(centimeters), DEBUG_INFO)
+    global wait_drift
 
-        centimeters = float(centimeters)
-
-        if centimeters == 0:
-            printDebug("In moveForwardcm, centimeters is 0... doing nothing", DEBUG_WARN)
-            return
-        elif centimeters < 0:
-            printDebug("In moveForwardcm, centimeters is negative, calling moveBackwardcm", DEBUG_ERROR)
-            moveBackwardcm(-centimeters)
-            return
+    printDebug("In resetStats", DEBUG_INFO)
 
-        centimeters_moved += centimeters
+    command_stats.reset()
+    wait_drift = 0.0
 
-        args = [centimeters]
 
-        in_motion = True
-        sendSerial(COMMAND_CODES["FORWARD_CM"], args)
-        wait(centimeters * SECS_PER_CM)
-        in_motion = False
+def rotate(speed):
+    """ Synonym for turnRight -- use turnRight instead
+    """
+    turnRight(speed)
 
 
-def moveBy(dX, dY, turnBack=False):
-    """ Moves to the relative x,y coordinate specified (i.e. treats the current position as 0,0 and does a moveTo, but
-        maintains the x,y coordinates correctly; for example, if the robot is currently at 3,4, and you give it moveBy(1,2)
-        it will move to 4,5)
-        
-        When turned on, the robot begins at 0,0, and by definition is facing the positive coordinates of the Y axis
+def runProgram(steps):
+    """ Runs a list of steps -- motions, beeps, colors of the RGB LED and waits, repeated as many times as you like --
+        as one program on Sparki
 
-        The robot's heading is changed from "facing the positive coordinates of the Y axis" every time turnBy() is called
-        If you want the robot to be "reset" to "facing the positive coordinates of the Y axis", call setAngle() prior to this
+        With a robot which can run programs (library version 1.1.7 or later, built with EEPROM_PROGRAMS), the program
+        is stored in Sparki's EEPROM (see uploadProgram(); it isn't sent again if it's already there) and the robot
+        runs it by itself, so nothing waits on the bluetooth link between steps; otherwise the steps are made one at a
+        time. EEPROM_PROGRAMS is opt-in (sparki_myro.ino as shipped doesn't define it, since it hasn't been checked to
+        fit in Sparki's memory), so a robot built from it makes the steps one at a time. If runProgram() is
+        interrupted (e.g. with Ctrl-C), the robot stops the program before its next step
 
-        Only movement commands made via moveTo() or moveBy() will update the X & Y coordinates
-        Robot returns to original heading at the end of the function if turnBack is True
+        For example, runProgram([("repeat", 4, [("moveForwardcm", 10), ("turnBy", 90)]), ("beep", 200, 2800)])
 
         arguments:
-        dX - float relative X position of the robot
-        dY - float relative Y position of the robot
-        turnBack - boolean - True if the robot should turn back to the direction it faced prior to the command
+        steps - list of steps, each one of ("moveForwardcm", centimeters), ("moveBackwardcm", centimeters),
+                ("turnBy", degrees), ("motors", left_speed, right_speed, time), ("servo", position),
+                ("beep", time, freq), ("setRGBLED", red, green, blue), ("wait", seconds) -- the same as calling that
+                function (motors needs a time) -- or ("repeat", times, steps) to make a list of steps times over
+                (repeats may be inside one another, up to 4 deep)
 
         returns:
-        none
+        float - seconds Sparki took to run the program (None if it didn't say)
     """
-    global xpos, ypos
+    global centimeters_moved, in_motion, servo_position
 
-    printDebug("In moveBy, moving to relative position " + str(dX) + ", " + str(dY), DEBUG_INFO)
+    printDebug("In runProgram, EEPROM_PROGRAMS is " + str(EEPROM_PROGRAMS), DEBUG_INFO)
 
-    if (dX == 0) and (dY == 0):
-        printDebug("In moveBy, already at location " + str(dX) + ", " + str(dY), DEBUG_WARN)
-        return
+    code, seconds = compileProgram(steps)
 
-    # determine the length (in cm) we need to move to the new position
-    hypotenuse = math.hypot(dX, dY)
+    if not EEPROM_PROGRAMS:
+        functions = {COMMAND_CODES["BACKWARD_CM"]: lambda centimeters: moveBackwardcm(centimeters),
+                     COMMAND_CODES["BEEP"]: lambda freq, time: beep(int(time), int(freq)),
+                     COMMAND_CODES["FORWARD_CM"]: lambda centimeters: moveForwardcm(centimeters),
+                     COMMAND_CODES["MOTORS"]: lambda left, right, time: motors(left / 100, right / 100, time),
+                     COMMAND_CODES["SERVO"]: lambda position, settle: servo(int(position)),
+                     COMMAND_CODES["SET_RGB_LED"]: lambda red, green, blue: setRGBLED(red, green, blue),
+                     COMMAND_CODES["TURN_BY"]: lambda degrees: turnBy(degrees),
+                     PROGRAM_WAIT: lambda time: wait(time / 1000)}
 
-    # our angle is set relative to the Y axis
-    # determine the angle to the new position (law of cosines, dY / hypotenuse)
-    angle = math.degrees(math.acos(dY / hypotenuse))  # acos gives the value in radians
+        for command, args in expandProgram(code):
+            functions[command](*args)
 
-    if dX < 0:
-        angle = -angle
+        return None
 
-    # turn & move
-    oldHeading = getAngle()
-    turnTo(angle)
-    moveForwardcm(hypotenuse)
+    uploadProgram(steps)
+    supersedeMotion()
 
-    xpos, ypos = xpos + dX, ypos + dY  # set the new position
+    with command_semaphore:
+        in_motion = True
+        running = False
 
-    if turnBack:
-        # return to the original heading
-        turnTo(oldHeading)
+        try:
+            sendSerial(COMMAND_CODES["RUN_PROGRAM"], [EEPROM_PROGRAM_START + PROGRAM_HEADER_SIZE])
+            running = True
+
+            # the steps start one after another on the robot, like queued motions
+            for command, args in expandProgram(code):
+                if command == PROGRAM_WAIT:
+                    pose_estimator.addMove(0.0, 0.0, args[0] / 1000, True)
+                else:
+                    trackMotion(COMMAND_CODES["QUEUE_MOTION"], [command] + args, False)
+
+                if command in (COMMAND_CODES["FORWARD_CM"], COMMAND_CODES["BACKWARD_CM"]):
+                    centimeters_moved += args[0]
+                elif command == COMMAND_CODES["SERVO"]:
+                    servo_position = int(args[0])
+
+            elapsed = waitForMotion(seconds)
+            running = False
+        except BaseException:
+            if running:  # don't leave the robot running the rest of the program
+                sendSerial(COMMAND_CODES["STOP"], sync=False)
+            raise
+        finally:
+            in_motion = False
 
+        pose_estimator.settle()
 
-def moveTo(newX, newY, turnBack=False):
-    """ Moves to the x,y coordinate specified 
-        
-        When turned on, the robot begins at 0,0, and by definition is facing the positive coordinates of the Y axis
+    syncPose()
+    return elapsed
 
-        The robot's heading is changed from "facing the positive coordinates of the Y axis" every time turnBy() is called
-        If you want the robot to be "reset" to "facing the positive coordinates of the Y axis", call setAngle()
-        
-        Only movement commands made via moveTo() or moveBy() will update the X & Y coordinates
-        Robot returns to original heading at the end of the function if turnBack is True
+
+def runMoves(moves, optimize=True, tolerance=PATH_TOLERANCE):
+    """ Makes a list of grid moves, keeping track of the x,y position like moveTo() and moveBy()
 
         arguments:
-        newX - float new X position of the robot
-        newY - float new Y position of the robot
-        turnBack - boolean - True if the robot should turn back to the direction it faced prior to the command
+        moves - list of grid moves (see optimizeMoves())
+        optimize - boolean; if True, the moves are made with the fewest commands (see optimizeMoves()); otherwise
+                   they're made one at a time, exactly as moveTo(), moveBy(), turnTo() and turnBy() would
+        tolerance - float centimeters the robot may be off the path when optimize is True
 
         returns:
-        none
+        float - estimated seconds saved by optimizing (0 if optimize is False)
     """
     global xpos, ypos
 
-    printDebug("In moveTo, moving to " + str(newX) + ", " + str(newY), DEBUG_INFO)
+    printDebug("In runMoves, optimize is " + str(optimize), DEBUG_INFO)
 
-    moveBy(newX - xpos, newY - ypos, turnBack)
+    moves = list(moves)
+    syncPose()
 
+    if optimize:
+        commands, saved = optimizeMoves(moves, tolerance)
+    else:
+        commands, saved = expandMoves(moves, xpos, ypos, getAngle()), 0.0
 
-def noop():
-    """ Sends a command to the Sparki which should do nothing
+    targets = [(x, y) for kind, x, y, _ in gridTargets(moves, xpos, ypos) if kind == "move"]
 
-        Intended as a way to prevent serial timeouts
+    queueMotions(commands)  # with a motion queue on the robot, there's no pause between the commands
+
+    if targets:
+        xpos, ypos = targets[-1]
+        pose_estimator.setPose(xpos, ypos)
+
+    return saved
+
+
+def saveRecording(filename):
+    """ Saves the run recorded since startRecording() to a file, to be loaded with loadTrajectory()
 
         arguments:
-        none
+        filename - string name of the file; if it ends with .npz, the file is compressed, otherwise it's a .npy file
 
         returns:
-        none
+        boolean - True if there was a recording to save
     """
-    printDebug("In noop", DEBUG_INFO)
+    printDebug("In saveRecording, filename is " + str(filename), DEBUG_INFO)
 
-    if NOOP:
-        sendSerial(COMMAND_CODES["NOOP"])
-    else:
-        printDebug("no op is not available on sparki; simulating", DEBUG_WARN)
-        setStatusLED("on")
-        setStatusLED("off")
+    if trajectory_recorder is None:
+        printDebug("In saveRecording, nothing has been recorded", DEBUG_WARN)
+        return False
 
+    trajectory_recorder.save(filename)
+    return True
 
-def ping():
-    """ Returns the reading from the ultrasonic sensor on the servo
+
+def scan(angles=None):
+    """ Measures the distance to obstacles at each of a list of servo angles -- a sweep of the ultrasonic sensor
+
+        The angles are visited in order (starting from the end nearer where the servo is pointing, so repeated scans
+        sweep back and forth), and the servo is only given as long as it needs to turn between them, so this is much
+        faster than calling getObstacle() for each angle
 
         arguments:
-        none
+        angles - list of ints between SERVO_LEFT (-80) and SERVO_RIGHT (80); defaults to every 10 degrees from
+                 SERVO_LEFT to SERVO_RIGHT
 
         returns:
-        int - approximate distance in centimeters from nearest object (-1 means nothing was found)
+        NumPy array with a row of (angle, distance) for each of angles, in the same order; a distance of -1 means
+        nothing was found. If NumPy isn't installed, a tuple of (angle, distance) tuples
     """
-    global command_semaphore
-    
-    with command_semaphore:
-        printDebug("In ping", DEBUG_INFO)
+    printDebug("In scan, angles are " + str(angles), DEBUG_INFO)
 
-        sendSerial(COMMAND_CODES["PING"])
-        result = getSerialInt()
-        return result
+    if angles is None:
+        angles = range(SERVO_LEFT, SERVO_RIGHT + 1, 10)
 
+    result = servoScan(angles)
 
-def receiveIR():
-    """ Returns the reading from the IR sensor on front of the Sparki (presumably sent from another Sparki using sendIR)
-    
-        arguments:
-        none
-        
-        returns:
-        int - reading (-1 indicates no data is available)
-        note that the TERMINATOR and SYNC characters would never be received if sent
-    """
-    global command_semaphore
-    
-    with command_semaphore:
-        printDebug("In receiveIR", DEBUG_INFO)
+    try:
+        import numpy  # imported here, because NumPy isn't needed by the rest of the library
+    except ImportError:
+        return tuple(result)
 
-        sendSerial(COMMAND_CODES["RECEIVE_IR"])
-        result = getSerialInt()
-        return result
+    return numpy.array(result, dtype=int).reshape(-1, 2)
 
 
-def resetPosition():
-    """ Sets the number of degrees that the robot has turned to 0 and sets angle to 0 (used by the grid commands moveBy() & moveTo())
-        Like reseting the Sparki to the position when it was initialized
+def scanMap(angles=None):
+    """ Scans for obstacles (see scan()) and adds what was found to the map, at the robot's position on the grid
+
+        The cells a ping passed through are marked more likely free, and the cell where it found something more
+        likely occupied, so the map gets better the more it's scanned. The first scan starts a map with 2 cm cells
+        (see clearMap())
 
         arguments:
-        none
-        
+        angles - list of ints between SERVO_LEFT (-80) and SERVO_RIGHT (80); defaults to every 10 degrees from
+                 SERVO_LEFT to SERVO_RIGHT
+
         returns:
-        nothing
+        OccupancyGrid - the map (see getMap()); None if NumPy isn't installed
     """
-    printDebug("In resetPosition", DEBUG_INFO)
+    printDebug("In scanMap, angles are " + str(angles), DEBUG_INFO)
 
-    setAngle(0)
-    setPosition(0, 0)
+    if occupancy_map is None and clearMap() is None:
+        return None
 
+    if angles is None:
+        angles = range(SERVO_LEFT, SERVO_RIGHT + 1, 10)
 
-def rotate(speed):
-    """ Synonym for turnRight -- use turnRight instead
-    """
-    turnRight(speed)
+    readings = servoScan(angles)
+    syncPose()
+    occupancy_map.addScan(xpos, ypos, degrees_turned, readings)
+
+    return occupancy_map
 
 
 def sendIR(sendMe):
@@ -2318,16 +4138,19 @@ def senses():
 ## end senses() ##
 
 
-def servo(position):
+def servo(position, blocking=True, force=False):
     """ Turns the servo 'head' to the position (in degrees) specified
 
         arguments:
         position - integer between -80 (left side) and 80 (right side) to "aim" the servo
+        blocking - boolean; if False, this returns without waiting for the head to turn
+        force - boolean; if True, the command is sent even if the servo is known to be at position already
 
         returns:
-        nothing
+        nothing if blocking is True; otherwise a MotionHandle, with done(), wait(), cancel() and remaining()
     """
     global command_semaphore
+    global servo_position
     
     with command_semaphore:
         printDebug("In servo, position is " + str(position), DEBUG_INFO)
@@ -2335,9 +4158,19 @@ def servo(position):
         position = int(constrain(position, SERVO_LEFT, SERVO_RIGHT))
         args = [position]
 
+        if not force and actuator_shadow.unchanged(COMMAND_CODES["SERVO"], args):
+            command_stats.addElided(COMMAND_CODES["SERVO"])
+            return None if blocking else MotionHandle(0.0, False)
+
+        settle = servoSettleTime(position - servo_position)
+
         sendSerial(COMMAND_CODES["SERVO"], args)
+        servo_position = position
+
+        if not blocking:
+            return MotionHandle(settle, False)  # the servo can't be stopped part way, so cancel() won't stop it
         
-        wait(.1)  # be sure the head has time to turn
+        wait(settle)  # be sure the head has time to turn
 
 
 def setAngle(newAngle=0):
@@ -2358,6 +4191,27 @@ def setAngle(newAngle=0):
     newAngle = float(wrapAngle(newAngle))  # ensure we're getting a float between -360 and 360
 
     degrees_turned = newAngle
+    pose_estimator.setPose(heading=newAngle)
+
+
+def setCompassFusion(weight=.1):
+    """ Uses the compass to correct the robot's heading (see getAngle()), which is otherwise only worked out from
+        the motion commands and drifts
+
+        Each time compass() is called, the heading is moved weight of the way toward the compass heading; the first
+        reading only finds which compass heading is the robot's heading of 0. The compass is affected by metal and
+        magnets nearby, so small weights are best
+
+        arguments:
+        weight - float between 0 and 1; 0 stops using the compass
+
+        returns:
+        nothing
+    """
+    printDebug("In setCompassFusion, weight is " + str(weight), DEBUG_INFO)
+
+    pose_estimator.compass_weight = float(constrain(weight, 0.0, 1.0))
+    pose_estimator.compass_offset = None
 
 
 setDebug = setGlobalDebug
@@ -2421,12 +4275,15 @@ def setName(newName):
     
         robot_name = newName
 
+    entry = connection_cache.lookup(serial_port)
+
+    if entry is not None:  # the robot is known by its name now, so its calibration goes with it
+        updateConnectionCache(calibration=entry.get("calibration"))
+
 
 def setPosition(newX, newY):
     """ Sets the current x,y position of Sparki - used with the grid commands (moveTo() & moveBy())
         Note that this does not move the robot, but merely tells it that it is at another location
-        Also note that only use of the grid commands actually changes this value -- the x & y coordinates
-        do not change for other move commends
         The robot begins at 0,0, and by definition is facing the positive coordinates of the Y axis
 
         arguments:
@@ -2442,15 +4299,17 @@ def setPosition(newX, newY):
 
     xpos = float(newX)
     ypos = float(newY)
+    pose_estimator.setPose(xpos, ypos)
 
 
-def setRGBLED(red, green, blue):
+def setRGBLED(red, green, blue, force=False):
     """ Sets the RGB LED to the color given -- colors should be a value between 0 and 100, which is a percentage of that color
 
         arguments:
         red - int between 0 and 100 which is an amount of brightness for that LED
         green - int between 0 and 100 which is an amount of brightness for that LED
         blue - int between 0 and 100 which is an amount of brightness for that LED
+        force - boolean; if True, the command is sent even if the LED is known to be that color already
 
         arcbotics recommends the following values for the specified colors:
         blue   0,   0,   100
@@ -2482,6 +4341,10 @@ def setRGBLED(red, green, blue):
         blue = int(constrain(blue, 0, 100))
         args = [red, green, blue]
 
+        if not force and actuator_shadow.unchanged(COMMAND_CODES["SET_RGB_LED"], args):
+            command_stats.addElided(COMMAND_CODES["SET_RGB_LED"])
+            return
+
         sendSerial(COMMAND_CODES["SET_RGB_LED"], args)
 
 
@@ -2508,6 +4371,23 @@ def setSparkiDebug(level):
         printDebug("Setting sparki debug level is not available", DEBUG_ERROR)
 
 
+def setWaitTolerance(tolerance=WAIT_TOLERANCE):
+    """ Sets how many seconds before the end of each wait() are spent spinning (checking the time over and over)
+        instead of sleeping. More is more precise, but keeps the computer busy for longer
+
+        arguments:
+        tolerance - float seconds; 0 only sleeps
+
+        returns:
+        nothing
+    """
+    global wait_tolerance
+
+    printDebug("In setWaitTolerance, tolerance is " + str(tolerance), DEBUG_INFO)
+
+    wait_tolerance = float(constrain(tolerance, 0, 1))
+
+
 def setStatusLED(brightness):
     """ Sets the status LED to the brightness given -- should be a number between 0 and 100, which is a percentage
         Note that the internal Sparki code makes use of the status LED to show when it is executing a command
@@ -2534,6 +4414,43 @@ def setStatusLED(brightness):
         sendSerial(COMMAND_CODES["SET_STATUS_LED"], args)
 
 
+def startRecording(interval=.1):
+    """ Starts recording the robot's run: its position and heading (see getPosition() and getAngle()), the wheel
+        speeds it's been told to use, and its latest ping(), getLight() and getLine() readings
+
+        A row is recorded for each motion command and sensor reading, and every interval seconds in between (so
+        curves are recorded). Any run recorded before is thrown away. Needs NumPy (pip install numpy)
+
+        arguments:
+        interval - float seconds between the rows recorded while nothing else happens; None for no rows in between
+
+        returns:
+        boolean - True if recording started; False if NumPy isn't installed
+    """
+    global recording
+    global trajectory_recorder
+    printDebug("In startRecording, interval is " + str(interval), DEBUG_INFO)
+
+    try:
+        from sparki_learning.trajectory import TrajectoryRecorder  # imported here, because it needs NumPy
+    except ImportError as err:
+        printDebug("Recording needs NumPy; install it with pip install numpy", DEBUG_CRITICAL)
+        printDebug(str(err), DEBUG_DEBUG)
+        return False
+
+    if trajectory_recorder is not None:
+        trajectory_recorder.stopSampling()
+
+    trajectory_recorder = TrajectoryRecorder(pose_estimator.pose)
+    trajectory_recorder.sample()
+    recording = True
+
+    if interval is not None and interval > 0:
+        trajectory_recorder.startSampling(interval)
+
+    return True
+
+
 def stop():
     """ Stops the robot and the gripper
     
@@ -2546,6 +4463,8 @@ def stop():
     global in_motion
     global command_semaphore
 
+    supersedeMotion()
+
     with command_semaphore:
         printDebug("In stop", DEBUG_INFO)
 
@@ -2553,6 +4472,28 @@ def stop():
         in_motion = False
 
 
+def stopRecording():
+    """ Stops recording the robot's run (see startRecording())
+
+        arguments:
+        none
+
+        returns:
+        NumPy structured array - the run recorded (see getRecording()); None if nothing was being recorded
+    """
+    global recording
+    printDebug("In stopRecording", DEBUG_INFO)
+
+    if not recording:
+        return None
+
+    recording = False
+    trajectory_recorder.stopSampling()
+    trajectory_recorder.sample()
+
+    return trajectory_recorder.array()
+
+
 def syncWait(server_ip=None, server_port=32216):
     """ Wait for a time specified by a sync server over a network
 
@@ -2587,20 +4528,29 @@ def translate(speed):
     forward(speed)
 
 
-def turnBy(degrees):
+def turnBy(degrees, blocking=True):
     """ Turn Sparki by degrees; positive numbers turn clockwise & negative numbers turn counter clockwise
 
         arguments:
         degrees - float number of degrees to turn; positive is clockwise and negative is counter clockwise; should
                   be greater than -360 and less than 360 (Note that the clockwise direction is different than the
                   Myro library)
+        blocking - boolean; if False, this returns as soon as the robot starts turning, so that other commands can
+                   be given while it turns
 
         returns:
-        nothing
+        nothing if blocking is True; otherwise a MotionHandle, with done(), wait(), cancel() and remaining()
     """
     global degrees_turned, in_motion
     global command_semaphore
 
+    if not blocking:
+        printDebug("In turnBy, degrees is " + str(degrees) + " (not blocking)", DEBUG_INFO)
+        degrees = wrapAngle(float(degrees))
+        return startTurn(0 if abs(degrees) >= 360 else degrees)
+
+    supersedeMotion()
+
     with command_semaphore:
         printDebug("In turnBy, degrees is " + str(degrees), DEBUG_INFO)
 
@@ -2614,6 +4564,7 @@ def turnBy(degrees):
             printDebug("In turnBy, degrees is 0... doing nothing", DEBUG_WARN)
             return
 
+        syncPose()
         degrees_turned += degrees
 
         # keep degrees_turned greater than -360 and less than 360
@@ -2625,13 +4576,13 @@ def turnBy(degrees):
 
         in_motion = True
         sendSerial(COMMAND_CODES["TURN_BY"], args)
-        wait(abs(degrees) * SECS_PER_DEGREE)
+        waitForMotion(motion_model.turnTime(degrees))
         in_motion = False
 
 
 def turnTo(newHeading):
     """ Turns Sparki to the heading specified, where 0 is the heading the Sparki was at when initialized
-        Note that the heading only changes from turnBy() or turnTo() commands and not turnLeft(), turnRight(), or motors()
+        Note that every movement command changes the heading, including turnLeft(), turnRight() and motors()
 
         Note that the functionality of this command changed between library versions 1.0.0 and 1.1.0
 
@@ -2710,8 +4661,61 @@ def turnRight(speed, time=-1):
     motors(speed, -speed, time)
 
 
+def uploadProgram(steps, verify=True):
+    """ Stores the program for a list of steps in Sparki's EEPROM, where runProgram() runs it from -- only on a robot
+        built with EEPROM_PROGRAMS, which is opt-in (see runProgram())
+
+        The program is written after a header which identifies it; the header is written last (so a program which
+        wasn't completely written is never run), and if the header on the robot already matches, nothing is written
+
+        arguments:
+        steps - list of steps; see runProgram()
+        verify - boolean; if True, each piece of the program is read back to check it was written correctly
+
+        returns:
+        int - the number of bytes written to the EEPROM (0 if the program was already there)
+    """
+    printDebug("In uploadProgram, EEPROM_PROGRAMS is " + str(EEPROM_PROGRAMS), DEBUG_INFO)
+
+    if not EEPROM_PROGRAMS:
+        printDebug("uploadProgram not implemented on Sparki", DEBUG_CRITICAL)
+        raise NotImplementedError
+
+    code, _ = compileProgram(steps)
+    header = programHeader(code)
+
+    try:
+        on_robot = EEPROMread(EEPROM_PROGRAM_START, len(header))
+    except UnicodeDecodeError:  # nothing has been written there (an EEPROM is erased to 0xff)
+        on_robot = None
+
+    if on_robot == header:
+        printDebug("In uploadProgram, the program is already on Sparki", DEBUG_INFO)
+        return 0
+
+    EEPROMwrite(EEPROM_PROGRAM_START, "")  # the old header no longer matches what's after it
+
+    # an empty program still needs its TERMINATOR, over whatever was there before
+    for location, text in programChunks(code, EEPROM_PROGRAM_START + PROGRAM_HEADER_SIZE) or \
+            [(EEPROM_PROGRAM_START + PROGRAM_HEADER_SIZE, "")]:
+        EEPROMwrite(location, text)
+
+        if verify and text and EEPROMread(location, len(text)) != text:
+            printDebug("In uploadProgram, the EEPROM at " + str(location) + " doesn't read back as " + text,
+                       DEBUG_CRITICAL)
+            raise RuntimeError("Unable to write the program to Sparki's EEPROM")
+
+    EEPROMwrite(EEPROM_PROGRAM_START, header)
+
+    printDebug("In uploadProgram, wrote " + str(len(code)) + " characters of program", DEBUG_INFO)
+    return PROGRAM_HEADER_SIZE + len(code) + 1
+
+
 def wait(wait_time):
-    """ Wait for wait_time seconds; actual time will vary somewhat due to factors outside of program control
+    """ Wait for wait_time seconds
+
+        It sleeps until a deadline (so the time taken by the function itself isn't added), spinning for the last
+        moments to wake up on time (see setWaitTolerance()); any time it ends late is added to getWaitDrift()
     
         arguments:
         wait_time - float number of seconds to wait
@@ -2719,6 +4723,9 @@ def wait(wait_time):
         returns:
         nothing
     """
+    global wait_drift
+
+    start = time.perf_counter()
     printDebug("In wait, wait_time is " + str(wait_time), DEBUG_INFO)
     wait_time = float(wait_time)
     maxWait = 600
@@ -2731,12 +4738,14 @@ def wait(wait_time):
 
     wait_time = float(constrain(wait_time, 0, maxWait))  # don't wait longer than ten minutes
 
-    time.sleep(wait_time)  # in Python >= 3.5, it will wait at least wait_time seconds; prior to that it could be less
+    wait_drift += sleepUntil(start + wait_time, wait_tolerance)
 
 
 def waitNoop(wait_time):
-    """ Wait for wait_time seconds while sending noops to sparki; actual time will vary somewhat due to factors outside of program control
-        less accurate for timing than wait, but may maintain a serial connection better
+    """ Wait for wait_time seconds while sending noops to sparki; may maintain a serial connection better than wait
+
+        A noop is sent every second; the seconds are counted from the start (like wait()), so the time the noops take
+        doesn't add up
     
         arguments:
         wait_time - float number of seconds to wait
@@ -2744,6 +4753,9 @@ def waitNoop(wait_time):
         returns:
         nothing
     """
+    global wait_drift
+
+    start = time.perf_counter()
     printDebug("In waitNoop, wait_time is " + str(wait_time), DEBUG_INFO)
     wait_time = float(wait_time)
     maxWait = 1200
@@ -2754,32 +4766,25 @@ def waitNoop(wait_time):
                    DEBUG_ERROR)
 
     wait_time = float(constrain(wait_time, 0, maxWait))  # don't wait longer than maxWait seconds
+    deadline = start + wait_time
+    next_noop = start
 
-    for s in timer(wait_time):
+    while next_noop < deadline:
         noop()
-        time_remaining = wait_time - s
-
-        if time_remaining <= sleepTime:
-            time.sleep(
-                time_remaining)  # in Python >= 3.5, it will wait at least wait_time seconds; prior to that it could be less
-        else:
-            time.sleep(sleepTime)
-
 
-###################### END OF SPARKI MYRO FUNCTIONS ######################
+        while next_noop <= time.perf_counter():  # skip any noops which a slow one (or a slow link) has made late
+            next_noop += sleepTime
 
+        late = sleepUntil(min(next_noop, deadline), wait_tolerance)
 
-### functions which cannot be or are not implemented ###
-def arcBy(args=None):
-    printDebug("arcBy not implemented on Sparki", DEBUG_CRITICAL)
-    raise NotImplementedError
+    if wait_time > 0:
+        wait_drift += late
 
 
-def arcTo(args=None):
-    printDebug("arcTo not implemented on Sparki", DEBUG_CRITICAL)
-    raise NotImplementedError
+###################### END OF SPARKI MYRO FUNCTIONS ######################
 
 
+### functions which cannot be or are not implemented ###
 def getIR(args=None):
     printDebug("getIR cannot be implemented on Sparki", DEBUG_CRITICAL)
     raise NotImplementedError
@@ -2818,5 +4823,10 @@ def main():
     print("Exiting...")
 
 
+# have every function above wrapped, once a trace hook is added, so that the hooks (see sparki_learning.trace) are
+# called around them
+traceModule(globals(), __name__)
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,276 @@
+################## Sparki Learning Library Command Statistics ##################
+#
+# This file keeps track of how long the commands sent to Sparki take, so that it is possible to tell whether
+# slowness comes from the Bluetooth link, the robot or the Python code
+#
+# Every command code in COMMAND_CODES gets a count, the number of bytes sent and received, and histograms of the
+# time spent waiting for SYNC, writing, reading the reply and the whole exchange (end to end) -- and the count of
+# commands which weren't sent because they wouldn't have changed anything (see shadow.py)
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+import threading
+import time
+
+from sparki_learning.constants import COMMAND_CODES
+
+
+# ***** HISTOGRAM CONSTANTS ***** #
+# the histograms use fixed, log scale buckets so they take the same amount of memory however many commands are sent
+HISTOGRAM_MIN = 1e-5  # the lowest bucket boundary in seconds (10 microseconds); anything less goes in the underflow bucket
+HISTOGRAM_DECADES = 7  # the number of powers of 10 covered above HISTOGRAM_MIN (so up to 100 seconds)
+HISTOGRAM_BUCKETS_PER_DECADE = 5  # the number of buckets in each power of 10
+HISTOGRAM_BUCKETS = HISTOGRAM_DECADES * HISTOGRAM_BUCKETS_PER_DECADE
+
+# the boundaries are computed once; bucket i (1 to HISTOGRAM_BUCKETS) holds values less than HISTOGRAM_BOUNDS[i]
+HISTOGRAM_BOUNDS = [HISTOGRAM_MIN * 10 ** (i / HISTOGRAM_BUCKETS_PER_DECADE) for i in range(HISTOGRAM_BUCKETS + 1)]
+
+# the names of the timings kept for each command, in the order they're printed
+TIMINGS = ("sync_wait", "write", "reply", "latency")
+
+
+class Histogram:
+    """ A log scale histogram of times (in seconds) with a fixed number of buckets
+
+        Bucket 0 holds everything less than HISTOGRAM_MIN and the last bucket holds everything of
+        HISTOGRAM_MIN * 10 ** HISTOGRAM_DECADES or more; count, total, min and max are kept exactly
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def add(self, value):
+        """ Adds value (float seconds) to the histogram """
+        self.counts[self.bucket(value)] += 1
+        self.count += 1
+        self.total += value
+
+        if value < self.minimum:
+            self.minimum = value
+
+        if value > self.maximum:
+            self.maximum = value
+
+    @staticmethod
+    def bucket(value):
+        """ Returns the index of the bucket in which value belongs """
+        if value < HISTOGRAM_MIN:
+            return 0
+
+        # binary search of the (sorted) boundaries
+        low, high = 1, HISTOGRAM_BUCKETS + 1
+
+        while low < high:
+            middle = (low + high) // 2
+
+            if value < HISTOGRAM_BOUNDS[middle]:
+                high = middle
+            else:
+                low = middle + 1
+
+        return low
+
+    def mean(self):
+        """ Returns the average of the values added, or 0 if there are none """
+        if self.count == 0:
+            return 0.0
+
+        return self.total / self.count
+
+    def percentile(self, percent):
+        """ Returns an estimate of the value below which percent (0 to 100) of the values fall
+
+            The estimate is the upper boundary of the bucket holding that value (clamped to the real min and max)
+        """
+        if self.count == 0:
+            return 0.0
+
+        target = self.count * percent / 100.0
+        seen = 0
+
+        for index, amount in enumerate(self.counts):
+            seen += amount
+
+            if amount and seen >= target:
+                if index == 0:
+                    estimate = HISTOGRAM_MIN
+                elif index > HISTOGRAM_BUCKETS:
+                    estimate = self.maximum
+                else:
+                    estimate = HISTOGRAM_BOUNDS[index]
+
+                return min(max(estimate, self.minimum), self.maximum)
+
+        return self.maximum
+
+    def reset(self):
+        """ Empties the histogram """
+        self.counts = [0] * (HISTOGRAM_BUCKETS + 2)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = 0.0
+
+    def summary(self):
+        """ Returns a dictionary of count, total, mean, min, max, p50, p90 and p99 (times are in seconds) """
+        return {"count": self.count,
+                "total": self.total,
+                "mean": self.mean(),
+                "min": self.minimum if self.count else 0.0,
+                "max": self.maximum,
+                "p50": self.percentile(50),
+                "p90": self.percentile(90),
+                "p99": self.percentile(99)}
+
+
+class CommandStats:
+    """ The statistics kept for a single command code """
+
+    def __init__(self):
+        self.count = 0
+        self.elided = 0  # commands not sent, because they wouldn't have changed anything
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.timings = {name: Histogram() for name in TIMINGS}
+
+    def summary(self):
+        """ Returns a dictionary of the statistics for this command """
+        result = {"count": self.count,
+                  "elided": self.elided,
+                  "bytes_sent": self.bytes_sent,
+                  "bytes_received": self.bytes_received}
+
+        for name in TIMINGS:
+            result[name] = self.timings[name].summary()
+
+        return result
+
+
+class CommandRecorder:
+    """ Records the statistics of each command sent to Sparki
+
+        sendSerial() calls begin() for every command; the times spent waiting for SYNC, writing and reading the reply
+        are added to the command in progress. A command is finished (and its end to end latency recorded) when the
+        next command begins; reading the statistics meanwhile leaves it alone, so its latency isn't in them yet
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.names = {code: name for name, code in COMMAND_CODES.items()}
+        self._clear()
+
+    def begin(self, command):
+        """ Starts recording command (a command code from COMMAND_CODES) """
+        now = time.perf_counter()
+
+        with self.lock:
+            self._finish()
+            self.current = self._stats(command)
+            self.current.count += 1
+            self.current_start = now
+            self.current_last = now
+
+    def addElided(self, command):
+        """ Counts a command (a command code from COMMAND_CODES) which wasn't sent, because it wouldn't have changed
+            anything
+        """
+        with self.lock:
+            self._stats(command).elided += 1
+
+    def addSyncWait(self, seconds):
+        """ Adds the time spent waiting for SYNC to the command in progress """
+        self._add("sync_wait", seconds, 0, 0)
+
+    def addWrite(self, seconds, byte_count):
+        """ Adds the time spent writing byte_count bytes to the command in progress """
+        self._add("write", seconds, byte_count, 0)
+
+    def addReply(self, seconds, byte_count):
+        """ Adds the time spent reading a reply of byte_count bytes to the command in progress """
+        self._add("reply", seconds, 0, byte_count)
+
+    def touch(self):
+        """ Marks now as the most recent activity of the command in progress """
+        with self.lock:
+            if self.current is not None:
+                self.current_last = time.perf_counter()
+
+    def reset(self):
+        """ Throws away all statistics """
+        with self.lock:
+            self._clear()
+
+    def summary(self):
+        """ Returns a dictionary mapping command names (e.g. "PING") to their statistics (a snapshot; the command in
+            progress is left running)
+        """
+        with self.lock:
+            return {name: stats.summary() for name, stats in sorted(self.commands.items())}
+
+    def _add(self, timing, seconds, sent, received):
+        with self.lock:
+            if self.current is None:
+                return
+
+            self.current.timings[timing].add(seconds)
+            self.current.bytes_sent += sent
+            self.current.bytes_received += received
+            self.current_last = time.perf_counter()
+
+    def _clear(self):
+        # must be called with the lock held (or from __init__)
+        self.commands = {}
+        self.current = None
+        self.current_start = 0.0
+        self.current_last = 0.0
+
+    def _finish(self):
+        # must be called with the lock held
+        if self.current is not None:
+            self.current.timings["latency"].add(self.current_last - self.current_start)
+            self.current = None
+
+    def _stats(self, command):
+        name = self.names.get(command, str(command))
+
+        if name not in self.commands:
+            self.commands[name] = CommandStats()
+
+        return self.commands[name]
+
+
+def formatStats(stats):
+    """ Returns a printable table of the statistics returned by CommandRecorder.summary()
+
+        arguments:
+        stats - dictionary of command names to statistics
+
+        returns:
+        string - one line per command and timing, times in milliseconds
+    """
+    lines = ["{:<18} {:>6} {:>6} {:>8} {:>8}  {:<9} {:>9} {:>9} {:>9} {:>9} {:>9}".format(
+        "command", "count", "elided", "sent", "recv", "timing", "mean ms", "p50 ms", "p90 ms", "p99 ms", "max ms")]
+
+    for name, command in stats.items():
+        prefix = "{:<18} {:>6} {:>6} {:>8} {:>8}".format(name, command["count"], command["elided"],
+                                                         command["bytes_sent"], command["bytes_received"])
+        first = True
+
+        for timing in TIMINGS:
+            hist = command[timing]
+
+            if hist["count"] == 0:
+                continue
+
+            lines.append("{}  {:<9} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+                prefix if first else " " * len(prefix), timing, hist["mean"] * 1000, hist["p50"] * 1000,
+                hist["p90"] * 1000, hist["p99"] * 1000, hist["max"] * 1000))
+            first = False
+
+        if first and command["elided"]:  # never sent, only elided
+            lines.append(prefix)
+
+    return "\n".join(lines)
@@ -0,0 +1,287 @@
+################## Sparki Learning Library Tracing ##################
+#
+# This file implements hooks which are called before and after the functions in sparki_myro (the public commands,
+# sendSerial(), waitForSync() and the getSerial functions which read replies), and a hook which saves those calls
+# as a Chrome / Perfetto trace (load the file in chrome://tracing or https://ui.perfetto.dev)
+#
+# Because the library calls its own functions, the spans nest -- for example, moveTo() contains turnTo(), which
+# contains turnBy(), which contains sendSerial(), which contains waitForSync()
+#
+# The functions are only wrapped when the first hook is added, so until then calls cost nothing extra; afterwards, a
+# traced function costs a single check of an empty list before calling the original whenever no hooks are left
+#
+# for example:
+#   startTrace("square.json")
+#   for side in range(4):
+#       moveForwardcm(10)
+#       turnBy(90)
+#   stopTrace()
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+import functools
+import os
+import sys
+import threading
+import time
+import types
+
+from sparki_learning.util import *
+
+
+# ***** TRACE HOOKS ***** #
+# a pre hook is called as hook(name, args, kwargs) before a traced function runs
+# a post hook is called as hook(name, result, error) after it returns (error is None) or raises (result is None)
+pre_hooks = []
+post_hooks = []
+
+current_trace = None  # the ChromeTrace started by startTrace()
+
+# the (namespace, module_name, exclude) of each module given to traceModule() whose functions haven't been wrapped yet
+untraced_modules = []
+
+
+class ChromeTrace:
+    """ Collects begin and end events from the trace hooks and saves them in the Chrome trace event format
+
+        arguments:
+        filename - string path of the file to save
+        max_events - int maximum number of events to keep (the oldest are kept; later ones are counted as dropped)
+    """
+
+    def __init__(self, filename, max_events=1000000):
+        self.filename = filename
+        self.max_events = max_events
+        self.dropped = 0
+        self.events = []
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.start_time = time.perf_counter()
+        self.threads = {}  # thread id -> thread name
+
+    def pre(self, name, args, kwargs):
+        arguments = [repr(arg)[:40] for arg in args] + ["{}={}".format(k, repr(v)[:40]) for k, v in kwargs.items()]
+        self._add({"name": name, "ph": "B", "args": {"arguments": ", ".join(arguments)}})
+
+    def post(self, name, result, error):
+        event = {"name": name, "ph": "E"}
+
+        if error is not None:
+            event["args"] = {"error": repr(error)}
+        elif result is not None:
+            event["args"] = {"result": repr(result)[:80]}
+
+        self._add(event)
+
+    def save(self):
+        """ Writes the trace to filename """
+        with self.lock:
+            metadata = [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                        for tid, name in self.threads.items()]
+            trace = {"traceEvents": metadata + self.events,
+                     "displayTimeUnit": "ms",
+                     "otherData": {"dropped_events": self.dropped}}
+
+        import json  # only needed when a trace is saved
+
+        with open(self.filename, "w") as f:
+            json.dump(trace, f)
+
+    def _add(self, event):
+        thread = threading.current_thread()
+        event["ts"] = (time.perf_counter() - self.start_time) * 1000000  # trace events are in microseconds
+        event["pid"] = self.pid
+        event["tid"] = thread.ident
+        event["cat"] = "sparki"
+
+        with self.lock:
+            if len(self.events) >= self.max_events:
+                self.dropped += 1
+                return
+
+            self.threads[thread.ident] = thread.name
+            self.events.append(event)
+
+
+def addTraceHooks(pre=None, post=None):
+    """ Adds functions to be called before and / or after every traced function
+
+        arguments:
+        pre - function called as pre(name, args, kwargs) before a traced function runs
+        post - function called as post(name, result, error) after a traced function returns or raises
+
+        returns:
+        nothing
+    """
+    printDebug("In addTraceHooks, pre={}; post={}".format(pre, post), DEBUG_INFO)
+
+    if pre is not None:
+        pre_hooks.append(pre)
+
+    if post is not None:
+        post_hooks.append(post)
+
+    if untraced_modules and (pre_hooks or post_hooks):
+        wrapModules()
+
+
+def removeTraceHooks(pre=None, post=None):
+    """ Removes functions added by addTraceHooks()
+
+        arguments:
+        pre - the pre function to remove
+        post - the post function to remove
+
+        returns:
+        nothing
+    """
+    printDebug("In removeTraceHooks, pre={}; post={}".format(pre, post), DEBUG_INFO)
+
+    if pre in pre_hooks:
+        pre_hooks.remove(pre)
+
+    if post in post_hooks:
+        post_hooks.remove(post)
+
+
+def startTrace(filename="sparki_trace.json"):
+    """ Begins saving every traced call in a Chrome / Perfetto trace file; the file is written by stopTrace()
+
+        arguments:
+        filename - string path of the trace file (defaults to sparki_trace.json)
+
+        returns:
+        nothing
+    """
+    global current_trace
+
+    printDebug("In startTrace, filename is " + str(filename), DEBUG_INFO)
+
+    if current_trace is not None:
+        printDebug("In startTrace, a trace was already running -- stopping it", DEBUG_WARN)
+        stopTrace()
+
+    current_trace = ChromeTrace(filename)
+    addTraceHooks(current_trace.pre, current_trace.post)
+
+
+def stopTrace():
+    """ Stops the trace begun by startTrace() and writes the trace file
+
+        arguments:
+        none
+
+        returns:
+        string - the path of the trace file (None if no trace was running)
+    """
+    global current_trace
+
+    printDebug("In stopTrace", DEBUG_INFO)
+
+    if current_trace is None:
+        printDebug("In stopTrace, no trace was running", DEBUG_WARN)
+        return None
+
+    trace, current_trace = current_trace, None
+    removeTraceHooks(trace.pre, trace.post)
+    trace.save()
+
+    if trace.dropped:
+        printDebug("In stopTrace, {} events were dropped".format(trace.dropped), DEBUG_WARN)
+
+    return trace.filename
+
+
+def traced(func):
+    """ Returns func wrapped so that the trace hooks are called around it
+
+        arguments:
+        func - the function to wrap
+
+        returns:
+        function - calls func directly if there are no hooks
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not (pre_hooks or post_hooks):
+            return func(*args, **kwargs)
+
+        for hook in pre_hooks:
+            hook(name, args, kwargs)
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as err:
+            for hook in post_hooks:
+                hook(name, None, err)
+            raise
+
+        for hook in post_hooks:
+            hook(name, result, None)
+
+        return result
+
+    return wrapper
+
+
+def traceModule(namespace, module_name, exclude=()):
+    """ Has every function defined in a module wrapped with traced() -- when the first hook is added (straight away
+        if there already is one), so that calls cost nothing extra until something is traced
+
+        Because functions in a module call each other through the module's namespace, the wrapped versions are
+        called from inside the module as well as from outside it
+
+        arguments:
+        namespace - the module's globals()
+        module_name - the module's __name__ (functions imported from other modules are not wrapped)
+        exclude - names of functions not to wrap
+
+        returns:
+        nothing
+    """
+    untraced_modules.append((namespace, module_name, exclude))
+
+    if pre_hooks or post_hooks:
+        wrapModules()
+
+
+def wrapModules():
+    """ Wraps the functions of the modules given to traceModule() with traced()
+
+        The functions may already have been imported by other modules (e.g. from sparki_learning import *), so
+        those names are pointed at the wrapped versions too
+
+        arguments:
+        none
+
+        returns:
+        nothing
+    """
+    wrappers = {}  # id of each original function -> its wrapped version
+
+    while untraced_modules:
+        namespace, module_name, exclude = untraced_modules.pop()
+
+        for name, value in list(namespace.items()):
+            if isinstance(value, types.FunctionType) and value.__module__ == module_name and name not in exclude \
+                    and not hasattr(value, "__wrapped__"):
+                namespace[name] = wrappers[id(value)] = traced(value)
+
+    printDebug("In wrapModules, wrapped {} functions".format(len(wrappers)), DEBUG_INFO)
+
+    for module in list(sys.modules.values()):
+        module_namespace = getattr(module, "__dict__", None)
+
+        if not isinstance(module_namespace, dict):
+            continue
+
+        for name, value in list(module_namespace.items()):
+            wrapper = wrappers.get(id(value))
+
+            if wrapper is not None and wrapper.__wrapped__ is value:
+                module_namespace[name] = wrapper
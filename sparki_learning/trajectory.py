@@ -0,0 +1,300 @@
+################## Sparki Learning Library Trajectory Recorder ##################
+#
+# This file records a run of Sparki -- its pose (from the pose estimator), the wheel speeds it was told to use and
+# its latest sensor readings -- as rows of a NumPy structured array, and works out statistics of a run from it
+#
+# The rows are kept in an array which is made with room for many rows and doubles in size when it's full, so a
+# row costs one copy into memory which is already there (rather than a tuple of Python objects), and a run is one
+# block of memory which can be saved (as .npy or .npz), loaded and analysed without a loop over the rows
+#
+# This file needs NumPy, which isn't needed by the rest of the library (pip install sparki_learning[numpy]); it's
+# only imported when a program uses it
+#
+# Sparki is a mark of Arcbotics, LLC; no claim is made to the name Sparki and all rights in the name Sparki
+# remain property of their respective owners
+#
+# Created: October 19, 2026
+# Last Modified: October 19, 2026
+import threading
+import time
+
+import numpy as np
+
+
+# ***** TRAJECTORY CONSTANTS ***** #
+TRAJECTORY_CAPACITY = 1024  # rows a new recorder has room for; the room doubles each time it's full
+TRAJECTORY_INTERVAL = .1  # seconds between the rows added by sampling (see TrajectoryRecorder.startSampling())
+TRAJECTORY_MIN_MOVE = .01  # cm; pathCurvature() is nan between rows closer than this (a turn in place)
+TRAJECTORY_BLOCK = 4096  # pathDeviation() measures this many rows against the whole reference path at once
+
+# one row of a run; each row holds from its time until the next row's. A sensor which hasn't been read is -1
+TRAJECTORY_DTYPE = np.dtype([("time", "f8"),  # seconds since the recording started
+                             ("x", "f4"),  # cm on the grid
+                             ("y", "f4"),
+                             ("heading", "f4"),  # degrees clockwise, not wrapped (so turns can be followed)
+                             ("left", "i1"),  # commanded wheel speeds, -100 to 100
+                             ("right", "i1"),
+                             ("ping", "i2"),  # the last ping() in cm
+                             ("light", "i2", (3,)),  # the last getLight(): left, middle, right
+                             ("line", "i2", (5,))])  # the last getLine(): edge left, left, middle, right, edge right
+
+
+class TrajectoryRecorder:
+    """ Records rows of TRAJECTORY_DTYPE
+
+        The recorder keeps the wheel speeds last commanded (see command()) and the last sensor readings (see
+        sense()); each row holds those with the pose at the time it's added
+
+        arguments:
+        pose_function - function of no arguments which returns the current (x, y, heading)
+        capacity - int rows to make room for at first
+    """
+
+    def __init__(self, pose_function, capacity=TRAJECTORY_CAPACITY):
+        self.lock = threading.Lock()  # rows are added by the program and by the sampling thread
+        self.pose_function = pose_function
+        self.rows = np.zeros(max(int(capacity), 1), dtype=TRAJECTORY_DTYPE)
+        self.count = 0
+        self.start_time = time.perf_counter()
+        self.commands = []  # (start, end, left, right) of the wheel speeds commanded; end is None if they don't end
+        self.ping = -1
+        self.light = (-1, -1, -1)
+        self.line = (-1, -1, -1, -1, -1)
+        self.sampler = None
+        self.sampling = threading.Event()
+
+    def array(self):
+        """ Returns a copy of the rows recorded, as a NumPy structured array of TRAJECTORY_DTYPE """
+        with self.lock:
+            return self.rows[:self.count].copy()
+
+    def command(self, left, right, duration=None, queued=False, now=None):
+        """ Records that the wheels were told to run at left and right (-100 to 100), and adds a row
+
+            arguments:
+            left - int left wheel speed
+            right - int right wheel speed
+            duration - float seconds the wheels run (after which they stop); None if they run until the next command
+            queued - boolean; if True and timed speeds are running, these start when those end
+            now - float time the command was sent (defaults to now, as time.perf_counter())
+        """
+        now = time.perf_counter() if now is None else now
+
+        with self.lock:
+            start = now
+
+            if queued and duration is not None and self.commands and self.commands[-1][1] is not None:
+                start = max(now, self.commands[-1][1])
+            else:
+                self.commands = []
+
+            self.commands.append((start, None if duration is None else start + max(duration, 0.0), int(left),
+                                  int(right)))
+
+        self.sample(now)
+
+    def save(self, filename):
+        """ Saves the rows recorded to filename -- a .npz file (compressed, with the rows as "trajectory") if
+            filename ends with .npz, otherwise a .npy file
+        """
+        saveTrajectory(filename, self.array())
+
+    def sample(self, now=None):
+        """ Adds a row for now (defaults to now, as time.perf_counter()) """
+        now = time.perf_counter() if now is None else now
+        x, y, heading = self.pose_function()
+
+        with self.lock:
+            left, right, end = self._wheels(now)
+
+            # the wheels stopped at the end of a timed command since the last row; the robot hasn't moved since
+            if self.count and end is not None and self.start_time + self.rows[self.count - 1]["time"] < end <= now:
+                self._add(end, x, y, heading, 0, 0)
+
+            self._add(now, x, y, heading, left, right)
+
+    def sense(self, ping=None, light=None, line=None, now=None):
+        """ Records sensor readings (a reading which is None is left as it was), and adds a row
+
+            arguments:
+            ping - int cm from ping()
+            light - tuple of 3 ints from getLight()
+            line - tuple of 5 ints from getLine()
+            now - float time of the readings (defaults to now, as time.perf_counter())
+        """
+        with self.lock:
+            if ping is not None:
+                self.ping = int(ping)
+            if light is not None:
+                self.light = tuple(light)
+            if line is not None:
+                self.line = tuple(line)
+
+        self.sample(now)
+
+    def startSampling(self, interval=TRAJECTORY_INTERVAL):
+        """ Starts a thread which adds a row every interval seconds (so curves are recorded between commands) """
+        self.stopSampling()
+        self.sampling.clear()
+        self.sampler = threading.Thread(target=self._sampleLoop, args=(interval,), name="trajectory sampler",
+                                        daemon=True)
+        self.sampler.start()
+
+    def stopSampling(self):
+        """ Stops the thread started by startSampling() (if any) """
+        if self.sampler is not None:
+            self.sampling.set()
+            self.sampler.join()
+            self.sampler = None
+
+    def _add(self, now, x, y, heading, left, right):
+        if self.count == len(self.rows):
+            rows = np.zeros(len(self.rows) * 2, dtype=TRAJECTORY_DTYPE)
+            rows[:self.count] = self.rows
+            self.rows = rows
+
+        self.rows[self.count] = (now - self.start_time, x, y, heading, left, right, self.ping, self.light,
+                                 self.line)
+        self.count += 1
+
+    def _sampleLoop(self, interval):
+        while not self.sampling.wait(interval):
+            self.sample()
+
+    def _wheels(self, now):
+        # the wheel speeds at now, and the time they stopped (None if they're running, or stopped before any row
+        # could see them running)
+        end = None
+
+        for start, stop, command_left, command_right in self.commands:
+            if start <= now and (stop is None or now < stop):
+                return command_left, command_right, None
+            elif stop is not None and stop <= now:
+                end = stop
+
+        if self.commands and self.commands[-1][1] is not None and self.commands[-1][1] <= now:
+            self.commands = [self.commands[-1]]  # only the last one's end is still needed
+
+        return 0, 0, end
+
+
+def loadTrajectory(filename):
+    """ Returns the rows saved by saveTrajectory() (or TrajectoryRecorder.save()) in filename
+
+        arguments:
+        filename - string name of a .npy or .npz file
+
+        returns:
+        NumPy structured array of TRAJECTORY_DTYPE
+    """
+    if str(filename).endswith(".npz"):
+        with np.load(filename) as saved:
+            return saved["trajectory"]
+
+    return np.load(filename)
+
+
+def pathCurvature(trajectory):
+    """ Returns the curvature (1 / radius, in 1 / cm; positive bends clockwise) of the path between each row and
+        the next -- the change of heading over the distance moved. A turn in place (less than TRAJECTORY_MIN_MOVE)
+        is nan
+
+        arguments:
+        trajectory - NumPy structured array of TRAJECTORY_DTYPE
+
+        returns:
+        NumPy array of floats, one fewer than the rows
+    """
+    distance = np.hypot(np.diff(trajectory["x"].astype("f8")), np.diff(trajectory["y"].astype("f8")))
+    turned = np.radians(np.diff(trajectory["heading"].astype("f8")))
+    curvature = np.full(distance.shape, np.nan)
+
+    # the path between rows is an arc, so the straight line between them is a chord: the arc's length is
+    # chord * (turned / 2) / sin(turned / 2)
+    half = turned / 2
+    arc = distance * np.divide(half, np.sin(half), out=np.ones_like(half), where=np.abs(half) > 1e-9)
+    np.divide(turned, arc, out=curvature, where=arc >= TRAJECTORY_MIN_MOVE)
+
+    return curvature
+
+
+def pathDeviation(trajectory, reference, block=TRAJECTORY_BLOCK):
+    """ Returns how far (in cm) each row's position is from a reference path
+
+        arguments:
+        trajectory - NumPy structured array of TRAJECTORY_DTYPE
+        reference - sequence of (x, y) points; the path is the lines between them
+        block - int rows measured at once (more is faster, but uses more memory)
+
+        returns:
+        NumPy array of floats, one for each row (use .max() or .mean() for the whole run)
+    """
+    points = np.asarray(reference, dtype="f8").reshape(-1, 2)
+    starts = points[:-1] if len(points) > 1 else points
+    ends = points[1:] if len(points) > 1 else points
+    lines = ends - starts
+    lengths = np.einsum("ij,ij->i", lines, lines)
+    positions = np.column_stack((trajectory["x"], trajectory["y"])).astype("f8")
+    result = np.empty(len(positions))
+
+    for first in range(0, len(positions), block):
+        chunk = positions[first:first + block, None, :] - starts[None, :, :]  # rows x lines x 2
+
+        # how far along each line the nearest point is (0 is its start, 1 its end)
+        along = np.divide(np.einsum("ijk,jk->ij", chunk, lines), lengths, out=np.zeros(chunk.shape[:2]),
+                          where=lengths > 0)
+        along = np.clip(along, 0.0, 1.0)
+        offsets = chunk - along[:, :, None] * lines[None, :, :]
+        result[first:first + block] = np.sqrt(np.einsum("ijk,ijk->ij", offsets, offsets).min(axis=1))
+
+    return result
+
+
+def pathLength(trajectory):
+    """ Returns the length (in cm) of the path through the positions of the rows
+
+        arguments:
+        trajectory - NumPy structured array of TRAJECTORY_DTYPE
+
+        returns:
+        float
+    """
+    return float(np.hypot(np.diff(trajectory["x"].astype("f8")), np.diff(trajectory["y"].astype("f8"))).sum())
+
+
+def saveTrajectory(filename, trajectory):
+    """ Saves trajectory to filename -- a .npz file (compressed, with the rows as "trajectory") if filename ends
+        with .npz, otherwise a .npy file
+
+        arguments:
+        filename - string name of the file
+        trajectory - NumPy structured array of TRAJECTORY_DTYPE
+
+        returns:
+        nothing
+    """
+    if str(filename).endswith(".npz"):
+        np.savez_compressed(filename, trajectory=trajectory)
+    else:
+        np.save(filename, trajectory)
+
+
+def timeAtSpeed(trajectory):
+    """ Returns the seconds spent at each pair of commanded wheel speeds (each row's speeds last until the next
+        row, so the last row's count for nothing)
+
+        arguments:
+        trajectory - NumPy structured array of TRAJECTORY_DTYPE
+
+        returns:
+        dictionary - keys are (left, right) speeds; values are float seconds
+    """
+    if len(trajectory) < 2:
+        return {}
+
+    # each pair of speeds as one int, so they can be grouped in one pass
+    speeds = trajectory["left"][:-1].astype("i4") * 256 + trajectory["right"][:-1].astype("i4")
+    keys, which = np.unique(speeds, return_inverse=True)
+    seconds = np.bincount(which.ravel(), weights=np.diff(trajectory["time"]), minlength=len(keys))
+
+    return {(int((key + 128) // 256), int((key + 128) % 256 - 128)): float(total) for key, total in zip(keys, seconds)}
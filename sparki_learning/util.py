@@ -7,7 +7,8 @@
 #
 # written by Jeremy Eglen
 # Created: November 12, 2019 (some functions are older -- this is the original date of this file)
-# Last Modified: August 29, 2023
+# Last Modified: October 19, 2026
+import math
 import sys
 import threading
 import time
@@ -25,6 +26,11 @@ DEBUG_ALWAYS = 0  # should always be reported
 
 GLOBAL_DEBUG = DEBUG_ERROR
 
+# ***** TIMING CONSTANTS ***** #
+SLEEP_MIN = .002  # seconds; sleepUntil() doesn't sleep for less than this (time.sleep() may oversleep by about this
+                  # much), and spins for what's left
+# ***** END TIMING CONSTANTS ***** #
+
 
 def bluetoothValidate(address):
     """ Returns True if the string argument appears to be a Bluetooth address (strictly speaking, a MAC address)
@@ -161,6 +167,30 @@ def humanTime():
     return time.ctime()
 
 
+def periodic(hz, duration=None, spin=0.0):
+    """ Generator which yields steadily hz times a second (see Rate), and ends after duration seconds -- for loops
+        which should run at a fixed rate, e.g. for seconds in periodic(20, 10): would run 20 times a second for 10
+        seconds
+
+        Unlike timer(), it sleeps between yields rather than yielding as fast as it can
+
+        arguments:
+        hz - float number of times per second to yield
+        duration - float number of seconds until the generator should end; None never ends
+        spin - float seconds before each yield to stop sleeping and spin (see sleepUntil()); 0 only sleeps
+
+        yield:
+        float - number of seconds since the first yield
+    """
+    printDebug("In periodic, hz is {}, duration is {}".format(hz, duration), DEBUG_INFO)
+
+    rate = Rate(hz, spin)
+
+    while duration is None or rate.elapsed() < duration:
+        yield rate.elapsed()
+        rate.sleep()
+
+
 def printDebug(message, level=DEBUG_ERROR, myfile=sys.stderr):
     """ Prints message to stream if level is less than or equal to GLOBAL_DEBUG
     
@@ -194,8 +224,33 @@ def setGlobalDebug(new_level):
     GLOBAL_DEBUG = new_level
 
 
+def sleepUntil(deadline, spin=0.0):
+    """ Waits until time.perf_counter() reaches deadline -- sleeping for most of the time, then spinning (giving up
+        the processor each time around) for the last spin seconds, which wakes up more precisely than time.sleep()
+
+        arguments:
+        deadline - float time.perf_counter() value to wait until
+        spin - float seconds before deadline to stop sleeping; 0 only sleeps
+
+        returns:
+        float - seconds late (time.perf_counter() - deadline) when it returned
+    """
+    while True:
+        left = deadline - time.perf_counter()
+
+        if left <= 0:
+            return -left
+
+        if not spin or left > spin + SLEEP_MIN:
+            time.sleep(left - spin)
+        else:
+            time.sleep(0)  # spin, but let other threads run
+
+
 def timer(duration):
     """ Generator which yields the time since the instantiation, and ends after start_time + duration (seconds)
+
+        It yields as fast as it can, which keeps a processor busy; see periodic() for a loop at a steady rate
     
         arguments:
         duration - the float number of seconds until the generator should end
@@ -232,6 +287,85 @@ def wrapAngle(angle):
         return angle % -360
 
 
+class Rate:
+    """ Keeps a loop running at a steady rate: call sleep() once each time around the loop, and it waits until the
+        next tick. The ticks are counted from when the Rate was made (on the time.perf_counter() clock), so the time
+        spent in the loop, and any oversleeping, don't add up over time
+
+        If the loop takes longer than a tick, sleep() doesn't wait, counts an overrun and skips the ticks which were
+        missed (rather than running the loop back to back to catch up)
+
+        e.g. to set the motors 20 times a second:
+            rate = Rate(20)
+            while True:
+                motors(left, right)
+                rate.sleep()
+
+        arguments:
+        hz - float ticks per second
+        spin - float seconds before each tick to stop sleeping and spin (see sleepUntil()); 0 only sleeps
+    """
+
+    def __init__(self, hz, spin=0.0):
+        if hz <= 0:
+            printDebug("In Rate, hz must be more than 0", DEBUG_ERROR)
+            raise ValueError("hz must be more than 0")
+
+        self.period = 1.0 / hz
+        self.spin = max(float(spin), 0.0)
+        self.reset()
+
+    def elapsed(self):
+        """ Returns the seconds since the Rate was made (or reset) """
+        return time.perf_counter() - self.start
+
+    def reset(self):
+        """ Starts counting the ticks again from now, and clears the statistics """
+        self.start = time.perf_counter()
+        self.deadline = self.start + self.period
+        self.ticks = 0
+        self.overruns = 0
+        self.late_total = 0.0  # seconds late waking up, over the ticks which weren't overruns...
+        self.late_squares = 0.0  # ...their squares...
+        self.late_max = 0.0  # ...and the latest
+
+    def sleep(self):
+        """ Waits until the next tick
+
+            returns:
+            boolean - True if it waited; False if the tick had already passed (an overrun)
+        """
+        now = time.perf_counter()
+        self.ticks += 1
+
+        if now >= self.deadline:
+            self.overruns += 1
+            printDebug("In Rate.sleep, overran the tick by {:.4f} seconds".format(now - self.deadline), DEBUG_DEBUG)
+            self.deadline += (math.floor((now - self.deadline) / self.period) + 1) * self.period
+            return False
+
+        late = sleepUntil(self.deadline, self.spin)
+        self.late_total += late
+        self.late_squares += late * late
+        self.late_max = max(self.late_max, late)
+        self.deadline += self.period
+        return True
+
+    def stats(self):
+        """ Returns how well the rate has been kept since the Rate was made (or reset)
+
+            returns:
+            dictionary - "ticks" (int calls to sleep()), "overruns" (int ticks missed because the loop took too long),
+                         and "jitter_mean", "jitter_std" and "jitter_max" (float seconds late waking up for the others)
+        """
+        woken = self.ticks - self.overruns
+        mean = self.late_total / woken if woken else 0.0
+        variance = self.late_squares / woken - mean * mean if woken else 0.0
+
+        return {"ticks": self.ticks, "overruns": self.overruns, "jitter_mean": mean,
+                "jitter_std": math.sqrt(max(variance, 0.0)), "jitter_max": self.late_max}
+
+
 # the below function was taken verbatim from https://stackoverflow.com/questions/323972/is-there-any-way-to-kill-a-thread
 # from an answer by Grigory Zhadko which was modified by Alexey Esaulenko
 # it is used for the noop_thread in the sparki_learning library
@@ -8,7 +8,7 @@
    remain property of their respective owners */
 
 /* initial creation - October 27, 2015 
-   last modified - September 15, 2021 */
+   last modified - October 19, 2026 */
 
 /* conceptually, the Sparki recieves commands over the Bluetooth module from another computer 
  * a minimal command set is implemented on the Sparki itself -- just sufficient to expose the major functions
@@ -36,6 +36,23 @@
 #define COMPACT_2  // remove certain LCD functions (there was once a COMPACT)
 #define USE_EEPROM // use EEPROM to store certain values
 #define STATUS_ACK // if this is defined, the status light will be lit when the Sparki is processing a command
+//#define MOTION_EVENTS // if this is defined, Sparki sends EVENT and the milliseconds taken when a motion command finishes
+                         // (makes version 1.1.5) -- off by default until it's been checked to fit in Sparki's memory
+//#define MOTION_QUEUE  // if this is defined, Sparki keeps a queue of motions and runs them back to back (needs
+                        // MOTION_EVENTS; makes version 1.1.6; MOTION_QUEUE_SIZE * 13 bytes of RAM) -- opt-in and
+                        // unverified: the build hasn't been checked to fit in Sparki's memory, so it's off by default
+                        // and queueMotions() makes the motions one at a time
+//#define EEPROM_PROGRAMS // if this is defined, Sparki can run a program stored in its EEPROM (needs USE_EEPROM and
+                          // MOTION_QUEUE; makes version 1.1.7) -- opt-in and unverified: the build hasn't been checked
+                          // to fit in Sparki's memory, so it's off by default and runProgram() makes the steps one at a
+                          // time
+
+#if defined(MOTION_QUEUE) && !defined(MOTION_EVENTS)
+#error "MOTION_QUEUE needs MOTION_EVENTS"
+#endif
+#if defined(EEPROM_PROGRAMS) && !(defined(MOTION_QUEUE) && defined(USE_EEPROM))
+#error "EEPROM_PROGRAMS needs MOTION_QUEUE and USE_EEPROM"
+#endif
 
 #include <Sparki.h> // required for the Sparki -- uses significant memory
 
@@ -45,9 +62,19 @@
 
 /* ########### CONSTANTS ########### */
 /* ***** VERSION NUMBER ***** */
+// versions having the same number (before the lower case r) should always have the same capabilities -- so the
+// number follows the optional features built in (see SPARKI_CAPABILITIES in the Python library)
+#if defined(EEPROM_PROGRAMS)
+const char* SPARKI_MYRO_VERSION = "1.1.7r1";    // debugs off; mag on, accel on, EEPROM on; compact 2 on; motion events on;
+                                                // motion queue on; EEPROM programs on
+#elif defined(MOTION_QUEUE)
+const char* SPARKI_MYRO_VERSION = "1.1.6r1";    // debugs off; mag on, accel on, EEPROM on; compact 2 on; motion events on;
+                                                // motion queue on
+#elif defined(MOTION_EVENTS)
+const char* SPARKI_MYRO_VERSION = "1.1.5r1";    // debugs off; mag on, accel on, EEPROM on; compact 2 on; motion events on
+#else
 const char* SPARKI_MYRO_VERSION = "1.1.4r5";    // debugs off; mag on, accel on, EEPROM on; compact 2 on
-												// versions having the same number (before the lower case r)
-												// should always have the same capabilities
+#endif
 
 /* ***** MESSAGE TERMINATOR ***** */
 const char TERMINATOR = (char)23;      // this terminates every transmission from python
@@ -55,6 +82,30 @@ const char TERMINATOR = (char)23;      // this terminates every transmission fro
 /* ***** ACTION TERMINATOR ***** */
 const char SYNC = (char)22;            // send this when in the command loop waiting for instructions
 
+#ifdef MOTION_EVENTS
+/* ***** MOTION EVENT ***** */
+const char EVENT = (char)21;           // send this, then the milliseconds the motion took, when a motion command finishes
+                                       // added 1.1.5 -- the computer doesn't have to guess how long a motion takes
+#endif // MOTION_EVENTS
+
+#ifdef MOTION_QUEUE
+/* ***** MOTION QUEUE ***** */
+const int MOTION_QUEUE_SIZE = 8;       // the most motions the queue holds -- each one takes 13 bytes of RAM
+                                       // added 1.1.6 -- the Python library needs this to be the same
+#endif // MOTION_QUEUE
+
+#ifdef EEPROM_PROGRAMS
+/* ***** EEPROM PROGRAMS ***** */
+/* a program is text: each step is the command code of the step (e.g. COMMAND_FORWARD_CM) followed by its arguments,
+ * as numbers separated by commas -- so C10L90 moves forward 10 cm and then turns 90 degrees; added 1.1.7
+ */
+const char PROGRAM_WAIT = 'w';         // waits a number of milliseconds
+const char PROGRAM_REPEAT = '[';       // repeats the steps up to the matching PROGRAM_END_REPEAT a number of times
+const char PROGRAM_END_REPEAT = ']';
+const int PROGRAM_MAX_DEPTH = 4;       // the most repeats inside one another -- the Python library needs this to be the same
+const int PROGRAM_MAX_NUMBER = 12;     // the most characters in a number in a program
+#endif // EEPROM_PROGRAMS
+
 
 /* ***** COMMAND CHARACTER CODES ***** */
 /* Sparki Myro works by listening on the serial port for a command from the computer in the loop() function
@@ -131,6 +182,19 @@ const char COMMAND_VERSION = 'V';   // no arguments; returns version
 #endif // COMPACT_2
 
 const char COMMAND_NOOP = 'Z';  // no arguments; returns nothing; does nothing; added 1.1.3; can be used to prevent a timeout in communication with the robot
+
+#ifdef MOTION_QUEUE
+const char COMMAND_QUEUE_MOTION = 'M';  // requires 4 arguments: char command (one of BACKWARD_CM, BEEP, FORWARD_CM, MOTORS, SERVO or TURN_BY)
+                                        // and the command's arguments as 3 floats (0 for those it doesn't have; SERVO's second argument
+                                        // is the seconds to wait for the servo to get there); returns int number of motions in the queue,
+                                        // or -1 if the motion wasn't queued; added 1.1.6; the queued motions are run one after another
+                                        // whenever no command is waiting, and EVENT and an int are sent as each one finishes
+#endif // MOTION_QUEUE
+
+#ifdef EEPROM_PROGRAMS
+const char COMMAND_RUN_PROGRAM = 'N';   // requires 1 argument: int location of a program in the EEPROM; runs the program, stopping early if
+                                        // a command arrives; returns nothing (EVENT and an int when the program ends); added 1.1.7
+#endif // EEPROM_PROGRAMS
 /* ***** END OF COMMAND CHARACTER CODES ***** */
 
 
@@ -148,6 +212,7 @@ const int DEBUG_ALWAYS = 0;
 #ifdef USE_EEPROM
 const int EEPROM_NAME_START = 20;          // byte location of the start of the name
 const int EEPROM_NAME_MAX_CHARS = 20;      // the max number of bytes in the name
+const int EEPROM_MAX_ADDRESS = 1023;       // the last byte location in the EEPROM
 #endif // USE_EEPROM
 
 
@@ -203,6 +268,10 @@ void sendSerial(float* floats, int size);
 void sendSerial(int i);
 void sendSerial(int* ints, int size);
 
+#ifdef MOTION_EVENTS
+void sendMotionDone(unsigned long start_time); // sends EVENT and the milliseconds since start_time
+#endif // MOTION_EVENTS
+
 
 /* ***** SPARKI COMMANDS ***** */
 /* These functions can be called by the computer */
@@ -232,6 +301,11 @@ void readFromEEPROM(int start, int amount);  // reads data from EEPROM at locati
 void writeToEEPROM(int start);  // writes data to EEPROM at location start
 #endif // USE_EEPROM
 
+#ifdef EEPROM_PROGRAMS
+float readProgramNumber(int* location);  // reads a number of a program from the EEPROM
+void runProgram(int location);  // runs the program in the EEPROM at location
+#endif // EEPROM_PROGRAMS
+
 void initSparki();  // confirms communication with Python
 
 // LCD functions are generally handled via direct calls
@@ -244,6 +318,12 @@ void LCDdrawString(int x, int y);
 void LCDprint();
 void LCDsetColor(int color);
 void motors(int left_speed, int right_speed, float time);
+
+#ifdef MOTION_QUEUE
+int queueMotion(char command, float arg1, float arg2, float arg3);  // adds a motion to the motion queue
+void runQueuedMotion();  // runs the motion at the front of the motion queue
+#endif // MOTION_QUEUE
+
 void setDebugLevel(int level);
 void setStatusLED(int brightness);
 void stop();
@@ -255,6 +335,17 @@ void turnBy(float deg);
 #ifndef NO_DEBUGS
 int debug_level = DEBUG_WARN;
 #endif //NO_DEBUGS
+
+#ifdef MOTION_QUEUE
+struct QueuedMotion {
+  char command;                        // the command code of the motion
+  float args[3];                       // its arguments
+};
+
+QueuedMotion motion_queue[MOTION_QUEUE_SIZE];  // a ring -- the motions waiting start at queue_head and wrap around
+int queue_head = 0;                    // the index of the motion to run next
+int queue_count = 0;                   // the number of motions waiting (including one being run)
+#endif // MOTION_QUEUE
 /* ########### END OF GLOBALS ########### */
 
 
@@ -385,6 +476,13 @@ void sendSerial(int* ints, int size) {
   }
 }
 
+#ifdef MOTION_EVENTS
+void sendMotionDone(unsigned long start_time) {
+  serial.print(EVENT);
+  sendSerial((int)(millis() - start_time));
+}
+#endif // MOTION_EVENTS
+
 void sendSync() {
 //  printDebug(".", DEBUG_DEBUG);
   serial.print(SYNC);
@@ -899,6 +997,117 @@ void readFromEEPROM(int start, int amount) {
 }
 
 
+#ifdef EEPROM_PROGRAMS
+// readProgramNumber(int*)
+// reads the number of a program in the EEPROM at location, and moves location past it (and the comma after it)
+float readProgramNumber(int* location) {
+  char buf[PROGRAM_MAX_NUMBER + 1];
+  int count = 0;
+  char nextByte = EEPROM.read(*location);
+
+  while (*location < EEPROM_MAX_ADDRESS && ((nextByte >= '0' && nextByte <= '9') || nextByte == '-' || nextByte == '.')) {
+    if (count < PROGRAM_MAX_NUMBER) {
+      buf[count++] = nextByte;
+    }
+
+    (*location)++;
+    nextByte = EEPROM.read(*location);
+  }
+
+  buf[count] = '\0';
+
+  if (nextByte == ',') {
+    (*location)++;
+  }
+
+  return atof( buf );
+} // end readProgramNumber(int*)
+
+
+// runProgram(int)
+// runs the program stored in the EEPROM at location, up to a TERMINATOR -- each step is run like the command with
+// the same code; the program stops early if a command arrives from the computer
+void runProgram(int location) {
+  int repeat_start[PROGRAM_MAX_DEPTH];  // where the steps of each repeat being made start
+  int repeat_count[PROGRAM_MAX_DEPTH];  // the times each repeat is still to be made
+  int depth = 0;
+  float args[3];
+
+  while (location < EEPROM_MAX_ADDRESS && !serial.available()) {
+    char step = EEPROM.read(location++);
+
+    if (step == TERMINATOR || step == (char)0xFF) {  // the end of the program, or EEPROM which was never written
+      break;
+    }
+
+    int count = 0;
+    char nextByte = EEPROM.read(location);
+
+    while (count < 3 && ((nextByte >= '0' && nextByte <= '9') || nextByte == '-' || nextByte == '.')) {
+      args[count++] = readProgramNumber(&location);
+      nextByte = EEPROM.read(location);
+    }
+
+    while (count < 3) {
+      args[count++] = 0;
+    }
+
+    switch (step) {
+    case COMMAND_BACKWARD_CM:
+      sparki.moveBackward( args[0] );
+      break;
+    case COMMAND_BEEP:                // sparki.beep() doesn't wait for the beep to finish, so we do
+      sparki.beep( (int)args[0], (int)args[1] );
+      delay( (int)args[1] );
+      break;
+    case COMMAND_FORWARD_CM:
+      sparki.moveForward( args[0] );
+      break;
+    case COMMAND_MOTORS:
+      motors( (int)args[0], (int)args[1], args[2] );
+      break;
+    case COMMAND_SERVO:               // the second argument is the seconds the servo takes to get there
+      sparki.servo( (int)args[0] );
+      delay( args[1] * 1000 );
+      break;
+    case COMMAND_SET_RGB_LED:
+      sparki.RGB( (int)args[0], (int)args[1], (int)args[2] );
+      break;
+    case COMMAND_TURN_BY:
+      turnBy( args[0] );
+      break;
+    case PROGRAM_WAIT: {              // waits a little at a time, so a command ends a long wait early
+      unsigned long wait_start = millis();
+
+      while (millis() - wait_start < (unsigned long)args[0] && !serial.available()) {
+        delay(1);
+      }
+      break;
+    }
+    case PROGRAM_REPEAT:
+      if (depth < PROGRAM_MAX_DEPTH) {
+        repeat_start[depth] = location;
+        repeat_count[depth] = (int)args[0];
+        depth++;
+      }
+      break;
+    case PROGRAM_END_REPEAT:
+      if (depth > 0) {
+        repeat_count[depth - 1]--;
+
+        if (repeat_count[depth - 1] > 0) {
+          location = repeat_start[depth - 1];
+        } else {
+          depth--;
+        }
+      }
+      break;
+    }
+  }
+} // end runProgram(int)
+#endif // EEPROM_PROGRAMS
+
+
 // void setName()
 // sets the robot's name from the argument on the serial port
 void setName() {
@@ -978,6 +1187,77 @@ void motors(int left_speed, int right_speed) {
 } // end motors(int,int)
 
 
+#ifdef MOTION_QUEUE
+// queueMotion(char,float,float,float)
+// adds a motion to the end of the motion queue -- command is the code of the motion's command, and arg1 to arg3
+// are its arguments (see COMMAND_QUEUE_MOTION)
+// returns the number of motions in the queue, or -1 if the queue is full or command isn't a motion
+int queueMotion(char command, float arg1, float arg2, float arg3) {
+  if (queue_count >= MOTION_QUEUE_SIZE) {
+    return -1;
+  }
+
+  switch (command) {
+  case COMMAND_BACKWARD_CM:
+  case COMMAND_BEEP:
+  case COMMAND_FORWARD_CM:
+  case COMMAND_MOTORS:
+  case COMMAND_SERVO:
+  case COMMAND_TURN_BY:
+    break;
+  default:
+    return -1;
+  }
+
+  QueuedMotion* motion = &motion_queue[(queue_head + queue_count) % MOTION_QUEUE_SIZE];
+  motion->command = command;
+  motion->args[0] = arg1;
+  motion->args[1] = arg2;
+  motion->args[2] = arg3;
+  queue_count++;
+
+  return queue_count;
+} // end queueMotion(char,float,float,float)
+
+
+// runQueuedMotion()
+// runs the motion at the front of the motion queue, takes it off the queue, and sends EVENT and the milliseconds
+// it took -- loop() calls this whenever no command is waiting, so the motions run one straight after another
+void runQueuedMotion() {
+  QueuedMotion* motion = &motion_queue[queue_head];
+  unsigned long start_time = millis();
+
+  switch (motion->command) {
+  case COMMAND_BACKWARD_CM:
+    sparki.moveBackward( motion->args[0] );
+    break;
+  case COMMAND_BEEP:                  // sparki.beep() doesn't wait for the beep to finish, so we do
+    sparki.beep( (int)motion->args[0], (int)motion->args[1] );
+    delay( (int)motion->args[1] );
+    break;
+  case COMMAND_FORWARD_CM:
+    sparki.moveForward( motion->args[0] );
+    break;
+  case COMMAND_MOTORS:
+    motors( (int)motion->args[0], (int)motion->args[1], motion->args[2] );
+    break;
+  case COMMAND_SERVO:                 // sparki.servo() doesn't wait for the servo to get there either
+    sparki.servo( (int)motion->args[0] );
+    delay( motion->args[1] * 1000 );
+    break;
+  case COMMAND_TURN_BY:
+    turnBy( motion->args[0] );
+    break;
+  }
+
+  queue_head = (queue_head + 1) % MOTION_QUEUE_SIZE;
+  queue_count--;
+
+  sendMotionDone( start_time );
+} // end runQueuedMotion()
+#endif // MOTION_QUEUE
+
+
 #ifndef NO_DEBUGS
 // setDebugLevel(int)
 // sets the debug level -- higher numbers result in more verbose output
@@ -1247,20 +1527,48 @@ void loop() {
     case COMMAND_LCD_UPDATE:          // no args; returns nothing
       sparki.updateLCD();
       break;
-    case COMMAND_MOTORS:              // int, int, float; returns nothing
+    case COMMAND_MOTORS:              // int, int, float; returns nothing (EVENT and an int when done if time >= 0, with MOTION_EVENTS)
       { 
       int left_speed = getSerialInt();
       int right_speed = getSerialInt();
       float time_length = getSerialFloat();     
+#ifdef MOTION_EVENTS
+      unsigned long start_time = millis();
+      motors( left_speed, right_speed, time_length );
+      if (time_length >= 0) {         // motors without a time return right away, so there's nothing to report
+        sendMotionDone( start_time );
+      }
+#else
       motors( left_speed, right_speed, time_length );
+#endif // MOTION_EVENTS
       break;
       } // end COMMAND_MOTORS
-    case COMMAND_BACKWARD_CM:         // float; returns nothing
+    case COMMAND_BACKWARD_CM:         // float; returns nothing (EVENT and an int when done, with MOTION_EVENTS)
+#ifdef MOTION_EVENTS
+      {
+      float distance = getSerialFloat();
+      unsigned long start_time = millis();
+      sparki.moveBackward( distance );
+      sendMotionDone( start_time );
+      break;
+      }
+#else
       sparki.moveBackward( getSerialFloat() );
       break;
-    case COMMAND_FORWARD_CM:          // float; returns nothing
+#endif // MOTION_EVENTS
+    case COMMAND_FORWARD_CM:          // float; returns nothing (EVENT and an int when done, with MOTION_EVENTS)
+#ifdef MOTION_EVENTS
+      {
+      float distance = getSerialFloat();
+      unsigned long start_time = millis();
+      sparki.moveForward( distance );
+      sendMotionDone( start_time );
+      break;
+      }
+#else
       sparki.moveForward( getSerialFloat() );
       break;
+#endif // MOTION_EVENTS
     case COMMAND_PING:                // no args; returns int
       {
       int distance = sparki.ping();
@@ -1321,10 +1629,23 @@ void loop() {
       break;
     case COMMAND_STOP:                // no args; returns nothing
       stop();
+#ifdef MOTION_QUEUE
+      queue_count = 0;                // throw away any motions waiting in the motion queue
+#endif // MOTION_QUEUE
       break;
-    case COMMAND_TURN_BY:             // float; returns nothing
+    case COMMAND_TURN_BY:             // float; returns nothing (EVENT and an int when done, with MOTION_EVENTS)
+#ifdef MOTION_EVENTS
+      {
+      float degrees = getSerialFloat();
+      unsigned long start_time = millis();
+      turnBy( degrees );
+      sendMotionDone( start_time );
+      break;
+      }
+#else
       turnBy( getSerialFloat() );
       break;
+#endif // MOTION_EVENTS
 
 #ifdef USE_EEPROM
     case COMMAND_GET_NAME:            // no args; returns char*
@@ -1354,6 +1675,29 @@ void loop() {
     case COMMAND_NOOP:             // no args; returns nothing; does nothing
       // can be used to prevent a timeout in communication with the robot
       break;
+
+#ifdef EEPROM_PROGRAMS
+    case COMMAND_RUN_PROGRAM:         // int; returns nothing (EVENT and an int when the program ends)
+      {
+      int location = getSerialInt();
+      unsigned long start_time = millis();
+      runProgram( location );
+      sendMotionDone( start_time );
+      break;
+      }
+#endif // EEPROM_PROGRAMS
+
+#ifdef MOTION_QUEUE
+    case COMMAND_QUEUE_MOTION:        // char, float, float, float; returns int (EVENT and an int when the motion is done)
+      {
+      char command = getSerialChar();
+      float arg1 = getSerialFloat();
+      float arg2 = getSerialFloat();
+      float arg3 = getSerialFloat();
+      sendSerial( queueMotion( command, arg1, arg2, arg3 ) );
+      break;
+      }
+#endif // MOTION_QUEUE
       
 #ifndef NO_DEBUGS
     default:
@@ -1374,6 +1718,14 @@ void loop() {
 #endif // NO_DEBUGS
     } // end switch ((char)inByte)
   } // end if (serial.available())
+#ifdef MOTION_QUEUE
+  else if (queue_count > 0) {           // nothing to do but the queued motions -- run the next one
+#ifdef STATUS_ACK
+    setStatusLED(100);
+#endif // STATUS_ACK
+    runQueuedMotion();
+  }
+#endif // MOTION_QUEUE
   
   sendSync();    // we send the sync every time rather than a more complex handshake to save space in the program
 } // end loop()